@@ -10,17 +10,22 @@ KEY CONCEPTS:
 - .add_edge(source, target) connects two agents sequentially
 - Agents pass messages along edges automatically
 - The graph is visible and deterministic
+- run_with_deadline() bounds the whole run, so a hung call cannot stall it
 """
 
 import asyncio
-import os
+import sys
+from pathlib import Path
 from typing import cast
 
 from dotenv import load_dotenv
 
 from agent_framework import AgentResponse, WorkflowBuilder
-from agent_framework.azure import AzureOpenAIResponsesClient
-from agent_framework.openai import OpenAIResponsesClient
+
+# The repo-root `shared/` package holds the process-wide client registry.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.clients import get_client  # noqa: E402
+from shared.deadlines import run_with_deadline  # noqa: E402
 
 
 # ============================================================================
@@ -36,29 +41,7 @@ from agent_framework.openai import OpenAIResponsesClient
 load_dotenv()
 
 
-def _clean_env(name: str) -> str:
-    return os.getenv(name, "").strip().strip('"').strip("'")
-
-
-def create_client():
-    azure_api_key = _clean_env("AZURE_API_KEY")
-    azure_api_base = _clean_env("AZURE_API_BASE")
-    azure_api_version = _clean_env("AZURE_API_VERSION") or None
-    default_model = _clean_env("DEFAULT_MODEL")
-
-    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
-        deployment_name = default_model.split("/", 1)[1]
-        return AzureOpenAIResponsesClient(
-            api_key=azure_api_key,
-            endpoint=azure_api_base,
-            api_version=azure_api_version,
-            deployment_name=deployment_name,
-        )
-
-    return OpenAIResponsesClient()
-
-
-client = create_client()
+client = get_client()
 
 outliner_agent = client.as_agent(
     name="outliner",
@@ -104,6 +87,10 @@ workflow = (
 # follows the graph until completion.
 #
 # The result contains outputs from the terminal nodes (writer, in this case).
+#
+# run_with_deadline() is workflow.run() with an end-to-end time limit
+# (WORKFLOW_DEADLINE, default 120s): past it, the run is cancelled and
+# DeadlineExceeded is raised instead of waiting on a hung provider call.
 # ============================================================================
 
 async def main():
@@ -121,7 +108,8 @@ async def main():
     print("  Running workflow: outliner → writer")
     print()
 
-    events = await workflow.run(
+    events = await run_with_deadline(
+        workflow,
         f"Create content about: {topic}\nTarget audience: {audience}\nTarget length: ~300 words"
     )
 
@@ -9,19 +9,26 @@ KEY CONCEPTS:
 - .add_fan_out_edges(source, [targets]) broadcasts to multiple agents
 - .add_fan_in_edges([sources], target) waits for ALL sources, then aggregates
 - Fan-in target receives a list of all responses
+- Incremental fan-in: the aggregator also sees each response the moment its
+  branch completes and streams progress before the join closes
+- Deadlines: the run has a time budget and each analyst its own timeout; an
+  analyst out of time is reported as N/A instead of holding up the join
+- Profiling (WORKFLOW_PROFILE=1): per-executor and per-superstep timing and
+  the critical path, exported as JSON and as a Chrome trace
 - Explicit parallelism = visible, controllable, deterministic
 """
 
 import asyncio
-import os
+import sys
+import time
 from dataclasses import dataclass
+from pathlib import Path
 from typing import cast
 
 from dotenv import load_dotenv
 from typing_extensions import Never
 
 from agent_framework import (
-    AgentExecutor,
     AgentExecutorRequest,
     AgentExecutorResponse,
     Executor,
@@ -30,8 +37,20 @@ from agent_framework import (
     WorkflowContext,
     handler,
 )
-from agent_framework.azure import AzureOpenAIResponsesClient
-from agent_framework.openai import OpenAIResponsesClient
+
+# The repo-root `shared/` package holds the process-wide client registry.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.af_executors import (  # noqa: E402
+    BranchAgentExecutor,
+    FanInProgress,
+    IncrementalAggregator,
+)
+from shared.af_middleware import runtime_middleware  # noqa: E402
+from shared.af_profiling import RunProfiler  # noqa: E402
+from shared.clients import get_client  # noqa: E402
+from shared.deadlines import deadline_from_env  # noqa: E402
+from shared.hedging import hedge_policy  # noqa: E402
+from shared.stats import runtime_summary  # noqa: E402
 
 
 # ============================================================================
@@ -46,28 +65,6 @@ from agent_framework.openai import OpenAIResponsesClient
 load_dotenv()
 
 
-def _clean_env(name: str) -> str:
-    return os.getenv(name, "").strip().strip('"').strip("'")
-
-
-def create_client():
-    azure_api_key = _clean_env("AZURE_API_KEY")
-    azure_api_base = _clean_env("AZURE_API_BASE")
-    azure_api_version = _clean_env("AZURE_API_VERSION") or None
-    default_model = _clean_env("DEFAULT_MODEL")
-
-    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
-        deployment_name = default_model.split("/", 1)[1]
-        return AzureOpenAIResponsesClient(
-            api_key=azure_api_key,
-            endpoint=azure_api_base,
-            api_version=azure_api_version,
-            deployment_name=deployment_name,
-        )
-
-    return OpenAIResponsesClient()
-
-
 class DispatchToAnalysts(Executor):
     """Receives user input and dispatches to all analyst agents."""
 
@@ -86,6 +83,10 @@ class DispatchToAnalysts(Executor):
 # Fan-in waits for ALL sources to complete before triggering.
 #
 # This is the synchronized join — no results are lost.
+#
+# As an IncrementalAggregator it also gets each analysis as soon as that
+# analyst finishes (on_branch), and every arrival is streamed as a progress
+# event — a UI can show the first section while the others are still running.
 # ============================================================================
 
 @dataclass
@@ -95,17 +96,32 @@ class AnalysisReport:
     customer: str
 
 
-class AggregateAnalyses(Executor):
+SECTION_TITLES = {
+    "market_analyst": "MARKET ANALYSIS",
+    "tech_reviewer": "TECHNICAL REVIEW",
+    "customer_researcher": "CUSTOMER INSIGHT",
+}
+
+
+class AggregateAnalyses(IncrementalAggregator):
     """Collects all analyst responses and produces a combined report."""
 
+    async def on_branch(self, response: AgentExecutorResponse) -> str:
+        # Partial report: the section that just arrived
+        title = SECTION_TITLES.get(response.executor_id, response.executor_id.upper())
+        return f"{title}:\n{response.agent_response.text or '(no response)'}"
+
     @handler
     async def aggregate(
         self, results: list[AgentExecutorResponse], ctx: WorkflowContext[Never, str]
     ) -> None:
-        # results is a list — one entry per parallel agent
-        by_agent: dict[str, str] = {}
-        for r in results:
-            by_agent[r.executor_id] = r.agent_response.text or "(no response)"
+        # results is a list — one entry per parallel agent; complete() merges
+        # it with the responses that already arrived through on_branch()
+        by_agent: dict[str, str] = {
+            executor_id: "N/A (timed out)" for executor_id in self.timed_out
+        }
+        for executor_id, r in self.complete(results).items():
+            by_agent[executor_id] = r.agent_response.text or "(no response)"
 
         report = (
             "COMBINED ANALYSIS REPORT\n"
@@ -129,9 +145,21 @@ class AggregateAnalyses(Executor):
 # run in parallel and how results are collected.
 # ============================================================================
 
-client = create_client()
+# Each analyst gets at most ANALYST_TIMEOUT seconds, and never more than the
+# run's deadline leaves (WORKFLOW_DEADLINE, default 120s).
+ANALYST_TIMEOUT = 60.0
 
-market_agent = AgentExecutor(
+client = get_client()
+dispatcher = DispatchToAnalysts(id="dispatcher")
+aggregator = AggregateAnalyses(id="aggregator")
+
+# Opt-in runtime middleware: the response cache (LLM_RESPONSE_CACHE=1) answers
+# repeated inputs from memory / disk, and the shared rate limiter (LLM_RPM,
+# LLM_TPM, LLM_MAX_CONCURRENCY) keeps the fan-out under the provider quota.
+# BranchAgentExecutor hands each response straight to the aggregator and, with
+# LLM_HEDGE=1, duplicates a branch call that runs past that branch's p95, so
+# one straggler does not hold up the fan-in.
+market_agent = BranchAgentExecutor(
     client.as_agent(
         name="market_analyst",
         instructions=(
@@ -139,10 +167,14 @@ market_agent = AgentExecutor(
             "identify 3 key competitors, and rate the market opportunity from 1-10. "
             "Be concise — 3-4 sentences."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=aggregator,
+    policy=hedge_policy(),
+    timeout=ANALYST_TIMEOUT,
 )
 
-tech_agent = AgentExecutor(
+tech_agent = BranchAgentExecutor(
     client.as_agent(
         name="tech_reviewer",
         instructions=(
@@ -150,10 +182,14 @@ tech_agent = AgentExecutor(
             "identify 3 implementation risks, and rate complexity from 1-10. "
             "Be concise — 3-4 sentences."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=aggregator,
+    policy=hedge_policy(),
+    timeout=ANALYST_TIMEOUT,
 )
 
-customer_agent = AgentExecutor(
+customer_agent = BranchAgentExecutor(
     client.as_agent(
         name="customer_researcher",
         instructions=(
@@ -161,14 +197,15 @@ customer_agent = AgentExecutor(
             "list 3 pain points this product addresses, and rate appeal from 1-10. "
             "Be concise — 3-4 sentences."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=aggregator,
+    policy=hedge_policy(),
+    timeout=ANALYST_TIMEOUT,
 )
 
-dispatcher = DispatchToAnalysts(id="dispatcher")
-aggregator = AggregateAnalyses(id="aggregator")
-
 workflow = (
-    WorkflowBuilder(start_executor=dispatcher)
+    WorkflowBuilder(name="parallel_analysis", start_executor=dispatcher)
     .add_fan_out_edges(dispatcher, [market_agent, tech_agent, customer_agent])
     .add_fan_in_edges([market_agent, tech_agent, customer_agent], aggregator)
     .build()
@@ -198,16 +235,37 @@ async def main():
     print("  (3 agents running in PARALLEL with explicit fan-out)")
     print()
 
-    events = await workflow.run(product_description)
-    outputs = events.get_outputs()
-
-    if outputs:
-        report = str(outputs[0])
+    started = time.monotonic()
+    report: str | None = None
+    deadline = deadline_from_env()
+    profiler = RunProfiler(workflow)
+    async with deadline.enforce():
+        run = workflow.run(product_description, stream=True, **deadline.run_kwargs())
+        async for event in profiler.watch(run):
+            if event.type == "data" and isinstance(event.data, FanInProgress):
+                progress = event.data
+                total = len(aggregator.branch_ids)
+                status = "timed out" if progress.timed_out else "finished"
+                print(
+                    f"  [{time.monotonic() - started:5.1f}s] {progress.executor_id} {status} "
+                    f"({len(progress.completed)}/{total})"
+                )
+            elif event.type == "output" and event.executor_id == aggregator.id:
+                report = str(event.data)
+
+    if report:
+        print()
         for line in report.split("\n"):
             print(f"  {line}")
     else:
         print("  No output. Check your .env configuration.")
 
+    summary = runtime_summary() + profiler.summary()
+    if summary:
+        print()
+        for line in summary:
+            print(f"  {line}")
+
     print()
     print("=" * 60)
 
@@ -227,11 +285,20 @@ if __name__ == "__main__":
 # Update the aggregator to handle the new agent.
 #
 # EXPERIMENT 2: Streaming Results
-# Replace workflow.run() with:
-#   async for event in workflow.run(product, stream=True):
-# Print events as they arrive. Which agent finishes first?
+# main() already streams: each FanInProgress event arrives when one analyst
+# finishes. Print progress.partial to show each section as it lands.
+# Which agent finishes first?
+#
+# EXPERIMENT 3: Tight Deadline
+# Run with WORKFLOW_DEADLINE=5 (or set ANALYST_TIMEOUT = 3). Which sections
+# come back as "N/A (timed out)"? How long does the whole run take now?
+#
+# EXPERIMENT 4: Find the Straggler
+# Run with WORKFLOW_PROFILE=1 and open the .trace.json it writes in
+# https://ui.perfetto.dev. Which analyst is on the critical path, and how
+# much of the wall time is spent outside the agents?
 #
-# EXPERIMENT 3: Selective Fan-Out
+# EXPERIMENT 5: Selective Fan-Out
 # What if you only want 2 of the 3 agents? Just change the arrays.
 # In Flock, how would you achieve the same selectivity?
 #
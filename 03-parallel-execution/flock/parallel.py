@@ -10,15 +10,26 @@ KEY CONCEPTS:
 - No fan-out configuration needed — it's the default behavior
 - AND-gate: .consumes(TypeA, TypeB) waits for BOTH before triggering
 - All results land on the blackboard for collection
+- FLOCK_WORKERS=N spreads the agent runs over N worker processes
 """
 
 import asyncio
+import sys
+import time
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
 from flock import Flock
 from flock.registry import flock_type
 
+# The repo-root `shared/` package holds the engine, batch routing and worker pool.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.flock_engines import RuntimeDSPyEngine  # noqa: E402
+from shared.flock_routing import publish_many, use_indexed_routing  # noqa: E402
+from shared.flock_workers import worker_pool_from_env  # noqa: E402
+from shared.stats import runtime_summary  # noqa: E402
+
 
 # ============================================================================
 # STEP 1: Define Types for Product Analysis
@@ -70,9 +81,17 @@ class CustomerInsight(BaseModel):
 #
 # This is automatic. No fan-out configuration. No explicit parallelism.
 # The blackboard pattern naturally supports concurrent execution.
+#
+# Each analyst runs on RuntimeDSPyEngine (see shared/flock_engines.py), so a
+# batch of products × 3 analysts starts at once without exceeding LLM_RPM /
+# LLM_TPM: the excess runs wait for the rate limiter, not for each other.
+#
+# use_indexed_routing() lets publish_many() match a whole batch of products
+# in one pass and start all their analyst runs together (see main()).
 # ============================================================================
 
 flock = Flock()
+use_indexed_routing(flock)
 
 market_analyst = (
     flock.agent("market_analyst")
@@ -82,6 +101,7 @@ market_analyst = (
     )
     .consumes(ProductInfo)
     .publishes(MarketAnalysis)
+    .with_engines(RuntimeDSPyEngine())
 )
 
 tech_reviewer = (
@@ -92,6 +112,7 @@ tech_reviewer = (
     )
     .consumes(ProductInfo)
     .publishes(TechnicalReview)
+    .with_engines(RuntimeDSPyEngine())
 )
 
 customer_researcher = (
@@ -102,8 +123,14 @@ customer_researcher = (
     )
     .consumes(ProductInfo)
     .publishes(CustomerInsight)
+    .with_engines(RuntimeDSPyEngine())
 )
 
+# With FLOCK_WORKERS=4 the three analysts run in four worker processes, each
+# importing this file; the blackboard and scheduling stay here. Unset, the
+# pool is None and everything runs in this process as before.
+pool = worker_pool_from_env(flock)
+
 
 # ============================================================================
 # STEP 3: Run and Collect All Results
@@ -124,6 +151,7 @@ async def main():
         price=299.99,
         category="Smart Home / IoT",
     )
+    products = [product]
 
     print(f"  Product: {product.name}")
     print(f"  Price: ${product.price}")
@@ -133,8 +161,10 @@ async def main():
     print("  (3 analysts will run in PARALLEL — same input, same time)")
     print()
 
-    await flock.publish(product)
+    started = time.perf_counter()
+    await publish_many(flock, products)
     await flock.run_until_idle()
+    elapsed = time.perf_counter() - started
 
     # Collect all results
     market = await flock.store.get_by_type(MarketAnalysis)
@@ -162,6 +192,19 @@ async def main():
         print(f"    Pain points: {', '.join(c.pain_points[:3])}")
         print()
 
+    reports = len(market) + len(tech) + len(customer)
+    print(f"  {reports} reports in {elapsed:.1f}s ({reports / elapsed:.1f} reports/s)")
+    print()
+
+    summary = runtime_summary()
+    if pool is not None:
+        summary += pool.summary()
+        await pool.close()
+    if summary:
+        for line in summary:
+            print(f"  {line}")
+        print()
+
     print("=" * 60)
 
 
@@ -184,8 +227,16 @@ if __name__ == "__main__":
 # This agent will only trigger when ALL three reports exist.
 #
 # EXPERIMENT 3: Multiple Products
-# Publish 2 ProductInfo artifacts. How many analyses are produced?
-# (Hint: 3 agents × 2 products = ?)
+# Add a second ProductInfo to `products`. How many analyses are produced?
+# (Hint: 3 agents × 2 products = ?) publish_many() stores both products and
+# schedules all six analyst runs in one pass.
+#
+# EXPERIMENT 4: Worker Processes
+# Put 50 products in `products` and run with FLOCK_WORKERS unset, then with
+# FLOCK_WORKERS=2, 4 and 8 (LLM_RESPONSE_CACHE=1 on a second pass leaves
+# only the CPU work). Compare the reports/s line: it grows with the cores
+# until this process, which still routes and stores every artifact, is busy.
+# worker_scaling.py measures the same curve without an LLM.
 #
 # COMPARE: After running the Agent Framework version, consider:
 # - Flock: 3 agents consume the same type → automatic parallelism
@@ -0,0 +1,165 @@
+"""
+Module 03 - Worker Process Scaling (Flock)
+
+LEARNING OBJECTIVE:
+Measure how many artifacts/s a flock produces as its agent runs move into
+worker processes, one pool size after another.
+
+KEY CONCEPTS:
+- Same shape as parallel.py: three agents consume every Job
+- A stub engine stands in for the LLM: it burns a fixed amount of CPU per
+  run (pydantic validation, prompt rendering, parsing) and needs no API key
+- workers=0 runs in this process; workers=N spawns a pool of N processes
+  with use_worker_pool() and closes it again before the next size
+- Each size gets a warm-up round first: spawning and importing Flock in a
+  worker takes seconds and is not what is being measured
+- Throughput grows with cores until this process, which routes and stores
+  every artifact, is the bottleneck; with one core the pool only adds IPC
+
+Run:  uv run 03-parallel-execution/flock/worker_scaling.py [workers ...]
+      (default sizes: 0 1 2 4 and the number of cores)
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from flock import Flock
+from flock.components import EngineComponent
+from flock.registry import flock_type
+from flock.utils.runtime import EvalResult
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.flock_routing import publish_many  # noqa: E402
+from shared.flock_workers import use_worker_pool  # noqa: E402
+
+
+# ============================================================================
+# STEP 1: Define Types and a CPU-Bound Stub Engine
+# ============================================================================
+# Every agent answers a Job with a Result after WORK_MS of hashing, the
+# stand-in for the CPU an LLM call costs around the request itself.
+# ============================================================================
+
+JOBS = 100
+WORK_MS = 20
+
+
+@flock_type
+class Job(BaseModel):
+    """One unit of work for every agent."""
+    id: int = Field(description="Job number")
+    text: str = Field(description="Input to digest")
+
+
+@flock_type
+class Result(BaseModel):
+    """One agent's answer to a Job."""
+    job_id: int = Field(description="Job number")
+    agent: str = Field(description="Agent that produced it")
+    digest: str = Field(description="Hash of the input after WORK_MS of rounds")
+
+
+class BusyEngine(EngineComponent):
+    """Answers without an LLM, after WORK_MS of CPU work."""
+
+    async def evaluate(self, agent, ctx, inputs, output_group):
+        job = Job(**inputs.artifacts[0].payload)
+        digest = job.text.encode()
+        until = time.process_time() + WORK_MS / 1000
+        while time.process_time() < until:
+            digest = hashlib.sha256(digest).digest()
+        result = Result(job_id=job.id, agent=agent.name, digest=digest.hex())
+        return EvalResult.from_object(result, agent=agent)
+
+
+# ============================================================================
+# STEP 2: Create Three Agents
+# ============================================================================
+# .max_concurrency(JOBS) lifts the default per-agent cap of 2, so a pool of
+# any size can be kept busy.
+# ============================================================================
+
+flock = Flock()
+
+for name in ("parser", "scorer", "tagger"):
+    (
+        flock.agent(name)
+        .consumes(Job)
+        .publishes(Result)
+        .with_engines(BusyEngine())
+        .max_concurrency(JOBS)
+    )
+
+
+# ============================================================================
+# STEP 3: Sweep the Pool Sizes
+# ============================================================================
+
+async def run_jobs(first: int, count: int) -> int:
+    await publish_many(flock, [Job(id=first + i, text=f"job {first + i}") for i in range(count)])
+    await flock.run_until_idle()
+    return len(flock._agents) * count
+
+
+async def measure(workers: int, first: int) -> float:
+    pool = use_worker_pool(flock, workers) if workers else None
+    try:
+        await run_jobs(first, max(1, workers) * 2)          # warm-up: workers started and imported
+        started = time.perf_counter()
+        produced = await run_jobs(first + JOBS, JOBS)
+        return produced / (time.perf_counter() - started)
+    finally:
+        if pool is not None:
+            await pool.close()
+
+
+async def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or sorted({0, 1, 2, 4, os.cpu_count() or 1})
+
+    print("=" * 60)
+    print("  Worker Process Scaling — Flock")
+    print("=" * 60)
+    print()
+    print(f"  {JOBS} jobs × {len(flock._agents)} agents, {WORK_MS} ms of CPU per run, "
+          f"{os.cpu_count()} cores")
+    print()
+
+    baseline = None
+    for round_number, workers in enumerate(sizes):
+        rate = await measure(workers, round_number * 10 * JOBS)
+        baseline = baseline or rate
+        label = "in-process" if workers == 0 else f"{workers} worker" + "s" * (workers > 1)
+        print(f"  {label:>12}: {rate:7.1f} artifacts/s  ({rate / baseline:.2f}x)")
+    print()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
+
+# ============================================================================
+# YOUR TURN!
+# ============================================================================
+#
+# EXPERIMENT 1: Lighter Runs
+# Set WORK_MS = 1. Where does the curve flatten now? The coordinator's own
+# cost per run (routing, storing, IPC) is the ceiling the pool cannot move.
+#
+# EXPERIMENT 2: Per-Agent Caps
+# Change .max_concurrency(JOBS) to .max_concurrency(2). With three agents,
+# how many workers can still be busy at once?
+#
+# EXPERIMENT 3: Without Tracing
+# Run with FLOCK_AUTO_TRACE=false. Flock's tracing is most of the CPU a run
+# costs here; without it, how much does the pool still gain?
+#
+# EXPERIMENT 4: Real Agents
+# Run parallel.py with FLOCK_WORKERS set to the best size found here.
+# ============================================================================
@@ -10,19 +10,26 @@ KEY CONCEPTS:
 - Case(condition=predicate, target=agent) routes when predicate is true
 - Default(target=agent) handles unmatched cases
 - Centralized routing — one decision point controls the path
+- Early routing: the classifier streams, and the ticket is routed as soon as
+  the ROUTE token arrives; the rest of the generation is cancelled
+- Rule fast path: tickets with a clear `Priority: x | Customer: y` header are
+  routed locally; only ambiguous tickets reach the LLM classifier
+- run_many() routes many tickets concurrently, one workflow instance each
+- Bounded routing: each ticket has a deadline and the classifier a timeout;
+  an unclassified ticket falls back to the default route
 """
 
 import asyncio
-import os
-from dataclasses import dataclass
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
 
 from dotenv import load_dotenv
 from typing_extensions import Never
 
 from agent_framework import (
-    AgentExecutor,
     AgentExecutorRequest,
-    AgentExecutorResponse,
     Case,
     Default,
     Executor,
@@ -32,8 +39,13 @@ from agent_framework import (
     executor,
     handler,
 )
-from agent_framework.azure import AzureOpenAIResponsesClient
-from agent_framework.openai import OpenAIResponsesClient
+
+# The repo-root `shared/` package holds the process-wide client registry.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.af_streaming import stream_until  # noqa: E402
+from shared.batch import run_many  # noqa: E402
+from shared.clients import get_client  # noqa: E402
+from shared.deadlines import DeadlineExceeded, time_budget, within  # noqa: E402
 
 
 # ============================================================================
@@ -46,28 +58,6 @@ from agent_framework.openai import OpenAIResponsesClient
 load_dotenv()
 
 
-def _clean_env(name: str) -> str:
-    return os.getenv(name, "").strip().strip('"').strip("'")
-
-
-def create_client():
-    azure_api_key = _clean_env("AZURE_API_KEY")
-    azure_api_base = _clean_env("AZURE_API_BASE")
-    azure_api_version = _clean_env("AZURE_API_VERSION") or None
-    default_model = _clean_env("DEFAULT_MODEL")
-
-    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
-        deployment_name = default_model.split("/", 1)[1]
-        return AzureOpenAIResponsesClient(
-            api_key=azure_api_key,
-            endpoint=azure_api_base,
-            api_version=azure_api_version,
-            deployment_name=deployment_name,
-        )
-
-    return OpenAIResponsesClient()
-
-
 @dataclass
 class ClassifiedTicket:
     """Result from the classifier — determines routing."""
@@ -82,11 +72,98 @@ class ClassifiedTicket:
 # ============================================================================
 # The classifier extracts priority info and determines the route.
 # Handler agents process the ticket based on the route.
+#
+# Most tickets already carry a `Priority: critical | Customer: enterprise`
+# header, and the routing rules are fixed. intake applies those rules itself
+# (compiled once into a lookup table) and sends the ClassifiedTicket straight
+# to the switch; only tickets without a usable header go to the classifier.
+#
+# The classifier runs in STREAMING mode: parse_route() looks at the text
+# received so far after every chunk, and the ticket is routed the moment a
+# complete ROUTE token appears. stream_until() then closes the stream, so
+# routing waits for the first few tokens instead of the whole answer.
+#
+# Routing must not hang on the LLM either: the classifier gets at most
+# CLASSIFIER_TIMEOUT seconds (less if the ticket's deadline is closer). A
+# ticket it could not classify in time takes the default route, as one
+# without a ROUTE token does.
 # ============================================================================
 
+CLASSIFIER_TIMEOUT = 10.0
+TICKET_DEADLINE = 30.0  # end-to-end budget per ticket
+
+PRIORITIES = ("critical", "high", "normal", "low")
+CUSTOMER_TIERS = ("enterprise", "premium", "standard")
+HEADER = re.compile(
+    r"^\s*Priority:\s*(\w+)\s*\|\s*Customer:\s*(\w+)\s*$", re.IGNORECASE | re.MULTILINE
+)
+
+
+def rule_route(priority: str, customer_tier: str) -> str:
+    """The routing rules from the classifier prompt, as code."""
+    if priority == "critical" or customer_tier == "enterprise":
+        return "senior"
+    if priority == "high":
+        return "experienced"
+    return "standard"
+
+
+# Every valid (priority, tier) pair, resolved once.
+ROUTE_TABLE = {(p, t): rule_route(p, t) for p in PRIORITIES for t in CUSTOMER_TIERS}
+
+
+def fast_route(ticket_text: str) -> ClassifiedTicket | None:
+    """Route from the ticket header, or None when the header is missing or ambiguous."""
+    headers = HEADER.findall(ticket_text)
+    if len(headers) != 1:
+        return None  # no header, or several that may disagree
+    priority, customer_tier = (value.lower() for value in headers[0])
+    route = ROUTE_TABLE.get((priority, customer_tier))
+    if route is None:
+        return None  # unknown priority or tier
+    return ClassifiedTicket(
+        original_text=ticket_text,
+        priority=priority,
+        customer_tier=customer_tier,
+        route_to=route,
+    )
+
+
+@dataclass
+class TriageStats:
+    """How many tickets skipped the LLM, and roughly how much time that saved."""
+    fast_path: int = 0
+    classified: int = 0
+    timed_out: int = 0                   # classifier ran out of time; default route taken
+    classifier_seconds: list[float] = field(default_factory=list)
+
+    @property
+    def fast_path_rate(self) -> float:
+        total = self.fast_path + self.classified
+        return self.fast_path / total if total else 0.0
+
+    @property
+    def saved_seconds(self) -> float | None:
+        """Fast-path tickets × mean classifier latency; None until the LLM ran once."""
+        if not self.classifier_seconds:
+            return None
+        return self.fast_path * sum(self.classifier_seconds) / len(self.classifier_seconds)
+
+
+triage_stats = TriageStats()
+
+
 @executor(id="intake")
-async def intake(ticket_text: str, ctx: WorkflowContext[AgentExecutorRequest]) -> None:
-    """Receive a ticket and send it to the classifier agent."""
+async def intake(
+    ticket_text: str, ctx: WorkflowContext[AgentExecutorRequest | ClassifiedTicket]
+) -> None:
+    """Route a ticket by its header, or send it to the classifier agent."""
+    ticket = fast_route(ticket_text)
+    if ticket is not None:
+        triage_stats.fast_path += 1
+        await ctx.send_message(ticket)
+        return
+
     await ctx.send_message(
         AgentExecutorRequest(
             messages=[Message("user", text=(
@@ -103,35 +180,52 @@ async def intake(ticket_text: str, ctx: WorkflowContext[AgentExecutorRequest]) -
     )
 
 
-@executor(id="parse_classification")
-async def parse_classification(
-    response: AgentExecutorResponse, ctx: WorkflowContext[ClassifiedTicket]
-) -> None:
-    """Parse the classifier's response into a structured routing decision."""
-    text = response.agent_response.text or ""
-
-    # Extract route from response
-    route = "standard"  # default
-    for line in text.split("\n"):
-        if "ROUTE:" in line.upper():
-            route_value = line.split(":")[-1].strip().lower()
-            if route_value in ("senior", "experienced", "standard"):
-                route = route_value
-            break
-
-    # Store original ticket for the handler
-    original = ""
-    for msg in response.agent_response.messages:
-        if hasattr(msg, "text") and msg.text:
-            original = msg.text
-            break
-
-    await ctx.send_message(ClassifiedTicket(
-        original_text=original,
-        priority="determined-by-classifier",
-        customer_tier="determined-by-classifier",
-        route_to=route,
-    ))
+# No route name is a prefix of another, so a match is final the moment it
+# appears in the partial text.
+ROUTE_TOKEN = re.compile(r"ROUTE:\s*\[?\s*(senior|experienced|standard)", re.IGNORECASE)
+
+
+def parse_route(text: str) -> str | None:
+    """The route named in the (partial) classifier output, or None if not there yet."""
+    match = ROUTE_TOKEN.search(text)
+    return match.group(1).lower() if match else None
+
+
+class StreamingClassifier(Executor):
+    """Streams the classifier agent and routes as soon as the ROUTE token is complete."""
+
+    def __init__(self, agent, id: str = "classifier", timeout: float | None = None):
+        super().__init__(id=id)
+        self.agent = agent
+        self.timeout = timeout
+
+    @handler
+    async def classify(
+        self, request: AgentExecutorRequest, ctx: WorkflowContext[ClassifiedTicket]
+    ) -> None:
+        triage_stats.classified += 1
+        try:
+            decision = await within(
+                time_budget(ctx, self.timeout),
+                stream_until(self.agent, request.messages, parse_route),
+                "Classifier",
+            )
+            triage_stats.classifier_seconds.append(decision.elapsed)
+            route = decision.value
+        except DeadlineExceeded:
+            triage_stats.timed_out += 1
+            route = None
+
+        # Store original ticket for the handler
+        prompt = request.messages[-1].text or ""
+        original = prompt.split("Ticket:\n", 1)[-1]
+
+        await ctx.send_message(ClassifiedTicket(
+            original_text=original,
+            priority="determined-by-classifier",
+            customer_tier="determined-by-classifier",
+            route_to=route or "standard",  # default
+        ))
 
 
 @executor(id="senior_handler")
@@ -165,24 +259,30 @@ async def standard_handler(ticket: ClassifiedTicket, ctx: WorkflowContext[Never,
 # STEP 3: Build the Workflow with Switch-Case Routing
 # ============================================================================
 # The graph:
-#   intake → classifier_agent → parse_classification → SWITCH:
+#   intake ──(header)──────────────────────→ SWITCH:
+#   intake → classifier (streaming) ──────→ SWITCH:
 #     Case("senior")      → senior_handler
 #     Case("experienced") → experienced_handler
 #     Default             → standard_handler
 #
-# This is CENTRALIZED routing — one switch-case decides the path.
+# This is CENTRALIZED routing — one set of cases decides the path, whichever
+# stage classified the ticket. Messages only reach executors that accept
+# their type, so the classifier never sees a ClassifiedTicket and the
+# handlers never see an AgentExecutorRequest.
+#
+# A built workflow handles one run at a time, so build_workflow() creates a
+# fresh graph per call. The classifier runs without a session — every ticket
+# is classified on its own — so the agent and the executors are shared.
 # ============================================================================
 
-client = create_client()
+client = get_client()
 
-classifier_agent = AgentExecutor(
-    client.as_agent(
-        name="classifier",
-        instructions=(
-            "You classify support tickets by priority and route them. "
-            "Respond with exactly: ROUTE: [senior|experienced|standard]"
-        ),
-    )
+classifier = client.as_agent(
+    name="classifier",
+    instructions=(
+        "You classify support tickets by priority and route them. "
+        "Respond with exactly: ROUTE: [senior|experienced|standard]"
+    ),
 )
 
 
@@ -193,20 +293,30 @@ def route_matches(expected: str):
     return condition
 
 
-workflow = (
-    WorkflowBuilder(start_executor=intake)
-    .add_edge(intake, classifier_agent)
-    .add_edge(classifier_agent, parse_classification)
-    .add_switch_case_edge_group(
-        parse_classification,
-        [
-            Case(condition=route_matches("senior"), target=senior_handler),
-            Case(condition=route_matches("experienced"), target=experienced_handler),
-            Default(target=standard_handler),
-        ],
+def route_cases():
+    """The switch-case routes, shared by the fast path and the classifier."""
+    return [
+        Case(condition=route_matches("senior"), target=senior_handler),
+        Case(condition=route_matches("experienced"), target=experienced_handler),
+        Default(target=standard_handler),
+    ]
+
+
+classify = StreamingClassifier(classifier, timeout=CLASSIFIER_TIMEOUT)
+
+
+def build_workflow():
+    """Build one independent instance of the routing workflow."""
+    return (
+        WorkflowBuilder(start_executor=intake)
+        .add_edge(intake, classify)
+        .add_switch_case_edge_group(intake, route_cases())
+        .add_switch_case_edge_group(classify, route_cases())
+        .build()
     )
-    .build()
-)
+
+
+workflow = build_workflow()
 
 
 # ============================================================================
@@ -235,19 +345,37 @@ async def main():
             "Priority: normal | Customer: standard\n"
             "How do I export my project data to CSV format?"
         ),
+        (
+            "T-004: Invoices look wrong\n"
+            "We are an enterprise account and our last two invoices were charged twice."
+        ),
     ]
 
-    for ticket in tickets:
-        first_line = ticket.split("\n")[0]
-        print(f"  Processing: {first_line}")
+    # All tickets are routed concurrently (at most max_concurrency at once),
+    # each on its own workflow instance and within its own TICKET_DEADLINE.
+    # Results come back in input order.
+    results = await run_many(build_workflow, tickets, max_concurrency=4, deadline=TICKET_DEADLINE)
 
-        events = await workflow.run(ticket)
-        outputs = events.get_outputs()
+    for result in results:
+        first_line = result.input.split("\n")[0]
+        print(f"  Processing: {first_line}")
 
-        if outputs:
-            print(f"  Result: {outputs[0]}")
+        if result.error is not None:
+            print(f"  Error: {result.error}")
+        elif result.outputs:
+            print(f"  Result: {result.outputs[0]}")
         print()
 
+    saved = triage_stats.saved_seconds
+    print(
+        f"  Fast path: {triage_stats.fast_path}/{triage_stats.fast_path + triage_stats.classified} "
+        f"tickets routed by header ({triage_stats.fast_path_rate:.0%})"
+        + (f", ~{saved:.1f}s of classifier time saved" if saved is not None else "")
+    )
+    if triage_stats.timed_out:
+        print(f"  Classifier timeouts: {triage_stats.timed_out} (default route taken)")
+    print()
+
     print("=" * 60)
 
 
@@ -271,6 +399,10 @@ if __name__ == "__main__":
 # Add a second switch-case after the senior_handler:
 # If the ticket mentions "database", route to a DB specialist.
 #
+# EXPERIMENT 4: Completion Order
+# Replace run_many() with `async for result in iter_many(...)` (shared.batch)
+# and print each ticket as soon as it is routed. Which one finishes first?
+#
 # COMPARE: After running the Flock version, consider:
 # - Flock: decentralized routing (each agent filters its own input)
 # - AF: centralized routing (one switch-case controls all paths)
@@ -10,15 +10,32 @@ KEY CONCEPTS:
 - Multiple agents can consume the same type with different where= conditions
 - The routing logic lives in the agent declaration, not in a central router
 - This is decentralized routing — each agent decides what it handles
+- Declarative predicates (F.priority == "critical") compile into an index,
+  so routing cost tracks the matching agents, not the subscribed ones
+- publish_many() stores and routes a whole batch of tickets in one pass
+- Retention bounds the blackboard of a long-running ticket flock
+- subscribe() streams each response the moment it is published
+- An earliest-deadline-first queue and per-agent .max_concurrency() keep
+  critical tickets fast while routine ones pile up
 """
 
 import asyncio
+import sys
+import time
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
 from flock import Flock
 from flock.registry import flock_type
 
+# The repo-root `shared/` package holds the compiled routing predicates.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.flock_priority import Deadlines, use_priority_scheduling  # noqa: E402
+from shared.flock_routing import F, publish_many  # noqa: E402
+from shared.flock_store import IndexedBlackboardStore, Retention  # noqa: E402
+from shared.flock_streams import subscribe  # noqa: E402
+
 
 # ============================================================================
 # STEP 1: Define Support Ticket Types
@@ -54,9 +71,46 @@ class TicketResponse(BaseModel):
 #
 # This is DECENTRALIZED routing — each agent declares its own filter.
 # No central router needed.
+#
+# The filters are built from F instead of lambdas: F.priority == "critical"
+# is still a callable where= predicate, but one the scheduler can read.
+# The scheduler (see below) files every agent under the field values it accepts,
+# so a ticket is checked against the agents its priority/tier point to
+# rather than against every agent consuming SupportTicket.
+#
+# A support flock runs for days; without retention the store holds every
+# ticket ever seen. This one keeps the newest MAX_TICKETS tickets and, per
+# ticket, only its latest response — memory stays flat under any load.
+#
+# Under load, every activated agent would start at once and critical
+# tickets would queue for the model behind a flood of routine ones. The
+# priority scheduler runs at most AGENT_SLOTS agents at a time and always
+# starts the activation with the earliest deadline: a critical ticket is due
+# in 30 s, a low one in 30 min. .max_concurrency(n) caps each agent, so
+# standard_support can never take every slot.
 # ============================================================================
 
-flock = Flock()
+MAX_TICKETS = 10_000
+AGENT_SLOTS = 4
+
+store = IndexedBlackboardStore(
+    retention={
+        SupportTicket: Retention(last=MAX_TICKETS),
+        TicketResponse: Retention(last=1, per="ticket_id"),
+    }
+)
+flock = Flock(store=store)
+router = use_priority_scheduling(
+    flock,
+    Deadlines(
+        (F.priority == "critical", 30),
+        (F.customer_tier == "enterprise", 60),
+        (F.priority == "high", 120),
+        (F.priority == "normal", 600),
+        default=1800,
+    ),
+    slots=AGENT_SLOTS,
+)
 
 # Critical tickets go to the senior support agent
 senior_agent = (
@@ -68,9 +122,10 @@ senior_agent = (
     )
     .consumes(
         SupportTicket,
-        where=lambda t: t.priority == "critical" or t.customer_tier == "enterprise",
+        where=(F.priority == "critical") | (F.customer_tier == "enterprise"),
     )
     .publishes(TicketResponse)
+    .max_concurrency(2)
 )
 
 # High priority tickets go to the experienced agent
@@ -82,9 +137,10 @@ experienced_agent = (
     )
     .consumes(
         SupportTicket,
-        where=lambda t: t.priority == "high" and t.customer_tier != "enterprise",
+        where=(F.priority == "high") & (F.customer_tier != "enterprise"),
     )
     .publishes(TicketResponse)
+    .max_concurrency(2)
 )
 
 # Normal and low priority go to the standard agent
@@ -96,9 +152,10 @@ standard_agent = (
     )
     .consumes(
         SupportTicket,
-        where=lambda t: t.priority in ("normal", "low") and t.customer_tier != "enterprise",
+        where=F.priority.isin("normal", "low") & (F.customer_tier != "enterprise"),
     )
     .publishes(TicketResponse)
+    .max_concurrency(AGENT_SLOTS - 1)       # leaves a slot for urgent tickets
 )
 
 
@@ -139,21 +196,41 @@ async def main():
     for ticket in tickets:
         print(f"  [{ticket.id}] {ticket.subject}")
         print(f"    Priority: {ticket.priority} | Tier: {ticket.customer_tier}")
-        await flock.publish(ticket)
 
+    # Subscribe before publishing: each response is printed as soon as its
+    # agent publishes it, instead of after the slowest ticket.
+    responses = subscribe(flock, TicketResponse)
+
+    # One call for the whole batch: stored together, matched in one pass,
+    # and the activated agents start together.
+    started = time.perf_counter()
+    await publish_many(flock, tickets)
+    elapsed = time.perf_counter() - started
+    print()
+    print(f"  Published {len(tickets)} tickets in {elapsed * 1000:.2f} ms "
+          f"({elapsed / len(tickets) * 1e6:.0f} µs per ticket)")
     print()
     print("  Processing all tickets (routing by priority + tier)...")
     print()
 
-    await flock.run_until_idle()
-
-    responses = await flock.store.get_by_type(TicketResponse)
-    for resp in responses:
-        print(f"  [{resp.ticket_id}] Handled by: {resp.handler}")
+    # The stream ends once run_until_idle() finds the flock idle.
+    run = asyncio.create_task(flock.run_until_idle())
+    async for resp in responses:
+        print(f"  [{resp.ticket_id}] Handled by: {resp.handler} "
+              f"(after {time.perf_counter() - started:.1f}s)")
         print(f"    Escalated: {resp.escalated}")
         print(f"    Response: {resp.response[:120]}...")
         print()
+    await run
 
+    stats = router.stats
+    print(
+        f"  Routing: {stats.matches} activations for {stats.artifacts} artifacts, "
+        f"{stats.checks_per_artifact:.1f} predicate checks per artifact"
+    )
+    for line in router.summary():
+        print(f"  {line}")
+    print()
     print("=" * 60)
 
 
@@ -178,6 +255,33 @@ if __name__ == "__main__":
 # Remove the "enterprise" exclusion from experienced_agent's where=.
 # Submit an enterprise + high ticket. Which agent(s) handle it?
 #
+# EXPERIMENT 4: Lambda Fallback
+# Give one agent a plain lambda again, e.g. where=lambda t: "refund" in t.subject.
+# It still works: lambda subscriptions are matched the old way, for every
+# ticket. Watch the "predicate checks per artifact" line go up.
+#
+# EXPERIMENT 5: Batch Overhead
+# Generate 1,000 tickets with priority="none" (no agent matches, so only the
+# publish path is measured). Compare the µs-per-ticket line of
+# publish_many(flock, tickets) with a loop of `await flock.publish(ticket)`.
+#
+# EXPERIMENT 6: Backpressure
+# Use subscribe(flock, TicketResponse, buffer=1) and add
+# `await asyncio.sleep(2)` inside the loop. Agents now wait for the reader
+# before publishing the next response; print(responses.summary()) after the
+# loop shows how often and how long.
+#
+# EXPERIMENT 7: Retention
+# Set MAX_TICKETS = 2 and run again. Only the last two tickets stay on the
+# blackboard (check `await store.get_by_type(SupportTicket)` and
+# store.evicted). Add max_age=3600 to drop tickets older than an hour.
+#
+# EXPERIMENT 8: Priority Under Load
+# Publish 50 low-priority tickets, then one critical one. The queue summary
+# shows senior_support waiting well under a second while standard_support
+# works through its backlog. Now set AGENT_SLOTS = 100: everything starts at
+# once and the critical ticket shares the model with all 50 others.
+#
 # COMPARE: After running the Agent Framework version, consider:
 # - Flock: each agent declares its own filter (decentralized)
 # - AF: a central switch-case routes to specific agents (centralized)
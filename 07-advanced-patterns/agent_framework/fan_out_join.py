@@ -9,18 +9,25 @@ KEY CONCEPTS:
 - add_fan_out_edges() broadcasts to multiple targets
 - add_fan_in_edges() waits for ALL sources (synchronized barrier)
 - The aggregator receives a list of all responses
+- Incremental fan-in: each review reaches the aggregator as soon as its
+  reviewer finishes, streamed as a progress event before the join closes
+- Short-circuit join: one REJECTED verdict decides the merge, so the
+  reviewers still running are cancelled and the join fires at once
+- Deadlines: a reviewer out of time is left out of the join, and a merge
+  without every verdict is INCOMPLETE rather than APPROVED
 - Explicit graph topology makes the pattern visible
 """
 
 import asyncio
-import os
+import sys
+import time
+from pathlib import Path
 from typing import cast
 
 from dotenv import load_dotenv
 from typing_extensions import Never
 
 from agent_framework import (
-    AgentExecutor,
     AgentExecutorRequest,
     AgentExecutorResponse,
     Executor,
@@ -29,8 +36,20 @@ from agent_framework import (
     WorkflowContext,
     handler,
 )
-from agent_framework.azure import AzureOpenAIResponsesClient
-from agent_framework.openai import OpenAIResponsesClient
+
+# The repo-root `shared/` package holds the process-wide client registry.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.af_executors import (  # noqa: E402
+    BranchAgentExecutor,
+    FanInProgress,
+    IncrementalAggregator,
+    when_any,
+)
+from shared.af_middleware import runtime_middleware  # noqa: E402
+from shared.clients import get_client  # noqa: E402
+from shared.deadlines import deadline_from_env  # noqa: E402
+from shared.hedging import hedge_policy  # noqa: E402
+from shared.stats import runtime_summary  # noqa: E402
 
 
 # ============================================================================
@@ -40,28 +59,6 @@ from agent_framework.openai import OpenAIResponsesClient
 load_dotenv()
 
 
-def _clean_env(name: str) -> str:
-    return os.getenv(name, "").strip().strip('"').strip("'")
-
-
-def create_client():
-    azure_api_key = _clean_env("AZURE_API_KEY")
-    azure_api_base = _clean_env("AZURE_API_BASE")
-    azure_api_version = _clean_env("AZURE_API_VERSION") or None
-    default_model = _clean_env("DEFAULT_MODEL")
-
-    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
-        deployment_name = default_model.split("/", 1)[1]
-        return AzureOpenAIResponsesClient(
-            api_key=azure_api_key,
-            endpoint=azure_api_base,
-            api_version=azure_api_version,
-            deployment_name=deployment_name,
-        )
-
-    return OpenAIResponsesClient()
-
-
 class DispatchCode(Executor):
     """Receives code submission and dispatches to all reviewers."""
 
@@ -78,23 +75,53 @@ class DispatchCode(Executor):
 # ============================================================================
 # STEP 2: Aggregator — Collects All Reviews and Decides
 # ============================================================================
+# The merger is an IncrementalAggregator: on_branch() sees every review the
+# moment its reviewer finishes, so progress streams out before the join.
+#
+# A merge needs every reviewer's approval, so the first REJECTED verdict
+# decides it: complete_when=when_any(rejected) cancels the reviewers still
+# running (no more tokens or connections spent on them) and closes the join.
+#
+# Approval needs every verdict, though: a reviewer that ran out of time
+# makes the decision INCOMPLETE unless another reviewer already rejected.
+# ============================================================================
+
+def rejected(review: AgentExecutorResponse) -> bool:
+    return "REJECTED" in (review.agent_response.text or "").upper()
+
 
-class MergeReviews(Executor):
+class MergeReviews(IncrementalAggregator):
     """Collects all reviews and produces a merge decision."""
 
+    async def on_branch(self, review: AgentExecutorResponse) -> str:
+        # Partial report: the review that just arrived
+        return f"[{review.executor_id.upper()}]\n{review.agent_response.text or '(no response)'}"
+
     @handler
     async def merge(
         self, reviews: list[AgentExecutorResponse], ctx: WorkflowContext[Never, str]
     ) -> None:
         report_parts = ["CODE REVIEW SUMMARY", "=" * 40, ""]
 
-        for review in reviews:
+        timed_out = list(self.timed_out)
+        completed = self.complete(reviews)
+        for review in completed.values():
             agent_name = review.executor_id or "unknown"
             text = review.agent_response.text or "(no response)"
             report_parts.append(f"[{agent_name.upper()}]")
             report_parts.append(text)
             report_parts.append("")
 
+        cancelled = [b for b in self.branch_ids if b not in completed and b not in timed_out]
+        if cancelled:
+            report_parts.append(f"Cancelled (outcome already decided): {', '.join(cancelled)}")
+        if timed_out:
+            report_parts.append(f"Timed out (no verdict): {', '.join(timed_out)}")
+        if any(rejected(r) for r in completed.values()):
+            decision = "REJECTED"
+        else:
+            decision = "INCOMPLETE" if timed_out else "APPROVED"
+        report_parts.append(f"DECISION: {decision}")
         report_parts.append("=" * 40)
         await ctx.yield_output("\n".join(report_parts))
 
@@ -107,9 +134,21 @@ class MergeReviews(Executor):
 #   [security, performance, style] → merger       (fan-in)
 # ============================================================================
 
-client = create_client()
+# Each reviewer gets at most REVIEWER_TIMEOUT seconds, and never more than
+# the run's deadline leaves (WORKFLOW_DEADLINE, default 120s).
+REVIEWER_TIMEOUT = 60.0
 
-security_agent = AgentExecutor(
+client = get_client()
+dispatcher = DispatchCode(id="dispatcher")
+merger = MergeReviews(id="merger", complete_when=when_any(rejected))
+
+# Opt-in runtime middleware: the response cache (LLM_RESPONSE_CACHE=1) answers
+# repeated inputs from memory / disk, and the shared rate limiter (LLM_RPM,
+# LLM_TPM, LLM_MAX_CONCURRENCY) keeps the fan-out under the provider quota.
+# BranchAgentExecutor hands each review straight to the merger and, with
+# LLM_HEDGE=1, duplicates a branch call that runs past that branch's p95, so
+# one straggler does not hold up the fan-in.
+security_agent = BranchAgentExecutor(
     client.as_agent(
         name="security_reviewer",
         instructions=(
@@ -119,10 +158,14 @@ security_agent = AgentExecutor(
             "- Data exposure risks\n"
             "Rate risk level (low/medium/high/critical) and state APPROVED or REJECTED."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=merger,
+    policy=hedge_policy(),
+    timeout=REVIEWER_TIMEOUT,
 )
 
-performance_agent = AgentExecutor(
+performance_agent = BranchAgentExecutor(
     client.as_agent(
         name="performance_reviewer",
         instructions=(
@@ -132,10 +175,14 @@ performance_agent = AgentExecutor(
             "- Scalability concerns\n"
             "Rate complexity and state APPROVED or REJECTED."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=merger,
+    policy=hedge_policy(),
+    timeout=REVIEWER_TIMEOUT,
 )
 
-style_agent = AgentExecutor(
+style_agent = BranchAgentExecutor(
     client.as_agent(
         name="style_reviewer",
         instructions=(
@@ -145,12 +192,13 @@ style_agent = AgentExecutor(
             "- Best practices adherence\n"
             "Rate readability (1-10) and state APPROVED or REJECTED."
         ),
-    )
+        middleware=runtime_middleware(),
+    ),
+    aggregator=merger,
+    policy=hedge_policy(),
+    timeout=REVIEWER_TIMEOUT,
 )
 
-dispatcher = DispatchCode(id="dispatcher")
-merger = MergeReviews(id="merger")
-
 workflow = (
     WorkflowBuilder(start_executor=dispatcher)
     .add_fan_out_edges(dispatcher, [security_agent, performance_agent, style_agent])
@@ -187,14 +235,34 @@ def login(username, password):
     print("  Graph: dispatcher → [security, perf, style] → merger")
     print()
 
-    events = await workflow.run(code)
-    outputs = events.get_outputs()
-
-    if outputs:
-        print(str(outputs[0]))
+    started = time.monotonic()
+    report: str | None = None
+    deadline = deadline_from_env()
+    async with deadline.enforce():
+        async for event in workflow.run(code, stream=True, **deadline.run_kwargs()):
+            if event.type == "data" and isinstance(event.data, FanInProgress):
+                progress = event.data
+                if progress.decided and progress.pending:
+                    status = f"decided, cancelling {', '.join(progress.pending)}"
+                else:
+                    status = f"still waiting: {', '.join(progress.pending) or 'none'}"
+                verb = "timed out" if progress.timed_out else "finished"
+                print(f"  [{time.monotonic() - started:5.1f}s] {progress.executor_id} {verb} ({status})")
+            elif event.type == "output" and event.executor_id == merger.id:
+                report = str(event.data)
+
+    if report:
+        print()
+        print(report)
     else:
         print("  No output. Check your .env configuration.")
 
+    summary = runtime_summary()
+    if summary:
+        print()
+        for line in summary:
+            print(f"  {line}")
+
     print()
     print("=" * 60)
 
@@ -212,9 +280,20 @@ if __name__ == "__main__":
 # The merger now receives 4 reviews in its list.
 #
 # EXPERIMENT 2: Streaming
-# Use workflow.run(code, stream=True) to see real-time progress.
+# main() already streams a FanInProgress event per finished reviewer.
+# Print progress.partial to show each review as it lands.
 # Which reviewer finishes first?
 #
+# EXPERIMENT 3: Other Early-Completion Rules
+# shared.af_executors also has first_k(2) (any two reviews are enough) and
+# quorum(vote) (a majority agrees). Try
+#   complete_when=quorum(lambda r: "REJECTED" if rejected(r) else "APPROVED")
+# and watch which reviewers get cancelled.
+#
+# EXPERIMENT 4: Out of Time
+# Set REVIEWER_TIMEOUT = 2 and run again. Which reviewers time out, and what
+# does the merger decide without their verdicts?
+#
 # COMPARE: The Flock version achieves the same with type declarations:
 # - Three agents .consumes(CodeSubmission) = automatic fan-out
 # - Merger .consumes(SecurityReview, PerformanceReview, StyleReview) = AND-gate
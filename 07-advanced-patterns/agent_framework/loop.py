@@ -9,21 +9,26 @@ KEY CONCEPTS:
 - Graph cycles create loops (edge from downstream back to upstream)
 - WorkflowContext.set_state() / get_state() track iteration state
 - Conditional edges break the loop when quality is sufficient
+- Typed loop-control messages (RefineDraft / FinishDraft): the decision is
+  made once, and the switch dispatches on the message type
 - Explicit loop control via state + conditions
+- Deadline-aware loop: a new iteration starts only if the writer can still
+  finish it before the run's deadline; otherwise the last draft is final
+- Durable checkpoints (WORKFLOW_CHECKPOINTS=sqlite): state is saved after
+  every superstep, and a crashed run resumes after its last writer response
 """
 
 import asyncio
-import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
 
 from dotenv import load_dotenv
 from typing_extensions import Never
 
 from agent_framework import (
-    AgentExecutor,
     AgentExecutorRequest,
     AgentExecutorResponse,
-    Case,
-    Default,
     Executor,
     Message,
     WorkflowBuilder,
@@ -31,8 +36,18 @@ from agent_framework import (
     executor,
     handler,
 )
-from agent_framework.azure import AzureOpenAIResponsesClient
-from agent_framework.openai import OpenAIResponsesClient
+
+# The repo-root `shared/` package holds the process-wide client registry.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.af_executors import DeadlineAgentExecutor  # noqa: E402
+from shared.af_graph import dispatch_cases  # noqa: E402
+from shared.checkpoints import (  # noqa: E402
+    clear_checkpoints,
+    default_checkpoint_storage,
+    latest_checkpoint,
+)
+from shared.clients import get_client  # noqa: E402
+from shared.deadlines import deadline_from_env, time_budget  # noqa: E402
 
 
 # ============================================================================
@@ -41,30 +56,28 @@ from agent_framework.openai import OpenAIResponsesClient
 
 load_dotenv()
 
-
-def _clean_env(name: str) -> str:
-    return os.getenv(name, "").strip().strip('"').strip("'")
+QUALITY_THRESHOLD = 7
+MAX_ITERATIONS = 3
+WRITER_TIMEOUT = 45.0  # per writer call; also the time a new iteration needs
+WORKFLOW_NAME = "essay_loop"  # checkpoints are grouped (and resumed) by name
 
 
-def create_client():
-    azure_api_key = _clean_env("AZURE_API_KEY")
-    azure_api_base = _clean_env("AZURE_API_BASE")
-    azure_api_version = _clean_env("AZURE_API_VERSION") or None
-    default_model = _clean_env("DEFAULT_MODEL")
+# evaluate_draft decides once per iteration and says so with the message type;
+# the switch-case only has to look at which type arrived.
 
-    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
-        deployment_name = default_model.split("/", 1)[1]
-        return AzureOpenAIResponsesClient(
-            api_key=azure_api_key,
-            endpoint=azure_api_base,
-            api_version=azure_api_version,
-            deployment_name=deployment_name,
-        )
+@dataclass(frozen=True)
+class RefineDraft:
+    """Loop control: the draft needs another iteration."""
+    quality: int
+    iteration: int
 
-    return OpenAIResponsesClient()
 
-QUALITY_THRESHOLD = 7
-MAX_ITERATIONS = 3
+@dataclass(frozen=True)
+class FinishDraft:
+    """Loop control: stop and output the last draft."""
+    quality: int
+    iteration: int
+    out_of_time: bool = False
 
 
 # ============================================================================
@@ -90,7 +103,7 @@ async def seed_draft(topic: str, ctx: WorkflowContext[AgentExecutorRequest]) ->
 
 @executor(id="evaluate")
 async def evaluate_draft(
-    response: AgentExecutorResponse, ctx: WorkflowContext[str]
+    response: AgentExecutorResponse, ctx: WorkflowContext[RefineDraft | FinishDraft]
 ) -> None:
     """Parse the quality score and decide whether to continue."""
     text = response.agent_response.text or ""
@@ -111,16 +124,25 @@ async def evaluate_draft(
     ctx.set_state("quality", quality)
     ctx.set_state("last_draft", text)
 
-    # Send quality info for routing
-    await ctx.send_message(f"quality={quality},iteration={iteration + 1}")
+    # Decide once; the message type carries the decision to the switch.
+    # Another round is only worth starting if the writer can finish it.
+    wants_more = quality < QUALITY_THRESHOLD and iteration + 1 < MAX_ITERATIONS
+    budget = time_budget(ctx)
+    out_of_time = wants_more and budget is not None and budget < WRITER_TIMEOUT
+    if wants_more and not out_of_time:
+        await ctx.send_message(RefineDraft(quality=quality, iteration=iteration + 1))
+    else:
+        await ctx.send_message(
+            FinishDraft(quality=quality, iteration=iteration + 1, out_of_time=out_of_time)
+        )
 
 
 @executor(id="refine_prompt")
 async def refine_prompt(
-    eval_result: str, ctx: WorkflowContext[AgentExecutorRequest]
+    eval_result: RefineDraft, ctx: WorkflowContext[AgentExecutorRequest]
 ) -> None:
     """Create a refinement prompt for the next iteration."""
-    iteration = ctx.get_state("iteration") or 1
+    iteration = eval_result.iteration
     last_draft = ctx.get_state("last_draft") or ""
     topic = ctx.get_state("topic") or "unknown"
 
@@ -139,13 +161,18 @@ async def refine_prompt(
 
 
 @executor(id="finalize")
-async def finalize(eval_result: str, ctx: WorkflowContext[Never, str]) -> None:
+async def finalize(eval_result: FinishDraft, ctx: WorkflowContext[Never, str]) -> None:
     """Output the final draft."""
-    quality = ctx.get_state("quality") or 0
-    iteration = ctx.get_state("iteration") or 0
+    quality = eval_result.quality
+    iteration = eval_result.iteration
     draft = ctx.get_state("last_draft") or ""
 
-    reason = "quality target reached" if quality >= QUALITY_THRESHOLD else "max iterations reached"
+    if quality >= QUALITY_THRESHOLD:
+        reason = "quality target reached"
+    elif eval_result.out_of_time:
+        reason = "deadline reached"
+    else:
+        reason = "max iterations reached"
     await ctx.yield_output(
         f"FINAL RESULT (iteration {iteration}, quality {quality}/10, {reason})\n"
         f"{'=' * 40}\n{draft}"
@@ -157,48 +184,41 @@ async def finalize(eval_result: str, ctx: WorkflowContext[Never, str]) -> None:
 # ============================================================================
 # Graph:
 #   seed → writer → evaluate → SWITCH:
-#     needs_refinement → refine_prompt → writer (LOOP BACK)
-#     done             → finalize (EXIT)
+#     RefineDraft → refine_prompt → writer (LOOP BACK)
+#     FinishDraft → finalize (EXIT)
+#
+# dispatch_cases() compiles the type → target table into the Case / Default
+# list: one dict lookup per hop, no string parsing, and the Default branch
+# (FinishDraft) costs nothing to select.
+#
+# With a checkpoint storage, the runner saves the loop after every superstep:
+# the iteration/topic/quality/last_draft state, the writer's conversation and
+# the message about to be delivered. Each writer response is therefore on
+# disk before evaluate_draft sees it.
 # ============================================================================
 
-client = create_client()
+client = get_client()
+checkpoints = default_checkpoint_storage()
 
-writer_agent = AgentExecutor(
+writer_agent = DeadlineAgentExecutor(
     client.as_agent(
         name="writer",
         instructions=(
             "You are an essay writer. Write or improve essays based on the prompt. "
             "Always end with QUALITY: [score] where score is 1-10 (be honest)."
         ),
-    )
+    ),
+    timeout=WRITER_TIMEOUT,
 )
 
 
-def needs_refinement(message) -> bool:
-    """Check if the draft needs more work."""
-    if not isinstance(message, str):
-        return False
-    parts = dict(p.split("=") for p in message.split(",") if "=" in p)
-    quality = int(parts.get("quality", "0"))
-    iteration = int(parts.get("iteration", "0"))
-    return quality < QUALITY_THRESHOLD and iteration < MAX_ITERATIONS
-
-
-def is_done(message) -> bool:
-    """Check if the draft is good enough or we've hit max iterations."""
-    return not needs_refinement(message)
-
-
 workflow = (
-    WorkflowBuilder(start_executor=seed_draft)
+    WorkflowBuilder(name=WORKFLOW_NAME, start_executor=seed_draft, checkpoint_storage=checkpoints)
     .add_edge(seed_draft, writer_agent)
     .add_edge(writer_agent, evaluate_draft)
     .add_switch_case_edge_group(
         evaluate_draft,
-        [
-            Case(condition=needs_refinement, target=refine_prompt),
-            Default(target=finalize),
-        ],
+        dispatch_cases({RefineDraft: refine_prompt, FinishDraft: finalize}),
     )
     .add_edge(refine_prompt, writer_agent)  # LOOP BACK
     .build()
@@ -218,14 +238,45 @@ async def main():
     print(f"  Max iterations: {MAX_ITERATIONS}")
     print()
 
-    events = await workflow.run("The future of AI agent orchestration")
+    resume = await latest_checkpoint(checkpoints, WORKFLOW_NAME) if checkpoints is not None else None
+    if resume is not None:
+        # An earlier run stopped part-way: continue after its last completed
+        # superstep instead of paying for those writer calls again.
+        print(
+            f"  Resuming from checkpoint {resume.checkpoint_id[:8]} "
+            f"(superstep {resume.iteration_count}, "
+            f"iteration {resume.state.get('iteration', 0)})"
+        )
+        print()
+
+    # The deadline bounds the whole run (WORKFLOW_DEADLINE, default 120s);
+    # a resumed run gets a fresh one.
+    deadline = deadline_from_env()
+    async with deadline.enforce():
+        if resume is not None:
+            events = await workflow.run(checkpoint_id=resume.checkpoint_id, **deadline.run_kwargs())
+        else:
+            events = await workflow.run("The future of AI agent orchestration", **deadline.run_kwargs())
     outputs = events.get_outputs()
 
     if outputs:
-        print(str(outputs[0]))
+        # The writer's drafts are workflow outputs too; finalize's comes last.
+        print(str(outputs[-1]))
     else:
         print("  No output. Check your .env configuration.")
 
+    if checkpoints is not None:
+        stats = checkpoints.stats
+        print()
+        print(
+            f"  Checkpoints: {len(stats.writes)} written, "
+            f"{stats.mean_seconds * 1000:.1f} ms avg / {stats.total_seconds * 1000:.1f} ms total"
+        )
+        for write in stats.writes:
+            print(f"    superstep {write.superstep}: {write.seconds * 1000:.2f} ms")
+        # The run finished: the next one starts fresh instead of resuming.
+        await clear_checkpoints(checkpoints, WORKFLOW_NAME)
+
     print()
     print("=" * 60)
 
@@ -250,6 +301,11 @@ if __name__ == "__main__":
 # Add print statements in evaluate_draft to see the state at each iteration.
 # How does the quality score change?
 #
+# EXPERIMENT 4: Crash and Resume
+# Run with WORKFLOW_CHECKPOINTS=sqlite and press Ctrl+C after the first draft.
+# Run again: which writer calls are repeated? Compare the checkpoint write
+# times with the time each LLM call takes.
+#
 # COMPARE: The Flock version achieves this with a self-consuming agent:
 # - Agent consumes and publishes the SAME type
 # - where= predicate controls the loop
@@ -10,15 +10,26 @@ KEY CONCEPTS:
 - .consumes(TypeA, TypeB, TypeC) = AND-gate (waits for all)
 - The join agent only triggers when ALL required types are present
 - No explicit fan-out/fan-in wiring needed
+- A correlated join keeps each submission's three reviews together
+- run_until() returns as soon as THIS submission's MergeDecision exists
 """
 
 import asyncio
+import sys
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
 from flock import Flock
 from flock.registry import flock_type
 
+# The repo-root `shared/` package holds the engine, correlated join and run_until().
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.flock_engines import RuntimeDSPyEngine  # noqa: E402
+from shared.flock_joins import CorrelatedJoin  # noqa: E402
+from shared.flock_until import run_until  # noqa: E402
+from shared.stats import runtime_summary  # noqa: E402
+
 
 # ============================================================================
 # STEP 1: Define Types for a Code Review Pipeline
@@ -73,6 +84,10 @@ class MergeDecision(BaseModel):
 # ============================================================================
 # Three reviewers all consume CodeSubmission → fan-out (automatic)
 # The merger consumes ALL THREE review types → AND-gate (waits for all)
+#
+# Reviewers and merger run on RuntimeDSPyEngine (see shared/flock_engines.py):
+# with LLM_RESPONSE_CACHE=1, re-submitting unchanged code is answered from
+# the cache, so only the reviews of edited snippets cost an LLM call.
 # ============================================================================
 
 flock = Flock()
@@ -85,6 +100,7 @@ security_reviewer = (
     )
     .consumes(CodeSubmission)
     .publishes(SecurityReview)
+    .with_engines(RuntimeDSPyEngine())
 )
 
 performance_reviewer = (
@@ -95,6 +111,7 @@ performance_reviewer = (
     )
     .consumes(CodeSubmission)
     .publishes(PerformanceReview)
+    .with_engines(RuntimeDSPyEngine())
 )
 
 style_reviewer = (
@@ -105,6 +122,7 @@ style_reviewer = (
     )
     .consumes(CodeSubmission)
     .publishes(StyleReview)
+    .with_engines(RuntimeDSPyEngine())
 )
 
 # AND-gate: waits for ALL three review types
@@ -118,10 +136,27 @@ merge_agent = (
     .publishes(MergeDecision)
 )
 
+# The plain AND-gate takes ANY one review of each type. With several
+# submissions in flight that mixes reviews of different code, so the merger
+# joins on the correlation_id each review inherits from its submission.
+# Groups still missing a review after JOIN_TTL seconds (a reviewer failed)
+# are dropped, and at most MAX_PENDING_JOINS are held at once.
+JOIN_TTL = 300
+MAX_PENDING_JOINS = 1000
+
+joins = CorrelatedJoin(ttl=JOIN_TTL, max_pending=MAX_PENDING_JOINS).on(merge_agent)
+flock.add_component(joins)
+
 
 # ============================================================================
 # STEP 3: Run the Pipeline
 # ============================================================================
+# run_until_idle() would wait for everything on the blackboard. This script
+# only needs the merge decision for its submission, so it waits for exactly
+# that: the MergeDecision sharing the submission's correlation_id.
+# ============================================================================
+
+DECISION_TIMEOUT = 300
 
 async def main():
     print("=" * 60)
@@ -152,8 +187,10 @@ def login(username, password):
     print("  Merge agent waits for ALL THREE (AND-gate)...")
     print()
 
-    await flock.publish(submission)
-    await flock.run_until_idle()
+    published = await flock.publish(submission)
+    decisions = await run_until(
+        flock, MergeDecision, correlation_id=published.correlation_id, timeout=DECISION_TIMEOUT
+    )
 
     # Check individual reviews
     sec = await flock.store.get_by_type(SecurityReview)
@@ -169,8 +206,9 @@ def login(username, password):
     print()
 
     # Check merge decision
-    decisions = await flock.store.get_by_type(MergeDecision)
-    if decisions:
+    if not decisions:
+        print(f"  No merge decision: a reviewer failed or {DECISION_TIMEOUT}s passed")
+    else:
         d = decisions[0]
         status = "APPROVED" if d.approved else "CHANGES REQUESTED"
         print(f"  MERGE DECISION: {status}")
@@ -181,6 +219,13 @@ def login(username, password):
                 print(f"    - {change}")
 
     print()
+
+    summary = runtime_summary() + joins.summary()
+    if summary:
+        for line in summary:
+            print(f"  {line}")
+        print()
+
     print("=" * 60)
 
 
@@ -201,6 +246,18 @@ if __name__ == "__main__":
 # Add TestCoverageReview to the merger's .consumes() list.
 # Does the AND-gate wait for all four?
 #
+# EXPERIMENT 3: Many Submissions at Once
+# Publish 20 submissions in a loop, then await flock.run_until_idle() instead
+# of run_until() so all of them finish. Check that every
+# MergeDecision lists the findings of ONE submission, then remove the
+# joins.on(merge_agent) line and compare. What does joins.pending() show if
+# one reviewer raises an exception?
+#
+# EXPERIMENT 4: Don't Wait for the Neighbours
+# Before publishing `submission`, publish a second, much longer one. Time
+# main() with run_until() and with run_until_idle(): only the latter waits
+# for the other review. Pass cancel_rest=True to stop it instead.
+#
 # COMPARE: The AF version uses explicit fan-out + fan-in edges.
 # Which approach is cleaner for this pattern?
 # ============================================================================
@@ -10,15 +10,28 @@ KEY CONCEPTS:
 - where= predicates control when to continue vs stop
 - The loop breaks when the predicate no longer matches
 - This creates iterative refinement without explicit loop constructs
+- An indexed store answers "latest draft for this topic" without a scan
+- With FLOCK_BLACKBOARD=1 the blackboard is logged to disk: a re-run after a
+  crash resumes the loop instead of starting over
+- run_until() waits for the final draft, not for the whole flock to go idle
 """
 
 import asyncio
+import sys
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
 from flock import Flock
 from flock.registry import flock_type
 
+# The repo-root `shared/` package holds the indexed and durable blackboard stores.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.flock_durable import DurableBlackboardStore, ResumePending, blackboard_store  # noqa: E402
+from shared.flock_routing import F  # noqa: E402
+from shared.flock_store import Retention  # noqa: E402
+from shared.flock_until import run_until  # noqa: E402
+
 
 # ============================================================================
 # STEP 1: Define Types for Iterative Essay Refinement
@@ -42,6 +55,7 @@ class EssayDraft(BaseModel):
 
 QUALITY_THRESHOLD = 7
 MAX_ITERATIONS = 3
+LOOP_TIMEOUT = 600
 
 
 # ============================================================================
@@ -55,9 +69,27 @@ MAX_ITERATIONS = 3
 #   - quality >= QUALITY_THRESHOLD, OR
 #   - iteration >= MAX_ITERATIONS
 # because the where= predicate no longer matches.
+#
+# The store indexes drafts by (topic, iteration): every draft of a topic sits
+# together, in iteration order, so the latest one is a binary search away.
+#
+# With FLOCK_BLACKBOARD=1 every draft is also written to a log under
+# .cache/blackboard before it is published. ResumePending picks up the
+# refinement that was running when the process died: the next run replays the
+# log and re-offers the drafts the refiner had not finished.
+#
+# Retention keeps the blackboard from growing with every loop ever run: per
+# topic only the drafts of one loop (MAX_ITERATIONS + 1) stay; older ones are
+# evicted as new drafts arrive.
 # ============================================================================
 
-flock = Flock()
+store = blackboard_store(
+    {EssayDraft: [("topic", "iteration")]},
+    retention={EssayDraft: Retention(last=MAX_ITERATIONS + 1, per="topic")},
+)
+flock = Flock(store=store)
+resume = ResumePending()
+flock.add_component(resume)
 
 refiner = (
     flock.agent("refiner")
@@ -98,18 +130,34 @@ async def main():
         feedback="Initial draft — needs significant improvement.",
     )
 
-    print(f"  Initial draft (quality: {initial.quality_score}/10):")
-    print(f"    \"{initial.content}\"")
-    print()
-
-    await flock.publish(initial)
-    await flock.run_until_idle()
+    # A durable blackboard may already hold this topic's loop: seed it once,
+    # then let run_until() resume whatever was unfinished.
+    if await store.latest(EssayDraft, "iteration", topic=initial.topic) is None:
+        print(f"  Initial draft (quality: {initial.quality_score}/10):")
+        print(f"    \"{initial.content}\"")
+        print()
+        await flock.publish(initial)
+    else:
+        print(f"  Resuming \"{initial.topic}\" from {store.path}")
+        print()
 
-    # Retrieve ALL drafts to see the evolution
-    all_drafts = await flock.store.get_by_type(EssayDraft)
+    # The loop is over once a draft of this topic meets the stop condition,
+    # the negation of the refiner's where=. run_until() returns right then
+    # (or at once, if a resumed loop had already finished).
+    finished = await run_until(
+        flock,
+        EssayDraft,
+        where=(F.topic == initial.topic)
+        & ((F.quality_score >= QUALITY_THRESHOLD) | (F.iteration >= MAX_ITERATIONS)),
+        timeout=LOOP_TIMEOUT,
+    )
+    if not finished:
+        print(f"  No final draft: the loop stopped early or {LOOP_TIMEOUT}s passed")
+        print()
 
-    # Sort by iteration
-    all_drafts.sort(key=lambda d: d.iteration)
+    # Retrieve this topic's drafts to see the evolution, already in
+    # iteration order (read straight from the index, no sort)
+    all_drafts = await store.find(EssayDraft, topic=initial.topic, order_by="iteration")
 
     print("  ITERATION HISTORY:")
     print("  " + "-" * 40)
@@ -122,12 +170,16 @@ async def main():
             print(f"    Feedback: {draft.feedback[:100]}...")
         print()
 
-    final = all_drafts[-1]
+    final = await store.latest(EssayDraft, "iteration", topic=initial.topic)
     if final.quality_score >= QUALITY_THRESHOLD:
         print(f"  Loop ended: quality target reached ({final.quality_score}/{QUALITY_THRESHOLD})")
     elif final.iteration >= MAX_ITERATIONS:
         print(f"  Loop ended: max iterations reached ({final.iteration}/{MAX_ITERATIONS})")
 
+    if isinstance(store, DurableBlackboardStore):
+        for line in store.summary() + resume.summary():
+            print(f"  {line}")
+
     print()
     print("=" * 60)
 
@@ -151,6 +203,24 @@ if __name__ == "__main__":
 # EXPERIMENT 3: Different Starting Quality
 # Start with quality_score=6 (already decent). Fewer iterations?
 #
+# EXPERIMENT 4: Query the Index
+# Seed two topics, then ask for one topic's drafts from iteration 1 on:
+#   from shared.flock_store import Range
+#   await store.find(EssayDraft, topic=..., iteration=Range(1, None))
+# Check store.index_hits vs store.scans — a query on `quality_score` alone
+# is not covered by the (topic, iteration) index and falls back to a scan.
+#
+# EXPERIMENT 5: Crash and Resume
+# Run with FLOCK_BLACKBOARD=1 and press Ctrl+C while the refiner is working.
+# Run again: the "Resumed:" line shows the draft that was re-offered, and the
+# history continues from the last finished iteration. Delete
+# .cache/blackboard to start from scratch.
+#
+# EXPERIMENT 6: Bounded History
+# Set retention to Retention(last=2, per="topic", spill=".cache/spill"). The
+# history now shows the last two drafts; `await store.spilled(EssayDraft)`
+# returns the evicted ones from disk, and store.evicted counts them.
+#
 # COMPARE: The AF version uses explicit graph cycles with state.
 # Which approach makes the loop logic more obvious?
 # ============================================================================
@@ -0,0 +1,10 @@
+"""
+Shared runtime helpers for the workshop examples.
+
+The numbered modules are written to be read top to bottom. The helpers in
+this package are what those same pipelines need once they run inside one
+long-lived process: shared clients, caching, limits, and scheduling.
+
+Each example adds the repository root to sys.path before importing from
+`shared`, so `uv run <module>/<framework>/<script>.py` keeps working.
+"""
@@ -0,0 +1,367 @@
+"""
+Agent Framework executors for the shared runtime helpers.
+
+Drop-in AgentExecutor subclasses; the workflow graph is unchanged:
+
+    AgentExecutor(agent)  →  DeadlineAgentExecutor(agent, timeout=30)
+    AgentExecutor(agent)  →  HedgedAgentExecutor(agent, policy=hedge_policy())
+    AgentExecutor(agent)  →  BranchAgentExecutor(agent, aggregator=join)
+
+where `join` is the fan-in target, an IncrementalAggregator subclass. Give
+the aggregator a `complete_when` condition (first_k, quorum, when_any) and the
+join closes as soon as the outcome is decided: unfinished branches are
+cancelled and send an empty response instead of waiting for their agent.
+
+All of them bound their agent call by the run's deadline (shared/deadlines.py)
+and their own `timeout`. A branch that runs out of time answers the join with
+an empty response too, so the aggregator closes with partial results.
+"""
+
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable, Hashable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from typing_extensions import Never
+
+from agent_framework import (
+    AgentExecutor,
+    AgentExecutorResponse,
+    AgentResponse,
+    AgentResponseUpdate,
+    AgentSession,
+    Content,
+    Executor,
+    SupportsAgentRun,
+    WorkflowContext,
+    WorkflowEvent,
+)
+from agent_framework._workflows._const import WORKFLOW_RUN_KWARGS_KEY
+
+from shared.deadlines import DeadlineExceeded, time_budget, within
+from shared.hedging import HedgePolicy
+
+
+class DeadlineAgentExecutor(AgentExecutor):
+    """AgentExecutor whose agent call is bounded in time.
+
+    The budget is `timeout` (this executor's own limit) capped by the time
+    left on the run's deadline; past it the call is cancelled and the
+    executor raises DeadlineExceeded. With neither, it behaves exactly like
+    AgentExecutor.
+    """
+
+    def __init__(
+        self,
+        agent: SupportsAgentRun,
+        *,
+        timeout: float | None = None,
+        session: AgentSession | None = None,
+        id: str | None = None,
+    ) -> None:
+        super().__init__(agent, session=session, id=id)
+        self.timeout = timeout
+
+    async def _within_budget(
+        self, run: Awaitable[AgentResponse | None], ctx: WorkflowContext[Any, Any]
+    ) -> AgentResponse | None:
+        budget = time_budget(ctx, self.timeout)
+        if budget is None:
+            return await run
+        return await within(budget, run, f"Executor {self.id!r}")
+
+    async def _run_agent(self, ctx: WorkflowContext[Never, AgentResponse]) -> AgentResponse | None:
+        return await self._within_budget(super()._run_agent(ctx), ctx)
+
+    async def _run_agent_streaming(self, ctx: WorkflowContext[Never, AgentResponseUpdate]) -> AgentResponse | None:
+        return await self._within_budget(super()._run_agent_streaming(ctx), ctx)
+
+
+class HedgedAgentExecutor(DeadlineAgentExecutor):
+    """AgentExecutor that hedges slow non-streaming agent runs.
+
+    The duplicate run gets its own copy of the session so the two attempts
+    never write into the same history; if the duplicate wins, its session
+    becomes the executor's session. Streaming runs are not hedged.
+    With policy=None this behaves exactly like DeadlineAgentExecutor.
+    """
+
+    def __init__(
+        self,
+        agent: SupportsAgentRun,
+        *,
+        policy: HedgePolicy | None = None,
+        timeout: float | None = None,
+        session: AgentSession | None = None,
+        id: str | None = None,
+    ) -> None:
+        super().__init__(agent, timeout=timeout, session=session, id=id)
+        self.policy = policy
+
+    async def _run_agent(self, ctx: WorkflowContext[Never, AgentResponse]) -> AgentResponse | None:
+        if self.policy is None:
+            return await super()._run_agent(ctx)
+        # Primary and hedge share one budget.
+        return await self._within_budget(self._run_hedged(ctx), ctx)
+
+    async def _run_hedged(self, ctx: WorkflowContext[Never, AgentResponse]) -> AgentResponse | None:
+        run_kwargs, options = self._prepare_agent_run_args(ctx.get_state(WORKFLOW_RUN_KWARGS_KEY, {}))
+        messages = list(self._cache)
+        snapshot = self._session.to_dict()
+        hedge_session: AgentSession | None = None
+
+        async def primary() -> AgentResponse:
+            return await self._agent.run(
+                messages, stream=False, session=self._session, options=options, **run_kwargs
+            )
+
+        async def hedge() -> AgentResponse:
+            nonlocal hedge_session
+            hedge_session = AgentSession.from_dict(snapshot)
+            return await self._agent.run(
+                messages, stream=False, session=hedge_session, options=options, **run_kwargs
+            )
+
+        response, hedge_won = await self.policy.run(primary, hedge)
+        if hedge_won and hedge_session is not None:
+            self._session = hedge_session
+
+        # Same tail as AgentExecutor._run_agent.
+        await ctx.yield_output(response)
+        if response.user_input_requests:
+            for user_input_request in response.user_input_requests:
+                self._pending_agent_requests[user_input_request.id] = user_input_request  # type: ignore[index]
+                await ctx.request_info(user_input_request, Content)
+            return None
+        return response
+
+
+# ============================================================================
+# Incremental fan-in
+# ============================================================================
+
+# (responses received so far by branch id, number of branches) -> decided?
+FanInCondition = Callable[[Mapping[str, AgentExecutorResponse], int], bool]
+
+
+def first_k(k: int) -> FanInCondition:
+    """Decided once any `k` branches have answered."""
+    return lambda received, total: len(received) >= k
+
+
+def quorum(
+    vote: Callable[[AgentExecutorResponse], Hashable | None], size: int | None = None
+) -> FanInCondition:
+    """Decided once `size` branches (default: a majority) cast the same vote.
+
+    `vote` maps a response to its verdict; None abstains.
+    """
+    def decided(received: Mapping[str, AgentExecutorResponse], total: int) -> bool:
+        needed = size or total // 2 + 1
+        votes = Counter(v for v in map(vote, received.values()) if v is not None)
+        return any(count >= needed for count in votes.values())
+
+    return decided
+
+
+def when_any(predicate: Callable[[AgentExecutorResponse], bool]) -> FanInCondition:
+    """Decided as soon as one response satisfies `predicate`."""
+    return lambda received, total: any(predicate(r) for r in received.values())
+
+
+@dataclass
+class FanInProgress:
+    """Payload of the 'data' event an IncrementalAggregator emits per branch."""
+    executor_id: str                     # the branch that just completed
+    completed: list[str] = field(default_factory=list)
+    pending: list[str] = field(default_factory=list)
+    partial: Any = None                  # whatever on_branch() returned
+    decided: bool = False                # complete_when fired; pending branches are cancelled
+    timed_out: bool = False              # the branch ran out of time and sent no response
+
+
+class IncrementalAggregator(Executor):
+    """Fan-in target that sees each branch response as soon as it completes.
+
+    The fan-in edge still delivers the full list when the join closes. Before
+    that, every BranchAgentExecutor built with `aggregator=self` hands over
+    its response the moment its agent returns: on_branch() updates partial
+    state and may return a partial result, which goes out as a 'data' event
+    carrying FanInProgress — visible at once with workflow.run(stream=True).
+
+    With `complete_when`, the first arrival that makes the condition true
+    cancels every branch still running; those branches answer the join with
+    an empty response, so it closes without waiting for them. Branches that
+    run out of time do the same and are listed in `timed_out`.
+
+    Subclasses keep their own @handler for the list and call complete() in it.
+    Partial state belongs to one workflow run: the first branch of a new run
+    clears whatever a failed or cancelled run left behind. It lives on the
+    executor instance, so one instance (and the workflow holding it) must
+    not serve two runs at the same time; build a workflow per concurrent run.
+    """
+
+    def __init__(self, id: str, *, complete_when: FanInCondition | None = None, **kwargs: Any) -> None:
+        super().__init__(id=id, **kwargs)
+        self.complete_when = complete_when
+        self.branches: dict[str, BranchAgentExecutor] = {}
+        self.received: dict[str, AgentExecutorResponse] = {}
+        self.timed_out: list[str] = []
+        self.decided = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def branch_ids(self) -> list[str]:
+        return list(self.branches)
+
+    def track(self, branch: "BranchAgentExecutor") -> None:
+        self.branches.setdefault(branch.id, branch)
+
+    def _pending(self) -> list[str]:
+        return [b for b in self.branches if b not in self.received and b not in self.timed_out]
+
+    def _enter_run(self, ctx: WorkflowContext[Any, Any]) -> None:
+        # Workflow state is cleared when a run starts, so a missing marker
+        # means this is the first branch of a new run.
+        # (Underscore-prefixed keys are reserved by State.)
+        marker = f"fan_in_run:{self.id}"
+        if ctx.get_state(marker) is None:
+            ctx.set_state(marker, True)
+            self.received = {}
+            self.timed_out = []
+            self.decided = False
+
+    async def on_branch(self, response: AgentExecutorResponse) -> Any:
+        """Fold one branch response into partial state; return a partial result or None."""
+        return None
+
+    async def branch_completed(self, response: AgentExecutorResponse, ctx: WorkflowContext[Any, Any]) -> None:
+        # Called from the branch's own superstep, with the branch's context.
+        async with self._lock:
+            self._enter_run(ctx)
+            self.received[response.executor_id] = response
+            partial = await self.on_branch(response)
+            pending = self._pending()
+            decide = (
+                not self.decided
+                and bool(pending)
+                and self.complete_when is not None
+                and self.complete_when(self.received, len(self.branches))
+            )
+            if decide:
+                self.decided = True
+            progress = FanInProgress(
+                executor_id=response.executor_id,
+                completed=list(self.received),
+                pending=pending,
+                partial=partial,
+                decided=self.decided,
+            )
+            await ctx.add_event(WorkflowEvent.emit(self.id, progress))
+            if decide:
+                for branch_id in pending:
+                    self.branches[branch_id].stop()
+
+    async def branch_timed_out(self, branch_id: str, ctx: WorkflowContext[Any, Any]) -> None:
+        async with self._lock:
+            self._enter_run(ctx)
+            self.timed_out.append(branch_id)
+            progress = FanInProgress(
+                executor_id=branch_id,
+                completed=list(self.received),
+                pending=self._pending(),
+                decided=self.decided,
+                timed_out=True,
+            )
+            await ctx.add_event(WorkflowEvent.emit(self.id, progress))
+
+    def complete(self, results: Sequence[AgentExecutorResponse]) -> dict[str, AgentExecutorResponse]:
+        """Responses by branch id, in arrival order; resets partial state for the next run.
+
+        Branches cancelled by complete_when or out of time are left out (read
+        `timed_out` before calling this). Branches that are not
+        BranchAgentExecutors only show up here, from the joined list.
+        """
+        merged = dict(self.received)
+        for response in results:
+            if response.executor_id not in self.branches:
+                merged.setdefault(response.executor_id, response)
+        self.received = {}
+        self.timed_out = []
+        self.decided = False
+        return merged
+
+
+class BranchAgentExecutor(HedgedAgentExecutor):
+    """Fan-out branch that reports its response to an IncrementalAggregator.
+
+    A branch's tokens are read by the aggregator, not by a person, so in a
+    streaming workflow the agent still runs as one (cacheable, hedgeable)
+    call unless `stream_tokens=True`. stop() cancels the agent call in flight
+    (its connection and rate-limit slot are released) and the branch sends
+    an empty response to the join; so does running out of time.
+    """
+
+    def __init__(
+        self,
+        agent: SupportsAgentRun,
+        *,
+        aggregator: IncrementalAggregator | None = None,
+        stream_tokens: bool = False,
+        policy: HedgePolicy | None = None,
+        timeout: float | None = None,
+        session: AgentSession | None = None,
+        id: str | None = None,
+    ) -> None:
+        super().__init__(agent, policy=policy, timeout=timeout, session=session, id=id)
+        self.aggregator = aggregator
+        self.stream_tokens = stream_tokens
+        self._task: asyncio.Future[AgentResponse | None] | None = None
+        self._stopped = False
+        if aggregator is not None:
+            aggregator.track(self)
+
+    def stop(self) -> None:
+        """Cancel this branch's agent call; the join gets an empty response."""
+        self._stopped = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _run_until_decided(
+        self, run: Awaitable[AgentResponse | None], ctx: WorkflowContext[Any, Any]
+    ) -> AgentResponse | None:
+        if self.aggregator is not None:
+            self.aggregator._enter_run(ctx)
+        self._stopped = self.aggregator is not None and self.aggregator.decided
+        if self._stopped:
+            run.close()  # type: ignore[attr-defined]
+            return AgentResponse(messages=[])
+
+        self._task = asyncio.ensure_future(run)
+        try:
+            response = await self._task
+        except asyncio.CancelledError:
+            if not (self._stopped and self._task.cancelled()):
+                raise
+            return AgentResponse(messages=[])
+        except DeadlineExceeded:
+            if self.aggregator is None:
+                raise
+            # Partial result: the join closes without this branch.
+            await self.aggregator.branch_timed_out(self.id, ctx)
+            return AgentResponse(messages=[])
+        finally:
+            self._task = None
+
+        if response is not None and self.aggregator is not None:
+            await self.aggregator.branch_completed(AgentExecutorResponse(self.id, response), ctx)
+        return response
+
+    async def _run_agent(self, ctx: WorkflowContext[Never, AgentResponse]) -> AgentResponse | None:
+        return await self._run_until_decided(super()._run_agent(ctx), ctx)
+
+    async def _run_agent_streaming(self, ctx: WorkflowContext[Never, AgentResponseUpdate]) -> AgentResponse | None:
+        if not self.stream_tokens:
+            return await self._run_agent(ctx)  # type: ignore[arg-type]
+        return await self._run_until_decided(super()._run_agent_streaming(ctx), ctx)
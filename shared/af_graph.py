@@ -0,0 +1,58 @@
+"""
+Graph-Building Helpers for Agent Framework Workflows
+
+Typed dispatch
+--------------
+Switch-case edge groups test their Case predicates in order, once per
+message. When a message is routed by string parsing, every predicate parses
+it again — and Default means "no predicate matched", so it pays for all of
+them. With typed messages the decision is already made by the sender, and
+routing only has to look at the message's type.
+
+KEY CONCEPTS:
+- dispatch_cases({MessageType: target, ...}, default=...) builds the Case /
+  Default list for add_switch_case_edge_group()
+- The table is compiled once; each predicate is a single dict lookup on
+  type(message), so a hop costs the same however many routes there are
+- Predicates are named after their type (e.g. `is_RefineDraft`), which keeps
+  the edge group readable in serialized workflows and checkpoints
+"""
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from agent_framework import Case, Default, Executor
+
+
+def _type_predicate(table: Mapping[type, str], target_id: str, name: str) -> Callable[[Any], bool]:
+    def predicate(message: Any) -> bool:
+        return table.get(type(message)) == target_id
+
+    predicate.__name__ = predicate.__qualname__ = f"is_{name}"
+    return predicate
+
+
+def dispatch_cases(
+    table: Mapping[type, Executor],
+    default: Executor | None = None,
+) -> list[Case | Default]:
+    """Switch-case list that routes each message by its exact type.
+
+    Without `default`, the last table entry is the Default branch, so its
+    predicate is never evaluated.
+    """
+    if not table:
+        raise ValueError("dispatch_cases needs at least one route.")
+    routes = list(table.items())
+    if default is None:
+        *routes, (_, default) = routes
+    compiled = {message_type: target.id for message_type, target in routes}
+    cases: list[Case | Default] = [
+        Case(
+            condition=_type_predicate(compiled, target.id, message_type.__name__),
+            target=target,
+        )
+        for message_type, target in routes
+    ]
+    cases.append(Default(target=default))
+    return cases
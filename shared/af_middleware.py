@@ -0,0 +1,140 @@
+"""
+Agent Framework middleware for the shared runtime helpers.
+
+Each class plugs one `shared` helper into the chat pipeline. Attach per agent:
+
+    client.as_agent(name=..., instructions=..., middleware=runtime_middleware())
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Any
+
+from agent_framework import ChatContext, ChatMiddleware, ChatResponse
+from pydantic import BaseModel
+
+from shared.cache import ResponseCache, default_cache, make_key
+from shared.limits import RateLimiter, default_limiter, estimate_tokens
+
+
+class ResponseCacheMiddleware(ChatMiddleware):
+    """Serve repeated chat calls from a ResponseCache.
+
+    The key covers the model id, the agent instructions, every message the
+    client is about to send (session history included) and every option that
+    shapes the answer: sampling (temperature, top_p, seed, ...), max_tokens,
+    tools and tool_choice, response_format. Only bookkeeping options
+    (metadata, user, store) are left out. Streaming calls pass straight
+    through.
+    """
+
+    def __init__(self, cache: ResponseCache) -> None:
+        self.cache = cache
+
+    async def process(self, context: ChatContext, call_next) -> None:
+        if context.stream:
+            await call_next()
+            return
+
+        options = context.options or {}
+        model = options.get("model_id") or getattr(context.client, "model_id", None) or ""
+        key = make_key(
+            model,
+            options.get("instructions") or "",
+            {
+                "messages": [message.to_dict() for message in context.messages],
+                "options": _keyed_options(options),
+            },
+        )
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            context.result = ChatResponse.from_dict(json.loads(cached))
+            return
+
+        await call_next()
+        if isinstance(context.result, ChatResponse) and context.result.messages:
+            self.cache.put(key, context.result.to_json())
+
+
+# Options that never change the response; model_id and instructions are
+# keyed on their own.
+_UNKEYED_OPTIONS = {"model_id", "instructions", "metadata", "user", "store"}
+
+
+def _keyed_options(options: Mapping[str, Any]) -> dict[str, Any]:
+    keyed = {}
+    for name, value in options.items():
+        if name in _UNKEYED_OPTIONS or value is None:
+            continue
+        if name == "tools":
+            tools = value if isinstance(value, list | tuple) else [value]
+            value = [_tool_spec(tool) for tool in tools]
+        elif isinstance(value, type) and issubclass(value, BaseModel):
+            value = value.model_json_schema()
+        keyed[name] = value
+    return keyed
+
+
+def _tool_spec(tool: Any) -> Any:
+    if hasattr(tool, "to_json_schema_spec"):
+        return tool.to_json_schema_spec()
+    if callable(tool):
+        return f"{tool.__module__}.{tool.__qualname__}"
+    return tool
+
+
+def response_cache_middleware(cache: ResponseCache | None = None) -> list[ChatMiddleware]:
+    """Middleware list for as_agent(): empty when the cache is disabled."""
+    cache = cache or default_cache()
+    return [ResponseCacheMiddleware(cache)] if cache is not None else []
+
+
+class RateLimitMiddleware(ChatMiddleware):
+    """Admit each chat call through a shared RateLimiter.
+
+    Non-streaming calls are retried on 429 with the limiter's backoff and
+    reconciled against the reported token usage. Streaming calls hold their
+    slot until the stream is consumed.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    async def process(self, context: ChatContext, call_next) -> None:
+        options = context.options or {}
+        prompt = (options.get("instructions") or "") + "".join(
+            message.text or "" for message in context.messages
+        )
+        estimated = estimate_tokens(prompt, options.get("max_tokens"))
+
+        if context.stream:
+            lease = await self.limiter.acquire(estimated)
+            try:
+                await call_next()
+            except BaseException:
+                await lease.release()
+                raise
+            context.stream_cleanup_hooks.append(lease.release)
+            return
+
+        await self.limiter.run(
+            call_next, estimated_tokens=estimated, usage=lambda _: _usage(context)
+        )
+
+
+def _usage(context: ChatContext) -> int | None:
+    if not isinstance(context.result, ChatResponse) or not context.result.usage_details:
+        return None
+    return context.result.usage_details.get("total_token_count")
+
+
+def rate_limit_middleware(limiter: RateLimiter | None = None) -> list[ChatMiddleware]:
+    """Middleware list for as_agent(): empty when no limit is configured."""
+    limiter = limiter or default_limiter()
+    return [RateLimitMiddleware(limiter)] if limiter is not None else []
+
+
+def runtime_middleware() -> list[ChatMiddleware]:
+    """Every enabled shared helper, in order: cache hits never take a rate-limit slot."""
+    return [*response_cache_middleware(), *rate_limit_middleware()]
@@ -0,0 +1,283 @@
+"""
+Critical-Path Profiling for Workflow Runs (Agent Framework)
+
+"The fan-out took 14 s" does not say which branch gated the join, or how much
+of it was model time and how much was waiting on superstep barriers.
+RunProfiler watches a streamed run and turns the workflow's lifecycle events
+into a timeline: one span per executor invocation, one per superstep, and the
+chain of spans that actually determined the end-to-end time.
+
+KEY CONCEPTS:
+- Each span records queued (its input was sent), started and finished; the
+  gap between queued and started is orchestration wait, not model time
+- A span's input comes from the predecessor (per the graph's edges) that
+  finished last in the previous superstep — the one that gated it
+- The critical path follows those gating predecessors back from the span that
+  finished last; busy vs. waiting along it explains the wall time
+- Events are timestamped when executors emit them, not when the caller
+  reads them, so a slow consumer does not skew the timeline
+- Export as JSON (RunProfile.to_dict) or as Chrome trace events
+  (chrome://tracing, https://ui.perfetto.dev) for a Gantt view
+- Opt-in: with WORKFLOW_PROFILE=1 watch() records and writes both files under
+  .cache/profiles/; otherwise it passes events through untouched
+"""
+
+import json
+import time
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from agent_framework import Workflow, WorkflowEvent
+
+from shared.env import clean_env, env_flag
+
+
+DEFAULT_PROFILE_PATH = ".cache/profiles"
+
+
+@dataclass
+class ExecutorSpan:
+    """One executor invocation; times are seconds since the run started."""
+    executor_id: str
+    superstep: int                       # 0: the start executor, before the first superstep
+    queued: float = 0.0                  # input sent (gating predecessor finished)
+    started: float = 0.0
+    finished: float | None = None
+    failed: bool = False
+    gated_by: int | None = None          # index of the span whose output started this one
+    critical: bool = False
+
+    @property
+    def wait(self) -> float:
+        return self.started - self.queued
+
+    @property
+    def duration(self) -> float:
+        return (self.finished if self.finished is not None else self.started) - self.started
+
+
+@dataclass
+class SuperstepSpan:
+    index: int
+    started: float
+    finished: float | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.finished if self.finished is not None else self.started) - self.started
+
+
+@dataclass
+class RunProfile:
+    """Timeline of one workflow run."""
+    workflow: str
+    started_at: float                    # wall clock (time.time()) at run start
+    elapsed: float = 0.0
+    spans: list[ExecutorSpan] = field(default_factory=list)
+    supersteps: list[SuperstepSpan] = field(default_factory=list)
+
+    @property
+    def critical_path(self) -> list[ExecutorSpan]:
+        return [span for span in self.spans if span.critical]
+
+    def summary(self) -> dict[str, Any]:
+        path = self.critical_path
+        busy = sum(span.duration for span in path)
+        wait = sum(span.wait for span in path)
+        return {
+            "elapsed": self.elapsed,
+            "critical_path": [span.executor_id for span in path],
+            "critical_busy": busy,
+            "critical_wait": wait,
+            "overhead": self.elapsed - busy - wait,      # neither in an executor nor queued for one
+            "supersteps": {step.index: step.duration for step in self.supersteps},
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "workflow": self.workflow,
+            "started_at": self.started_at,
+            "summary": self.summary(),
+            "spans": [
+                {**asdict(span), "wait": span.wait, "duration": span.duration} for span in self.spans
+            ],
+            "supersteps": [{**asdict(step), "duration": step.duration} for step in self.supersteps],
+        }
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Trace-event JSON: supersteps on lane 0, one lane per executor."""
+        lanes: dict[str, int] = {}
+        for span in self.spans:
+            lanes.setdefault(span.executor_id, len(lanes) + 1)
+
+        def us(seconds: float) -> float:
+            return round(seconds * 1_000_000, 1)
+
+        events: list[dict[str, Any]] = [
+            {"ph": "M", "pid": 1, "name": "process_name", "args": {"name": self.workflow}},
+            {"ph": "M", "pid": 1, "tid": 0, "name": "thread_name", "args": {"name": "supersteps"}},
+        ]
+        events += [
+            {"ph": "M", "pid": 1, "tid": tid, "name": "thread_name", "args": {"name": executor_id}}
+            for executor_id, tid in lanes.items()
+        ]
+        events += [
+            {
+                "ph": "X", "pid": 1, "tid": 0, "cat": "superstep",
+                "name": f"superstep {step.index}", "ts": us(step.started), "dur": us(step.duration),
+            }
+            for step in self.supersteps
+        ]
+        for span in self.spans:
+            tid = lanes[span.executor_id]
+            if span.wait > 0:
+                events.append({
+                    "ph": "X", "pid": 1, "tid": tid, "cat": "queue",
+                    "name": "queued", "ts": us(span.queued), "dur": us(span.wait),
+                })
+            events.append({
+                "ph": "X", "pid": 1, "tid": tid,
+                "cat": "executor,critical" if span.critical else "executor",
+                "name": span.executor_id, "ts": us(span.started), "dur": us(span.duration),
+                "args": {"superstep": span.superstep, "critical": span.critical, "failed": span.failed},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, directory: str | Path) -> tuple[Path, Path]:
+        """Write <workflow>-<timestamp>.json and .trace.json; returns both paths."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.workflow)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        stem = f"{name}-{stamp}-{int(self.started_at * 1000) % 1000:03d}"
+        profile_path = directory / f"{stem}.json"
+        trace_path = directory / f"{stem}.trace.json"
+        profile_path.write_text(json.dumps(self.to_dict(), indent=2), "utf-8")
+        trace_path.write_text(json.dumps(self.to_chrome_trace()), "utf-8")
+        return profile_path, trace_path
+
+
+class RunProfiler:
+    """Records a RunProfile from the event stream of workflow.run(stream=True).
+
+        profiler = RunProfiler(workflow)
+        async for event in profiler.watch(workflow.run(message, stream=True)):
+            ...
+        for line in profiler.summary():
+            print(line)
+
+    `enabled` defaults to WORKFLOW_PROFILE; `path` (WORKFLOW_PROFILE_PATH,
+    default .cache/profiles) receives the JSON and trace files, None keeps
+    the profile in memory only.
+    """
+
+    def __init__(
+        self,
+        workflow: Workflow,
+        *,
+        enabled: bool | None = None,
+        path: str | Path | None = None,
+    ) -> None:
+        self.workflow = workflow
+        self.enabled = env_flag("WORKFLOW_PROFILE") if enabled is None else enabled
+        if path is None and enabled is None:
+            path = clean_env("WORKFLOW_PROFILE_PATH") or DEFAULT_PROFILE_PATH
+        self.path = Path(path) if path is not None else None
+        self.predecessors: dict[str, set[str]] = {}
+        for group in workflow.edge_groups:
+            for edge in group.edges:
+                self.predecessors.setdefault(edge.target_id, set()).add(edge.source_id)
+        self.profile: RunProfile | None = None
+        self.saved: tuple[Path, Path] | None = None
+        self._stamps: dict[int, float] = {}
+
+    async def watch(self, events: AsyncIterable[WorkflowEvent]) -> AsyncIterator[WorkflowEvent]:
+        """Pass every event through, recording the run's timeline when enabled."""
+        if not self.enabled:
+            async for event in events:
+                yield event
+            return
+
+        context = self.workflow._runner_context
+        add_event = context.add_event
+
+        async def stamped(event: WorkflowEvent) -> None:
+            # Time of emission; the caller may read the event much later.
+            self._stamps[id(event)] = time.perf_counter()
+            await add_event(event)
+
+        origin = time.perf_counter()
+        profile = RunProfile(workflow=self.workflow.name, started_at=time.time())
+        open_spans: dict[str, list[ExecutorSpan]] = {}
+        superstep = 0
+        self.profile, self.saved = profile, None
+        context.add_event = stamped  # type: ignore[method-assign]
+        try:
+            async for event in events:
+                at = self._stamps.pop(id(event), time.perf_counter()) - origin
+                if event.type == "superstep_started":
+                    superstep = event.iteration or superstep + 1
+                    profile.supersteps.append(SuperstepSpan(superstep, started=at))
+                elif event.type == "superstep_completed" and profile.supersteps:
+                    profile.supersteps[-1].finished = at
+                elif event.type == "executor_invoked" and event.executor_id:
+                    span = ExecutorSpan(event.executor_id, superstep, started=at)
+                    profile.spans.append(span)
+                    open_spans.setdefault(event.executor_id, []).append(span)
+                elif event.type in ("executor_completed", "executor_failed") and open_spans.get(event.executor_id):
+                    span = open_spans[event.executor_id].pop(0)
+                    span.finished = at
+                    span.failed = event.type == "executor_failed"
+                yield event
+        finally:
+            del context.add_event
+            self._stamps.clear()
+            profile.elapsed = time.perf_counter() - origin
+            self._link(profile)
+            if self.path is not None:
+                self.saved = profile.save(self.path)
+
+    def _link(self, profile: RunProfile) -> None:
+        """Fill in queue times and gating spans, then mark the critical path."""
+        finished_by_step: dict[int, list[int]] = {}
+        for index, span in enumerate(profile.spans):
+            if span.finished is not None:
+                finished_by_step.setdefault(span.superstep, []).append(index)
+
+        step_starts = {step.index: step.started for step in profile.supersteps}
+        for span in profile.spans:
+            if span.superstep == 0:
+                continue  # the start executor's input is the run's input
+            sources = self.predecessors.get(span.executor_id, set())
+            feeders = [
+                i for i in finished_by_step.get(span.superstep - 1, [])
+                if profile.spans[i].executor_id in sources
+            ]
+            if feeders:
+                span.gated_by = max(feeders, key=lambda i: profile.spans[i].finished or 0.0)
+                span.queued = profile.spans[span.gated_by].finished or 0.0
+            else:
+                span.queued = step_starts.get(span.superstep, span.started)
+
+        ended = [i for i, span in enumerate(profile.spans) if span.finished is not None]
+        index = max(ended, key=lambda i: profile.spans[i].finished or 0.0) if ended else None
+        while index is not None:
+            profile.spans[index].critical = True
+            index = profile.spans[index].gated_by
+
+    def summary(self) -> list[str]:
+        """One-line report of the last run (empty when profiling is off)."""
+        if self.profile is None:
+            return []
+        report = self.profile.summary()
+        lines = [
+            f"Profile: {report['elapsed']:.2f}s wall; critical path "
+            f"{' → '.join(report['critical_path']) or '(none)'} = "
+            f"{report['critical_busy']:.2f}s in executors, {report['critical_wait']:.2f}s queued, "
+            f"{report['overhead']:.2f}s outside executors"
+        ]
+        if self.saved is not None:
+            lines.append(f"Profile written to {self.saved[0]} (Chrome trace: {self.saved[1]})")
+        return lines
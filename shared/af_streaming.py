@@ -0,0 +1,92 @@
+"""
+Early-Exit Streaming for Agent Decisions (Agent Framework)
+
+A classifier that answers "ROUTE: senior" and then keeps writing makes the
+workflow wait for the whole completion before it can route. stream_until()
+streams the agent run instead, hands the text received so far to a parser
+after every update and, as soon as the parser returns a value, closes the
+provider stream so nothing more is generated or billed.
+
+KEY CONCEPTS:
+- parse(text_so_far) returns the decision, or None for "not yet"
+- Decision latency ≈ time to the deciding tokens, not to the full answer
+- Early exit closes the provider's HTTP stream and runs the stream's cleanup
+  hooks, so a rate-limit slot held by the stream is released
+- StreamDecision reports time to first token and time to decision
+"""
+
+import contextlib
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from agent_framework import ResponseStream, SupportsAgentRun
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class StreamDecision(Generic[T]):
+    value: T | None                      # None: the stream ended without a decision
+    text: str                            # text received before the decision
+    early: bool = False                  # decided before the stream finished
+    first_token: float | None = None     # seconds until the first text arrived
+    elapsed: float = 0.0                 # seconds until the decision (or the end)
+
+
+async def close_stream(stream: ResponseStream[Any, Any]) -> None:
+    """Abandon a partly consumed stream: close the provider stream, run cleanup hooks.
+
+    Agent streams wrap the chat client's stream; every layer is closed,
+    innermost first. Generators nested inside a layer (the provider's HTTP
+    stream) are finalized by the event loop once the layer lets go of them.
+    """
+    chain: list[ResponseStream[Any, Any]] = []
+    layer: Any = stream
+    while isinstance(layer, ResponseStream):
+        chain.append(layer)
+        layer = layer._inner_stream
+    for layer in reversed(chain):
+        source = layer._iterator or layer._stream
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            with contextlib.suppress(Exception):
+                await aclose()
+        await layer._run_cleanup_hooks()
+
+
+async def stream_until(
+    agent: SupportsAgentRun,
+    messages: Any,
+    parse: Callable[[str], T | None],
+    **run_kwargs: Any,
+) -> StreamDecision[T]:
+    """Stream `agent.run(messages)` until `parse` recognizes a decision in the text.
+
+    Extra keyword arguments (session=, options=, ...) go to agent.run().
+    """
+    started = time.monotonic()
+    decision: StreamDecision[T] = StreamDecision(value=None, text="")
+    stream = agent.run(messages, stream=True, **run_kwargs)
+    finished = False
+    try:
+        async for update in stream:
+            if not update.text:
+                continue
+            if decision.first_token is None:
+                decision.first_token = time.monotonic() - started
+            decision.text += update.text
+            decision.value = parse(decision.text)
+            if decision.value is not None:
+                decision.early = True
+                break
+        else:
+            finished = True
+    finally:
+        decision.elapsed = time.monotonic() - started
+        if not finished:
+            # Decided early, failed or cancelled: stop the generation.
+            await close_stream(stream)
+    return decision
@@ -0,0 +1,128 @@
+"""
+Concurrent Batch Execution for Built Workflows (Agent Framework)
+
+A built Workflow runs one input at a time — a second run() while the first
+is in flight raises. run_many() processes many independent inputs
+concurrently by giving every run its own workflow instance, so runs never
+share AgentExecutor sessions, message caches or runner state.
+
+KEY CONCEPTS:
+- `build` is a zero-argument factory returning a fresh Workflow per input
+- At most `max_concurrency` runs are in flight; inputs are pulled lazily, so
+  a generator of thousands of tickets is never materialized up front
+- run_many() returns results in input order; iter_many() yields them in
+  completion order, as soon as each run finishes
+- A failing run is reported in its BatchResult; the other runs continue.
+  An error raised by `inputs` itself ends the batch and is re-raised
+- `deadline=` gives every run its own time budget (shared/deadlines.py),
+  counted from when that run starts; a run past it fails with DeadlineExceeded
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework import Workflow, WorkflowRunResult
+
+from shared.deadlines import Deadline
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one input in a batch."""
+    index: int
+    input: Any
+    result: WorkflowRunResult | None = None
+    error: BaseException | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def outputs(self) -> list[Any]:
+        return self.result.get_outputs() if self.result is not None else []
+
+
+async def iter_many(
+    build: Callable[[], Workflow],
+    inputs: Iterable[Any],
+    *,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    deadline: float | None = None,
+    **run_kwargs: Any,
+) -> AsyncIterator[BatchResult]:
+    """Run every input on its own workflow instance; yield results as they complete.
+
+    Extra keyword arguments are passed to each workflow.run() call.
+    With `deadline` (seconds), each run is bounded by its own Deadline.
+    Breaking out of the loop cancels the runs still in flight.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    pending = enumerate(inputs)
+    done: asyncio.Queue[BatchResult | Exception | None] = asyncio.Queue()
+
+    async def worker() -> None:
+        try:
+            # next() never awaits, so workers cannot take the same input twice.
+            for index, item in pending:
+                started = time.monotonic()
+                outcome = BatchResult(index=index, input=item)
+                try:
+                    if deadline is None:
+                        outcome.result = await build().run(item, **run_kwargs)
+                    else:
+                        bound = Deadline.after(deadline)
+                        async with bound.enforce():
+                            outcome.result = await build().run(item, **bound.run_kwargs(**run_kwargs))
+                except Exception as exc:
+                    outcome.error = exc
+                outcome.elapsed = time.monotonic() - started
+                done.put_nowait(outcome)
+        except Exception as exc:
+            done.put_nowait(exc)                 # `inputs` itself raised: the batch fails
+        finally:
+            done.put_nowait(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+    try:
+        remaining = len(workers)
+        while remaining:
+            outcome = await done.get()
+            if outcome is None:
+                remaining -= 1
+                continue
+            if isinstance(outcome, Exception):
+                raise outcome
+            yield outcome
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def run_many(
+    build: Callable[[], Workflow],
+    inputs: Iterable[Any],
+    *,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    deadline: float | None = None,
+    **run_kwargs: Any,
+) -> list[BatchResult]:
+    """Run every input concurrently; return one BatchResult per input, in input order."""
+    results = [
+        outcome
+        async for outcome in iter_many(
+            build, inputs, max_concurrency=max_concurrency, deadline=deadline, **run_kwargs
+        )
+    ]
+    results.sort(key=lambda outcome: outcome.index)
+    return results
@@ -0,0 +1,240 @@
+"""
+Content-Addressed Response Cache (framework-agnostic)
+
+Repeated fan-out inputs — the same product description, the same code
+snippet — should not pay full LLM latency twice. ResponseCache stores a
+response under the SHA-256 of everything that determines it: the model, the
+agent's instructions/description, and the message payload.
+
+KEY CONCEPTS:
+- Two tiers: a bounded in-memory LRU in front of a SQLite file (WAL mode)
+- TTL: entries older than `ttl` seconds are treated as misses and dropped
+- Size eviction: the LRU holds `max_entries`; the file holds `max_bytes`,
+  least recently used rows go first
+- snapshot() reports memory hits, disk hits, misses, writes and evictions
+- Opt-in: default_cache() returns None unless LLM_RESPONSE_CACHE is set
+
+Framework adapters live next to this module: ResponseCacheMiddleware in
+shared/af_middleware.py and CachedDSPyEngine in shared/flock_engines.py.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from shared.env import clean_env, env_flag, env_number
+
+
+DEFAULT_CACHE_PATH = ".cache/responses.sqlite3"
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_MB = 64.0
+DEFAULT_TTL = 24 * 3600.0
+
+
+def make_key(model: str, instructions: str, payload: Any) -> str:
+    """Content address for one LLM call.
+
+    `payload` is anything JSON-serializable (messages, artifact payloads).
+    Keys are stable across processes because the JSON is canonicalized.
+    """
+    blob = json.dumps(
+        {"model": model, "instructions": instructions, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """Two-tier (memory LRU → SQLite) cache of serialized responses.
+
+    Values are strings (usually JSON). All methods are synchronous and
+    thread-safe; each call is a handful of small SQLite statements, cheap
+    next to the LLM round trip it replaces.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = DEFAULT_CACHE_PATH,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+        ttl: float | None = DEFAULT_TTL,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # key -> (stored_at, value)
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            self._db = self._open(Path(path))
+
+    @staticmethod
+    def _open(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        return db
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key: str) -> str | None:
+        """Return the cached value, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, stored_at = row
+                    if not self._expired(stored_at, now):
+                        self._db.execute(
+                            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._remember(key, stored_at, value)
+                        self.stats.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value in both tiers, evicting as needed."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, stored_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), now, now),
+                )
+                self._evict_disk(now)
+            self.stats.writes += 1
+
+    def _remember(self, key: str, stored_at: float, value: str) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _evict_disk(self, now: float) -> None:
+        assert self._db is not None
+        if self.ttl is not None:
+            cur = self._db.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl,))
+            self.stats.evictions += max(cur.rowcount, 0)
+
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Walk rows oldest-access first until enough bytes are freed.
+        excess = total - self.max_bytes
+        victims: list[str] = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in victims])
+        self.stats.evictions += len(victims)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (stats are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def snapshot(self) -> dict[str, float]:
+        """Counters plus current tier sizes, for printing or metrics export."""
+        with self._lock:
+            data: dict[str, float] = asdict(self.stats)
+            data["hit_rate"] = self.stats.hit_rate
+            data["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                data["disk_entries"], data["disk_bytes"] = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def cache_from_env() -> ResponseCache | None:
+    """Build a cache from LLM_RESPONSE_CACHE / LLM_CACHE_* env vars, or None if off."""
+    if not env_flag("LLM_RESPONSE_CACHE"):
+        return None
+    path = clean_env("LLM_CACHE_PATH") or DEFAULT_CACHE_PATH
+    return ResponseCache(
+        None if path == ":memory:" else path,
+        max_entries=int(env_number("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(env_number("LLM_CACHE_MAX_MB", DEFAULT_MAX_MB) * 1024 * 1024),
+        ttl=env_number("LLM_CACHE_TTL", DEFAULT_TTL) or None,
+    )
+
+
+_default: ResponseCache | None = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache | None:
+    """Process-wide cache shared by both frameworks (None when disabled)."""
+    global _default, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            _default = cache_from_env()
+            _default_loaded = True
+        return _default
@@ -0,0 +1,254 @@
+"""
+Durable Workflow Checkpoints (Agent Framework)
+
+A long workflow that crashes in its fourth LLM call should not pay for the
+first three again. With a checkpoint storage on the WorkflowBuilder, the
+runner saves the whole run — workflow state (ctx.set_state), executor state
+and in-flight messages — after every superstep; workflow.run(checkpoint_id=...)
+picks the run up where the last completed superstep left it.
+
+KEY CONCEPTS:
+- SQLiteCheckpointStorage: one row per checkpoint in a WAL-mode SQLite file,
+  insert-only while a run is going, so a save is a single append
+- WORKFLOW_CHECKPOINTS=sqlite|file picks the store (file = Agent Framework's
+  FileCheckpointStorage, one JSON file per checkpoint); unset = no checkpoints
+- MeasuredCheckpointStorage wraps any store and records how long each
+  superstep's save took, so the overhead is visible next to the LLM time
+- latest_checkpoint() finds a run to resume; clear_checkpoints() drops a
+  finished run's history
+
+SECURITY WARNING: checkpoint values are pickled (Agent Framework's encoding).
+Only resume from checkpoint files you wrote yourself.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from agent_framework import (
+    CheckpointStorage,
+    FileCheckpointStorage,
+    WorkflowCheckpoint,
+    WorkflowCheckpointException,
+)
+from agent_framework._workflows._checkpoint_encoding import (
+    decode_checkpoint_value,
+    encode_checkpoint_value,
+)
+
+from shared.env import clean_env
+
+
+DEFAULT_SQLITE_PATH = ".cache/checkpoints.sqlite3"
+DEFAULT_FILE_PATH = ".cache/checkpoints"
+
+
+def _encode(checkpoint: WorkflowCheckpoint) -> str:
+    return json.dumps(encode_checkpoint_value(checkpoint.to_dict()), ensure_ascii=False)
+
+
+def _decode(data: str) -> WorkflowCheckpoint:
+    return WorkflowCheckpoint.from_dict(decode_checkpoint_value(json.loads(data)))
+
+
+class SQLiteCheckpointStorage:
+    """CheckpointStorage backed by one SQLite file.
+
+    Saves, loads and queries run in a worker thread so the event loop keeps
+    serving other executors while a checkpoint is written.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_SQLITE_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = self._open(self.path)
+
+    @staticmethod
+    def _open(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " checkpoint_id TEXT PRIMARY KEY,"
+            " workflow_name TEXT NOT NULL,"
+            " previous_id TEXT,"
+            " timestamp TEXT NOT NULL,"
+            " iteration INTEGER NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS checkpoints_workflow ON checkpoints (workflow_name, timestamp)"
+        )
+        return db
+
+    def _query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    async def save(self, checkpoint: WorkflowCheckpoint) -> str:
+        data = _encode(checkpoint)
+
+        def write() -> None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO checkpoints"
+                    " (checkpoint_id, workflow_name, previous_id, timestamp, iteration, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        checkpoint.checkpoint_id,
+                        checkpoint.workflow_name,
+                        checkpoint.previous_checkpoint_id,
+                        checkpoint.timestamp,
+                        checkpoint.iteration_count,
+                        data,
+                    ),
+                )
+
+        await asyncio.to_thread(write)
+        return checkpoint.checkpoint_id
+
+    async def load(self, checkpoint_id: str) -> WorkflowCheckpoint:
+        rows = await asyncio.to_thread(
+            self._query, "SELECT data FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)
+        )
+        if not rows:
+            raise WorkflowCheckpointException(f"No checkpoint found with ID {checkpoint_id}")
+        return _decode(rows[0][0])
+
+    async def list_checkpoints(self, *, workflow_name: str) -> list[WorkflowCheckpoint]:
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT data FROM checkpoints WHERE workflow_name = ? ORDER BY timestamp",
+            (workflow_name,),
+        )
+        return [_decode(data) for (data,) in rows]
+
+    async def delete(self, checkpoint_id: str) -> bool:
+        def remove() -> bool:
+            with self._lock:
+                cur = self._db.execute(
+                    "DELETE FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)
+                )
+                return cur.rowcount > 0
+
+        return await asyncio.to_thread(remove)
+
+    async def get_latest(self, *, workflow_name: str) -> WorkflowCheckpoint | None:
+        # Only the newest row is decoded, however long the history is.
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT data FROM checkpoints WHERE workflow_name = ?"
+            " ORDER BY timestamp DESC, iteration DESC LIMIT 1",
+            (workflow_name,),
+        )
+        return _decode(rows[0][0]) if rows else None
+
+    async def list_checkpoint_ids(self, *, workflow_name: str) -> list[str]:
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT checkpoint_id FROM checkpoints WHERE workflow_name = ? ORDER BY timestamp",
+            (workflow_name,),
+        )
+        return [checkpoint_id for (checkpoint_id,) in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+@dataclass
+class CheckpointWrite:
+    superstep: int                       # runner iteration the checkpoint was taken after
+    seconds: float                       # time spent in storage.save()
+
+
+@dataclass
+class CheckpointStats:
+    writes: list[CheckpointWrite] = field(default_factory=list)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(w.seconds for w in self.writes)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / len(self.writes) if self.writes else 0.0
+
+
+class MeasuredCheckpointStorage:
+    """Any CheckpointStorage, with the cost of every save recorded in `stats`."""
+
+    def __init__(self, inner: CheckpointStorage) -> None:
+        self.inner = inner
+        self.stats = CheckpointStats()
+
+    async def save(self, checkpoint: WorkflowCheckpoint) -> str:
+        started = time.perf_counter()
+        checkpoint_id = await self.inner.save(checkpoint)
+        self.stats.writes.append(
+            CheckpointWrite(checkpoint.iteration_count, time.perf_counter() - started)
+        )
+        return checkpoint_id
+
+    async def load(self, checkpoint_id: str) -> WorkflowCheckpoint:
+        return await self.inner.load(checkpoint_id)
+
+    async def list_checkpoints(self, *, workflow_name: str) -> list[WorkflowCheckpoint]:
+        return await self.inner.list_checkpoints(workflow_name=workflow_name)
+
+    async def delete(self, checkpoint_id: str) -> bool:
+        return await self.inner.delete(checkpoint_id)
+
+    async def get_latest(self, *, workflow_name: str) -> WorkflowCheckpoint | None:
+        return await self.inner.get_latest(workflow_name=workflow_name)
+
+    async def list_checkpoint_ids(self, *, workflow_name: str) -> list[str]:
+        return await self.inner.list_checkpoint_ids(workflow_name=workflow_name)
+
+
+async def latest_checkpoint(storage: CheckpointStorage, workflow_name: str) -> WorkflowCheckpoint | None:
+    """The checkpoint an interrupted run of `workflow_name` would resume from."""
+    return await storage.get_latest(workflow_name=workflow_name)
+
+
+async def clear_checkpoints(storage: CheckpointStorage, workflow_name: str) -> int:
+    """Delete every checkpoint of `workflow_name`; returns how many were removed."""
+    removed = 0
+    for checkpoint_id in await storage.list_checkpoint_ids(workflow_name=workflow_name):
+        removed += await storage.delete(checkpoint_id)
+    return removed
+
+
+def checkpoint_storage_from_env() -> MeasuredCheckpointStorage | None:
+    """Build a measured store from WORKFLOW_CHECKPOINTS (sqlite|file), or None if unset."""
+    kind = clean_env("WORKFLOW_CHECKPOINTS").lower()
+    if not kind or kind in {"0", "false", "no", "off"}:
+        return None
+    path = clean_env("WORKFLOW_CHECKPOINTS_PATH")
+    if kind in {"sqlite", "1", "true", "yes", "on"}:
+        return MeasuredCheckpointStorage(SQLiteCheckpointStorage(path or DEFAULT_SQLITE_PATH))
+    if kind == "file":
+        return MeasuredCheckpointStorage(FileCheckpointStorage(path or DEFAULT_FILE_PATH))
+    raise ValueError(f"WORKFLOW_CHECKPOINTS must be 'sqlite' or 'file', got {kind!r}")
+
+
+_default_storage: MeasuredCheckpointStorage | None = None
+_default_storage_loaded = False
+_default_storage_lock = threading.Lock()
+
+
+def default_checkpoint_storage() -> MeasuredCheckpointStorage | None:
+    """Process-wide checkpoint store, or None when checkpointing is disabled."""
+    global _default_storage, _default_storage_loaded
+    with _default_storage_lock:
+        if not _default_storage_loaded:
+            _default_storage = checkpoint_storage_from_env()
+            _default_storage_loaded = True
+        return _default_storage
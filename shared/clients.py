@@ -0,0 +1,252 @@
+"""
+Shared LLM Client Registry (Agent Framework)
+
+One process-wide registry hands out a single, already-constructed
+OpenAIResponsesClient / AzureOpenAIResponsesClient per provider. Each
+provider client sits on its own pooled keep-alive HTTP connection pool, so
+every client.as_agent() call — and every fan-out branch — reuses the same
+TCP/TLS connections instead of opening new ones.
+
+KEY CONCEPTS:
+- get_client() replaces the per-module create_client()
+- Provider selection is unchanged: Azure when AZURE_API_KEY + AZURE_API_BASE
+  are set and DEFAULT_MODEL=azure/<deployment>, otherwise OpenAI
+- LLM_MAX_CONNECTIONS caps in-flight connections per provider
+- warm_up() opens the pooled connection before the first request needs it
+- LLM_BACKENDS lists several backends; get_client() then returns one
+  RoutingResponsesClient over them (see shared/routing.py)
+"""
+
+import asyncio
+import contextlib
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+from agent_framework.azure import AzureOpenAIResponsesClient
+from agent_framework.openai import OpenAIResponsesClient
+
+from shared.env import clean_env, env_number
+from shared.routing import RoutingResponsesClient
+
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 120.0
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    """Everything that identifies one provider backend.
+
+    Two configs that compare equal share one client and one connection pool.
+    """
+    provider: str                       # "azure" or "openai"
+    model: str = ""                     # Azure deployment name or OpenAI model id
+    endpoint: str = ""                  # Azure endpoint / OpenAI base URL ("" = SDK default)
+    api_version: str | None = None
+    api_key: str = field(default="", repr=False)
+
+
+def provider_from_env() -> ProviderConfig:
+    """Select the provider exactly like the original create_client() did."""
+    azure_api_key = clean_env("AZURE_API_KEY")
+    azure_api_base = clean_env("AZURE_API_BASE")
+    azure_api_version = clean_env("AZURE_API_VERSION") or None
+    default_model = clean_env("DEFAULT_MODEL")
+
+    if azure_api_key and azure_api_base and default_model.startswith("azure/"):
+        return ProviderConfig(
+            provider="azure",
+            model=default_model.split("/", 1)[1],
+            endpoint=azure_api_base,
+            api_version=azure_api_version,
+            api_key=azure_api_key,
+        )
+
+    # OpenAI mode: the SDK reads OPENAI_API_KEY / OPENAI_BASE_URL and Agent
+    # Framework reads OPENAI_RESPONSES_MODEL_ID, as before.
+    return ProviderConfig(provider="openai")
+
+
+def backends_from_env() -> list[ProviderConfig]:
+    """Parse LLM_BACKENDS: comma-separated `azure/<deployment>[@<endpoint>]`
+    or `openai/<model>[@<base_url>]` entries.
+
+    Azure entries share AZURE_API_KEY / AZURE_API_VERSION and default to
+    AZURE_API_BASE; OpenAI entries use OPENAI_API_KEY as usual.
+    """
+    configs: list[ProviderConfig] = []
+    for entry in filter(None, (part.strip() for part in clean_env("LLM_BACKENDS").split(","))):
+        target, _, endpoint = entry.partition("@")
+        provider, _, model = target.partition("/")
+        if provider == "azure":
+            configs.append(
+                ProviderConfig(
+                    provider="azure",
+                    model=model,
+                    endpoint=endpoint or clean_env("AZURE_API_BASE"),
+                    api_version=clean_env("AZURE_API_VERSION") or None,
+                    api_key=clean_env("AZURE_API_KEY"),
+                )
+            )
+        elif provider == "openai":
+            configs.append(ProviderConfig(provider="openai", model=model, endpoint=endpoint))
+        else:
+            raise ValueError(f"LLM_BACKENDS entry {entry!r} must start with azure/ or openai/")
+    return configs
+
+
+class ClientRegistry:
+    """Process-wide cache of chat clients, one per ProviderConfig.
+
+    The first get() for a provider builds an httpx.AsyncClient with bounded,
+    keep-alive connection limits and wraps it in the matching Agent Framework
+    client. Later calls return that same object.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        # Unset limits are read from the environment when the first pool is
+        # built, so a .env loaded after import still applies.
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._clients: dict[ProviderConfig, AzureOpenAIResponsesClient | OpenAIResponsesClient] = {}
+        self._http: dict[ProviderConfig, httpx.AsyncClient] = {}
+        self._routers: dict[tuple[ProviderConfig, ...], RoutingResponsesClient] = {}
+
+    def get(
+        self, config: ProviderConfig | None = None
+    ) -> AzureOpenAIResponsesClient | OpenAIResponsesClient:
+        """Return the shared client for a provider (default: from env)."""
+        config = config or provider_from_env()
+        client = self._clients.get(config)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(config)
+            if client is None:
+                http = self._new_http_client()
+                client = self._build_client(config, http)
+                self._http[config] = http
+                self._clients[config] = client
+            return client
+
+    def router(self, configs: list[ProviderConfig]) -> RoutingResponsesClient:
+        """Return the shared router over `configs`; backends keep their own pools."""
+        key = tuple(configs)
+        with self._lock:
+            router = self._routers.get(key)
+        if router is None:
+            backends = {self._backend_name(config): self.get(config) for config in configs}
+            with self._lock:
+                router = self._routers.setdefault(key, RoutingResponsesClient(backends))
+        return router
+
+    @staticmethod
+    def _backend_name(config: ProviderConfig) -> str:
+        host = urlparse(config.endpoint).hostname if config.endpoint else None
+        return f"{config.provider}/{config.model}" + (f"@{host}" if host else "")
+
+    def _new_http_client(self) -> httpx.AsyncClient:
+        max_connections = self.max_connections or int(
+            env_number("LLM_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+        )
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=self.keepalive_expiry
+            or env_number("LLM_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY),
+        )
+        timeout = self.timeout or env_number("LLM_HTTP_TIMEOUT", DEFAULT_TIMEOUT)
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    @staticmethod
+    def _build_client(
+        config: ProviderConfig, http: httpx.AsyncClient
+    ) -> AzureOpenAIResponsesClient | OpenAIResponsesClient:
+        if config.provider == "azure":
+            # Same URL rule Agent Framework applies: *.openai.azure.com endpoints
+            # use the v1 base URL, everything else the deployment-scoped route.
+            api_version = config.api_version or "preview"
+            hostname = urlparse(config.endpoint).hostname or ""
+            if hostname.endswith(".openai.azure.com"):
+                async_client = AsyncAzureOpenAI(
+                    api_key=config.api_key,
+                    base_url=urljoin(config.endpoint, "/openai/v1/"),
+                    api_version=api_version,
+                    http_client=http,
+                )
+            else:
+                async_client = AsyncAzureOpenAI(
+                    api_key=config.api_key,
+                    azure_endpoint=config.endpoint,
+                    azure_deployment=config.model,
+                    api_version=api_version,
+                    http_client=http,
+                )
+            return AzureOpenAIResponsesClient(
+                deployment_name=config.model,
+                endpoint=config.endpoint,
+                api_version=config.api_version,
+                async_client=async_client,
+            )
+
+        async_client = AsyncOpenAI(
+            api_key=config.api_key or None,
+            base_url=config.endpoint or None,
+            http_client=http,
+        )
+        return OpenAIResponsesClient(model_id=config.model or None, async_client=async_client)
+
+    async def warm_up(self, config: ProviderConfig | None = None) -> None:
+        """Open a pooled connection (TCP + TLS) before the first real request.
+
+        Any HTTP status is fine here — the point is the handshake, which stays
+        in the keep-alive pool for the agents that follow.
+        """
+        config = config or provider_from_env()
+        client = self.get(config)
+        http = self._http[config]
+        with contextlib.suppress(httpx.HTTPError):
+            await http.get(str(client.client.base_url))
+
+    async def aclose(self) -> None:
+        """Close every pooled connection. Call once at process shutdown."""
+        with self._lock:
+            pools = list(self._http.values())
+            self._clients.clear()
+            self._http.clear()
+            self._routers.clear()
+        await asyncio.gather(*(pool.aclose() for pool in pools), return_exceptions=True)
+
+
+registry = ClientRegistry()
+
+
+def get_client(
+    config: ProviderConfig | None = None,
+) -> AzureOpenAIResponsesClient | OpenAIResponsesClient | RoutingResponsesClient:
+    """Return the process-wide shared client (drop-in for create_client()).
+
+    With two or more LLM_BACKENDS entries (and no explicit config) this is a
+    RoutingResponsesClient over all of them.
+    """
+    if config is None:
+        backends = backends_from_env()
+        if len(backends) > 1:
+            return registry.router(backends)
+        if backends:
+            config = backends[0]
+    return registry.get(config)
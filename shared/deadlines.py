@@ -0,0 +1,160 @@
+"""
+Request Deadlines for Workflow Runs (Agent Framework)
+
+One hung provider call stalls workflow.run() forever: nothing in a graph
+bounds how long a run may take. A Deadline is fixed once per request and
+travels with the run — executors and tools see how much time is left, cap
+their own work to it, and the caller's wait is cut off shortly after it.
+
+KEY CONCEPTS:
+- Deadline.after(seconds) is an absolute expiry, the same for every executor
+  in the run
+- It rides in the run's `additional_function_arguments` (tools that accept
+  **kwargs get `deadline=`), and enforce() makes it the live deadline of
+  everything started inside it; executors read it with current_deadline(ctx)
+- time_budget(ctx, timeout) = min(time left, the executor's own timeout);
+  DeadlineAgentExecutor (shared/af_executors.py) runs its agent within it
+- enforce() bounds the caller by construction: deadline + a short grace for
+  executors to hand over partial results, then DeadlineExceeded
+- WORKFLOW_DEADLINE sets the default in seconds (0 = no deadline)
+- A deadline belongs to one attempt: restored from a checkpoint it is
+  unbounded, and the resumed run brings its own
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from agent_framework import Workflow, WorkflowContext, WorkflowRunResult
+from agent_framework._workflows._const import WORKFLOW_RUN_KWARGS_KEY
+
+from shared.env import env_number
+
+
+DEFAULT_DEADLINE = 120.0
+DEFAULT_GRACE = 2.0
+DEADLINE_ARG = "deadline"
+
+T = TypeVar("T")
+
+_live: contextvars.ContextVar["Deadline | None"] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A run or an executor ran out of its time budget."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float | None = None      # time.monotonic() of expiry; None: no deadline
+
+    @classmethod
+    def after(cls, seconds: float | None) -> "Deadline":
+        """Deadline `seconds` from now (None or 0: unbounded)."""
+        return cls(time.monotonic() + seconds if seconds else None)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Checkpoints pickle the run's kwargs; a monotonic expiry means
+        # nothing in another process, so it comes back unbounded.
+        return (Deadline, ())
+
+    def __copy__(self) -> "Deadline":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "Deadline":
+        return self
+
+    def remaining(self) -> float | None:
+        """Seconds left (never negative), or None when unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def budget(self, timeout: float | None = None) -> float | None:
+        """Time a step may take: the smaller of `timeout` and the time left."""
+        limits = [t for t in (timeout, self.remaining()) if t is not None]
+        return min(limits) if limits else None
+
+    def run_kwargs(self, **run_kwargs: Any) -> dict[str, Any]:
+        """workflow.run() keyword arguments that carry this deadline."""
+        extra = dict(run_kwargs.pop("additional_function_arguments", None) or {})
+        extra[DEADLINE_ARG] = self
+        return {**run_kwargs, "additional_function_arguments": extra}
+
+    @contextlib.asynccontextmanager
+    async def enforce(self, grace: float = DEFAULT_GRACE) -> AsyncIterator[None]:
+        """Make this the live deadline; cancel the block `grace` seconds after it."""
+        remaining = self.remaining()
+        scope = asyncio.timeout(None if remaining is None else remaining + grace)
+        token = _live.set(self)
+        try:
+            async with scope:
+                yield
+        except TimeoutError as exc:
+            if not scope.expired():
+                raise
+            raise DeadlineExceeded("Workflow run exceeded its deadline.") from exc
+        finally:
+            _live.reset(token)
+
+
+def deadline_from_env() -> Deadline:
+    """A new Deadline of WORKFLOW_DEADLINE seconds (default 120, 0 = none)."""
+    return Deadline.after(env_number("WORKFLOW_DEADLINE", DEFAULT_DEADLINE))
+
+
+def current_deadline(ctx: WorkflowContext[Any, Any] | None = None) -> Deadline:
+    """The deadline of the current run (unbounded if none was given).
+
+    The live deadline from enforce() wins: after a resume, the run kwargs in
+    the workflow state are the checkpoint's, not this attempt's.
+    """
+    live = _live.get()
+    if live is not None:
+        return live
+    if ctx is None:
+        return Deadline()
+    run_kwargs = ctx.get_state(WORKFLOW_RUN_KWARGS_KEY) or {}
+    deadline = (run_kwargs.get("additional_function_arguments") or {}).get(DEADLINE_ARG)
+    return deadline if isinstance(deadline, Deadline) else Deadline()
+
+
+def time_budget(ctx: WorkflowContext[Any, Any], timeout: float | None = None) -> float | None:
+    """Seconds an executor may spend: its own `timeout`, capped by the run's deadline."""
+    return current_deadline(ctx).budget(timeout)
+
+
+async def within(budget: float | None, work: Awaitable[T], what: str) -> T:
+    """Await `work`, cancelling it and raising DeadlineExceeded after `budget` seconds.
+
+    Timeouts raised by `work` itself (an HTTP read timeout, say) propagate
+    unchanged.
+    """
+    scope = asyncio.timeout(budget)
+    try:
+        async with scope:
+            return await work
+    except TimeoutError as exc:
+        if not scope.expired():
+            raise
+        raise DeadlineExceeded(f"{what} ran out of time after {budget:.1f}s.") from exc
+
+
+async def run_with_deadline(
+    workflow: Workflow,
+    message: Any,
+    deadline: Deadline | None = None,
+    **run_kwargs: Any,
+) -> WorkflowRunResult:
+    """workflow.run(message) under `deadline` (default: deadline_from_env())."""
+    deadline = deadline or deadline_from_env()
+    async with deadline.enforce():
+        return await workflow.run(message, **deadline.run_kwargs(**run_kwargs))
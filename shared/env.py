@@ -0,0 +1,25 @@
+"""
+Environment helpers shared by every `shared` module.
+
+Kept free of framework imports so Flock and Agent Framework examples can both
+use them. Values are read at call time, never at import time, because the
+examples call load_dotenv() after their imports.
+"""
+
+import os
+
+
+def clean_env(name: str) -> str:
+    """Read an env var and normalize quoted values."""
+    return os.getenv(name, "").strip().strip('"').strip("'")
+
+
+def env_number(name: str, default: float) -> float:
+    """Read a numeric env var, falling back to `default` when unset."""
+    value = clean_env(name)
+    return float(value) if value else default
+
+
+def env_flag(name: str) -> bool:
+    """Read a boolean env var ("1", "true", "yes", "on" → True)."""
+    return clean_env(name).lower() in {"1", "true", "yes", "on"}
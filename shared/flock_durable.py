@@ -0,0 +1,435 @@
+"""
+Durable Blackboard Log (Flock)
+
+Every Flock() in these modules keeps its blackboard in process memory: a
+crash or a restart loses every artifact, and a cascade that was halfway
+through never finishes. DurableBlackboardStore writes the blackboard ahead to
+an append-only log on disk and rebuilds itself from it on start-up;
+ResumePending restarts the agent runs that had not finished.
+
+KEY CONCEPTS:
+- Write-ahead: an artifact is appended (and fsync'ed) to the log before it is
+  visible on the blackboard; a publish_many() batch is one append, one fsync
+- The log is split into segments of `segment_bytes`; every `snapshot_every`
+  records the live blackboard is written to one snapshot file and the
+  segments it covers are deleted, so start-up reads a snapshot plus the
+  newest segments, not the whole history
+- Records are length + CRC32 framed and replayed through mmap (no read()
+  per record); a torn tail — a record half-written at the crash — is cut off
+- Consumption records are logged too; Flock writes them after an agent's
+  outputs, so "consumed" means "that run finished"
+- ResumePending re-offers every replayed artifact that an agent whose
+  subscription matches it now (type, where=, tags, producer, visibility) has
+  not consumed yet, when the flock starts (first publish or
+  run_until_idle); its on_before_schedule hook skips the runs that already
+  finished. At-least-once: a run that crashed after publishing its outputs
+  runs again
+- Retention works as in IndexedBlackboardStore; evicted artifacts leave the
+  log at the next snapshot
+- Opt-in for the examples: blackboard_store() is durable with
+  FLOCK_BLACKBOARD=1 (FLOCK_BLACKBOARD_PATH, default .cache/blackboard) and
+  in memory otherwise
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from flock.components.orchestrator import OrchestratorComponent, ScheduleDecision
+from flock.core.artifacts import Artifact
+from flock.core.store import ConsumptionRecord
+
+from shared.env import clean_env, env_flag
+from shared.flock_routing import IndexedScheduler
+from shared.flock_store import (
+    IndexedBlackboardStore,
+    IndexSpec,
+    Retention,
+    artifact_from_json,
+    artifact_to_json,
+)
+
+
+DEFAULT_PATH = ".cache/blackboard"
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_SNAPSHOT_EVERY = 50_000
+
+_HEADER = struct.Struct("<IIc")          # body length, CRC32 of kind + body, kind
+ARTIFACT = b"A"
+CONSUMPTION = b"C"
+
+
+def _frame(kind: bytes, body: bytes) -> bytes:
+    return _HEADER.pack(len(body), zlib.crc32(body, zlib.crc32(kind)), kind) + body
+
+
+def _encode_artifact(artifact: Artifact) -> bytes:
+    return _frame(ARTIFACT, artifact_to_json(artifact).encode())
+
+
+def _encode_consumption(record: ConsumptionRecord) -> bytes:
+    data = {
+        "artifact_id": str(record.artifact_id),
+        "consumer": record.consumer,
+        "run_id": record.run_id,
+        "correlation_id": record.correlation_id,
+        "consumed_at": record.consumed_at.isoformat(),
+    }
+    return _frame(CONSUMPTION, json.dumps(data, separators=(",", ":")).encode())
+
+
+def _decode_consumption(body: bytes) -> ConsumptionRecord:
+    data = json.loads(body)
+    return ConsumptionRecord(
+        artifact_id=UUID(data["artifact_id"]),
+        consumer=data["consumer"],
+        run_id=data["run_id"],
+        correlation_id=data["correlation_id"],
+        consumed_at=datetime.fromisoformat(data["consumed_at"]),
+    )
+
+
+def _read_log(path: Path, apply: Callable[[bytes, bytes], None]) -> int:
+    """Feed every intact record of one log file to `apply`; returns where they end."""
+    with path.open("rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            offset = 0
+            while offset + _HEADER.size <= size:
+                length, crc, kind = _HEADER.unpack_from(view, offset)
+                start = offset + _HEADER.size
+                if start + length > size:
+                    break
+                body = view[start : start + length]
+                if zlib.crc32(body, zlib.crc32(kind)) != crc:
+                    break
+                apply(kind, body)
+                offset = start + length
+            return offset
+
+
+def _number(path: Path) -> int:
+    return int(path.stem.rsplit("-", 1)[1])
+
+
+@dataclass
+class LogStats:
+    replayed: int = 0                    # records read back at start-up
+    replay_seconds: float = 0.0
+    truncated_bytes: int = 0             # torn tail cut off at start-up
+    appends: int = 0                     # log writes (one per publish / batch / consumption)
+    records: int = 0                     # records written since start-up
+    bytes_written: int = 0
+    snapshots: int = 0
+
+
+class DurableBlackboardStore(IndexedBlackboardStore):
+    """IndexedBlackboardStore backed by a segmented write-ahead log on disk.
+
+        store = DurableBlackboardStore(".cache/blackboard", {EssayDraft: [("topic", "iteration")]})
+        flock = Flock(store=store)
+        flock.add_component(ResumePending())
+
+    The directory holds segment-<n>.log files and at most one
+    snapshot-<n>.log, which covers everything before segment n. With
+    fsync=False a write survives a process crash but not a power cut.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_PATH,
+        indexes: Mapping[type[BaseModel] | str, Iterable[IndexSpec]] | None = None,
+        retention: Mapping[type[BaseModel] | str, Retention] | None = None,
+        *,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        fsync: bool = True,
+    ) -> None:
+        super().__init__(indexes, retention)
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.stats = LogStats()
+        self.replayed: list[Artifact] = []
+        self._log_lock = asyncio.Lock()
+        self._since_snapshot = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._segment_number = self._replay()
+        self._segment = self._open_segment(self._segment_number)
+
+    # -- start-up ------------------------------------------------------------
+
+    def _replay(self) -> int:
+        """Rebuild the blackboard from disk; returns the segment to append to."""
+        started = time.perf_counter()
+        snapshots = sorted(self.path.glob("snapshot-*.log"), key=_number)
+        base = _number(snapshots[-1]) if snapshots else 0
+        if snapshots:
+            _read_log(snapshots[-1], self._apply)       # written whole, then renamed
+        in_snapshot = self.stats.replayed
+        segments = sorted(
+            (path for path in self.path.glob("segment-*.log") if _number(path) >= base), key=_number
+        )
+        for path in segments:
+            end = _read_log(path, self._apply)
+            size = path.stat().st_size
+            if end < size:
+                self.stats.truncated_bytes += size - end
+                os.truncate(path, end)
+        self._since_snapshot = self.stats.replayed - in_snapshot
+        # Retention ran during the replay: keep only what survived it, and do
+        # not spill again what was spilled before the restart.
+        self._expire()
+        self._spill_pending.clear()
+        self.replayed = [artifact for artifact in self.replayed if artifact.id in self._by_id]
+        self.stats.replay_seconds = time.perf_counter() - started
+        return _number(segments[-1]) if segments else base
+
+    def _apply(self, kind: bytes, body: bytes) -> None:
+        self.stats.replayed += 1
+        if kind == ARTIFACT:
+            artifact = artifact_from_json(body)
+            if artifact.id not in self._by_id:
+                self._insert(artifact)
+                self.replayed.append(artifact)
+        elif kind == CONSUMPTION:
+            record = _decode_consumption(body)
+            self._consumptions_by_artifact[record.artifact_id].append(record)
+
+    # -- writing -------------------------------------------------------------
+
+    def _open_segment(self, number: int):
+        return (self.path / f"segment-{number:08d}.log").open("ab", buffering=0)
+
+    def _write(self, frames: list[bytes]) -> None:
+        # Runs in a worker thread; the caller holds self._log_lock.
+        if self._segment.tell() >= self.segment_bytes:
+            self._roll()
+        data = b"".join(frames)
+        self._segment.write(data)
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+        self.stats.appends += 1
+        self.stats.records += len(frames)
+        self.stats.bytes_written += len(data)
+
+    def _roll(self) -> None:
+        self._segment.close()
+        self._segment_number += 1
+        self._segment = self._open_segment(self._segment_number)
+
+    async def _append(self, frames: list[bytes]) -> None:
+        await asyncio.to_thread(self._write, frames)
+        self._since_snapshot += len(frames)
+
+    async def publish(self, artifact: Artifact) -> None:
+        await self.extend([artifact])
+
+    async def extend(self, artifacts: Iterable[Artifact]) -> None:
+        """Log a batch with one write (and one fsync), then make it visible."""
+        artifacts = list(artifacts)
+        frames = [_encode_artifact(artifact) for artifact in artifacts]
+        async with self._log_lock:
+            await self._append(frames)
+            async with self._lock:
+                for artifact in artifacts:
+                    self._insert(artifact)
+                spills = self._retire()
+            await self._spill(spills)
+            if self._since_snapshot >= self.snapshot_every:
+                await self._snapshot()
+
+    async def record_consumptions(self, records: Iterable[ConsumptionRecord]) -> None:
+        records = list(records)
+        async with self._log_lock:
+            await self._append([_encode_consumption(record) for record in records])
+            await super().record_consumptions(records)
+
+    # -- snapshots -----------------------------------------------------------
+
+    async def snapshot(self) -> Path:
+        """Write a snapshot now and drop the segments it covers."""
+        async with self._log_lock:
+            return await self._snapshot()
+
+    async def _snapshot(self) -> Path:
+        async with self._lock:
+            artifacts = list(self._by_id.values())
+            consumptions = [
+                record for records in self._consumptions_by_artifact.values() for record in records
+            ]
+        path = await asyncio.to_thread(self._write_snapshot, artifacts, consumptions)
+        self._since_snapshot = 0
+        return path
+
+    def _write_snapshot(self, artifacts: list[Artifact], consumptions: list[ConsumptionRecord]) -> Path:
+        self._roll()                                     # later records go after the snapshot
+        number = self._segment_number
+        path = self.path / f"snapshot-{number:08d}.log"
+        partial = path.with_suffix(".tmp")
+        with partial.open("wb") as file:
+            for artifact in artifacts:
+                file.write(_encode_artifact(artifact))
+            for record in consumptions:
+                file.write(_encode_consumption(record))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(partial, path)
+        for old in [*self.path.glob("snapshot-*.log"), *self.path.glob("segment-*.log")]:
+            if _number(old) < number:
+                old.unlink()
+        self.stats.snapshots += 1
+        return path
+
+    # -- queries -------------------------------------------------------------
+
+    def consumers(self) -> dict[UUID, set[str]]:
+        """Artifact id -> agents that finished a run on it."""
+        return {
+            artifact_id: {record.consumer for record in records}
+            for artifact_id, records in self._consumptions_by_artifact.items()
+        }
+
+    def close(self) -> None:
+        self._segment.close()
+
+    def summary(self) -> list[str]:
+        stats = self.stats
+        lines = [
+            f"Blackboard log: {len(self._by_id)} artifacts in {self.path} "
+            f"({stats.replayed} records replayed in {stats.replay_seconds * 1000:.1f} ms); "
+            f"{stats.records} records written in {stats.appends} appends, {stats.snapshots} snapshots"
+        ]
+        if stats.truncated_bytes:
+            lines.append(f"Blackboard log: cut a torn tail of {stats.truncated_bytes} bytes")
+        return lines
+
+
+@dataclass
+class ResumeStats:
+    replayed: int = 0                    # artifacts read back from the log
+    pending: int = 0                     # of those, offered to their subscribers again
+    runs: int = 0                        # agent runs that started from them
+
+
+class ResumePending(OrchestratorComponent):
+    """Restart the agent runs a DurableBlackboardStore had not finished.
+
+        flock = Flock(store=DurableBlackboardStore(...))
+        flock.add_component(ResumePending())
+        await flock.run_until_idle()             # resumes, then waits as usual
+
+    Does nothing when the store is not durable or the log was empty.
+    """
+
+    priority: int = 10
+    name: str = "resume_pending"
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._stats = ResumeStats()
+        self._resuming = False
+        self._started = False
+        self._finished: set[tuple[str, str]] = set()    # (artifact id, agent) runs the log saw finish
+
+    @property
+    def stats(self) -> ResumeStats:
+        return self._stats
+
+    async def on_initialize(self, orchestrator) -> None:  # type: ignore[override]
+        store = orchestrator.store
+        if self._started or not isinstance(store, DurableBlackboardStore) or not store.replayed:
+            return
+        # Once per process: add_component() after start-up makes Flock
+        # initialize its components again.
+        self._started = True
+        # Components finish initializing before anything is scheduled; the
+        # task is tracked like an agent run, so run_until_idle() waits for it.
+        scheduler = orchestrator._scheduler
+        task = asyncio.create_task(self._resume(orchestrator, store))
+        scheduler.pending_tasks.add(task)
+        task.add_done_callback(lambda done: scheduler.pending_tasks.discard(done))
+
+    async def _resume(self, orchestrator, store: DurableBlackboardStore) -> None:
+        consumers = store.consumers()
+        self._finished = {
+            (str(artifact_id), agent) for artifact_id, agents in consumers.items() for agent in agents
+        }
+        pending = [
+            artifact for artifact in store.replayed
+            if any(
+                agent.name not in consumers.get(artifact.id, ()) and _subscribed(agent, artifact)
+                for agent in orchestrator.agents
+            )
+        ]
+        scheduler = orchestrator._scheduler
+        self.stats.replayed = len(store.replayed)
+        self.stats.pending = len(pending)
+
+        self._resuming = True
+        try:
+            if isinstance(scheduler, IndexedScheduler):
+                await scheduler.schedule_many(pending)
+            else:
+                for artifact in pending:
+                    await scheduler.schedule_artifact(artifact)
+        finally:
+            self._resuming = False
+
+    async def on_before_schedule(self, orchestrator, artifact, agent, subscription) -> ScheduleDecision:  # type: ignore[override]
+        if (str(artifact.id), agent.name) in self._finished:
+            return ScheduleDecision.SKIP
+        return ScheduleDecision.CONTINUE
+
+    async def on_agent_scheduled(self, orchestrator, agent, artifacts, task) -> None:  # type: ignore[override]
+        if self._resuming:
+            self.stats.runs += 1
+
+    def summary(self) -> list[str]:
+        stats = self.stats
+        if not stats.replayed:
+            return []
+        return [
+            f"Resumed: {stats.pending} of {stats.replayed} replayed artifacts were unfinished, "
+            f"{stats.runs} agent runs restarted"
+        ]
+
+
+def _subscribed(agent: Any, artifact: Artifact) -> bool:
+    """Would `agent` be scheduled for `artifact` if it were published now?"""
+    if agent.prevent_self_trigger and artifact.produced_by == agent.name:
+        return False
+    if not artifact.visibility.allows(agent.identity):
+        return False
+    for subscription in agent.subscriptions:
+        try:
+            if subscription.matches(artifact):
+                return True
+        except Exception:                # payload no longer fits the model
+            continue
+    return False
+
+
+def blackboard_store(
+    indexes: Mapping[type[BaseModel] | str, Iterable[IndexSpec]] | None = None,
+    retention: Mapping[type[BaseModel] | str, Retention] | None = None,
+) -> IndexedBlackboardStore:
+    """A DurableBlackboardStore when FLOCK_BLACKBOARD is set, else an in-memory IndexedBlackboardStore."""
+    if not env_flag("FLOCK_BLACKBOARD"):
+        return IndexedBlackboardStore(indexes, retention)
+    return DurableBlackboardStore(clean_env("FLOCK_BLACKBOARD_PATH") or DEFAULT_PATH, indexes, retention)
@@ -0,0 +1,120 @@
+"""
+Flock engines for the shared runtime helpers.
+
+Drop-in replacements for Flock's default DSPyEngine. Attach per agent:
+
+    flock.agent("reviewer").description(...).with_engines(RuntimeDSPyEngine())
+
+Each engine adds one helper and calls super().evaluate(), so they stack by
+inheritance; RuntimeDSPyEngine combines all of them.
+"""
+
+import json
+from typing import Any
+
+from pydantic import Field
+
+from flock.core.artifacts import Artifact
+from flock.engines import DSPyEngine
+from flock.utils.runtime import EvalInputs, EvalResult
+
+from shared.cache import ResponseCache, default_cache, make_key
+from shared.limits import RateLimiter, default_limiter, estimate_tokens
+
+
+def _artifact_content(artifacts: list[Artifact]) -> list[dict[str, Any]]:
+    # Only type + payload: ids, timestamps and correlation ids differ on every
+    # run and would make identical inputs look distinct.
+    return [{"type": a.type, "payload": a.payload} for a in artifacts]
+
+
+class CachedDSPyEngine(DSPyEngine):
+    """DSPyEngine that serves repeated evaluations from a ResponseCache.
+
+    The key covers the model as resolved for the call (model= or
+    DEFAULT_MODEL), temperature and max_tokens, the agent description (or
+    engine instructions), the input and context artifact payloads, and the
+    requested output types.
+    A hit rebuilds fresh artifacts from the cached payloads, so downstream
+    agents see new artifacts exactly as if the LLM had answered.
+    """
+
+    name: str | None = "cached_dspy"
+    cache: Any = Field(
+        default_factory=default_cache,
+        exclude=True,
+        description="ResponseCache to use (default: shared.cache.default_cache(); None disables).",
+    )
+
+    async def evaluate(
+        self, agent, ctx, inputs: EvalInputs, output_group
+    ) -> EvalResult:  # type: ignore[override]
+        cache: ResponseCache | None = self.cache
+        if cache is None:
+            return await super().evaluate(agent, ctx, inputs, output_group)
+
+        # Same context history DSPyEngine puts into the prompt.
+        context = list(ctx.artifacts) if ctx and self.should_use_context(inputs) else []
+        key = make_key(
+            self._resolve_model_name(),
+            self.instructions or agent.description or "",
+            {
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "inputs": _artifact_content(inputs.artifacts),
+                "context": _artifact_content(context),
+                "outputs": [
+                    (output.spec.type_name, output.count) for output in output_group.outputs
+                ],
+                "batch": bool(getattr(ctx, "is_batch", False)),
+            },
+        )
+
+        cached = cache.get(key)
+        if cached is not None:
+            artifacts = [
+                Artifact(type=item["type"], payload=item["payload"], produced_by=agent.name)
+                for item in json.loads(cached)
+            ]
+            return EvalResult(artifacts=artifacts, state=dict(inputs.state))
+
+        result = await super().evaluate(agent, ctx, inputs, output_group)
+        if result.artifacts:
+            cache.put(key, json.dumps(_artifact_content(result.artifacts), default=str))
+        return result
+
+
+class RateLimitedDSPyEngine(DSPyEngine):
+    """DSPyEngine whose LLM calls go through a shared RateLimiter.
+
+    DSPy does not report token usage back to the engine, so the TPM bucket
+    is charged with the pre-call estimate only.
+    """
+
+    name: str | None = "rate_limited_dspy"
+    limiter: Any = Field(
+        default_factory=default_limiter,
+        exclude=True,
+        description="RateLimiter to use (default: shared.limits.default_limiter(); None disables).",
+    )
+
+    async def evaluate(
+        self, agent, ctx, inputs: EvalInputs, output_group
+    ) -> EvalResult:  # type: ignore[override]
+        limiter: RateLimiter | None = self.limiter
+        if limiter is None:
+            return await super().evaluate(agent, ctx, inputs, output_group)
+
+        prompt = (self.instructions or agent.description or "") + json.dumps(
+            _artifact_content(inputs.artifacts), default=str
+        )
+        return await limiter.run(
+            lambda: super(RateLimitedDSPyEngine, self).evaluate(agent, ctx, inputs, output_group),
+            estimated_tokens=estimate_tokens(prompt),
+        )
+
+
+class RuntimeDSPyEngine(CachedDSPyEngine, RateLimitedDSPyEngine):
+    """DSPyEngine with every shared helper: cache first, then the rate limiter."""
+
+    name: str | None = "runtime_dspy"
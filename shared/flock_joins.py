@@ -0,0 +1,195 @@
+"""
+Correlated AND-Gate Joins (Flock)
+
+`.consumes(SecurityReview, PerformanceReview, StyleReview)` waits until one
+of each type has arrived — any one. With several submissions in flight the
+merge agent can get the security review of one submission next to the style
+review of another, and reviews whose partners never arrive stay in the
+waiting pool for good.
+
+CorrelatedJoin replaces that pool for the agents you hand it: a hash join on
+a correlation key, so each group only ever holds artifacts that belong
+together, with a bound on how long and how many incomplete groups are kept.
+
+KEY CONCEPTS:
+- The key defaults to the artifact's correlation_id, which Flock gives every
+  publish() and copies onto everything produced from it; `by=` takes a
+  payload field name or a function of the artifact instead
+- One dict lookup per arrival; a group fires (and is dropped) as soon as it
+  holds every type the subscription needs
+- Incomplete groups live in creation order: the oldest is evicted first, once
+  it is older than `ttl` seconds or when more than `max_pending` are open —
+  amortized O(1) per arrival, memory bounded whatever the load
+- `stats` counts completed, expired and evicted groups and the time a
+  completed group waited; pending() lists the open groups and what they miss
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+from flock.components.orchestrator import CollectionResult, OrchestratorComponent
+from flock.core.artifacts import Artifact
+
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_PENDING = 10_000
+
+JoinKey = Callable[[Artifact], Hashable | None]
+
+
+def correlation_key(artifact: Artifact) -> Hashable | None:
+    return artifact.correlation_id
+
+
+def _payload_key(name: str) -> JoinKey:
+    def key(artifact: Artifact) -> Hashable | None:
+        return artifact.payload.get(name)
+
+    return key
+
+
+@dataclass
+class JoinGroup:
+    agent: str
+    key: Hashable
+    needed: dict[str, int]               # type name -> artifacts required
+    created: float                       # time.monotonic() of the first arrival
+    artifacts: dict[str, list[Artifact]] = field(default_factory=dict)
+
+    def add(self, artifact: Artifact) -> None:
+        slot = self.artifacts.setdefault(artifact.type, [])
+        slot.append(artifact)
+        del slot[: -self.needed[artifact.type]]      # a re-published type replaces the older one
+
+    def missing(self) -> list[str]:
+        return [
+            type_name for type_name, count in self.needed.items()
+            if len(self.artifacts.get(type_name, ())) < count
+        ]
+
+    def collected(self) -> list[Artifact]:
+        return [artifact for type_name in self.needed for artifact in self.artifacts[type_name]]
+
+
+@dataclass
+class JoinStats:
+    completed: int = 0
+    expired: int = 0                     # evicted after `ttl`
+    evicted: int = 0                     # evicted because `max_pending` groups were open
+    unkeyed: int = 0                     # arrivals without a correlation key (dropped)
+    pending: int = 0
+    peak_pending: int = 0
+    wait_seconds: float = 0.0            # first arrival -> complete, summed over completed groups
+
+    @property
+    def mean_wait(self) -> float:
+        return self.wait_seconds / self.completed if self.completed else 0.0
+
+
+class CorrelatedJoin(OrchestratorComponent):
+    """Hash join on a correlation key for multi-type subscriptions.
+
+        joins = CorrelatedJoin(ttl=120, max_pending=1000)
+        joins.on(merge_agent)                    # key: correlation_id
+        flock.add_component(joins)
+
+    Runs before Flock's built-in collection (priority 50 < 100) and only
+    handles the agents registered with on(); batched subscriptions are left
+    to Flock.
+    """
+
+    priority: int = 50
+    name: str = "correlated_join"
+    ttl: float = DEFAULT_TTL
+    max_pending: int = DEFAULT_MAX_PENDING
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_pending: int = DEFAULT_MAX_PENDING, **kwargs: Any) -> None:
+        super().__init__(ttl=ttl, max_pending=max_pending, **kwargs)
+        self._keys: dict[str, JoinKey] = {}
+        self._groups: OrderedDict[tuple[str, int, Hashable], JoinGroup] = OrderedDict()
+        self._stats = JoinStats()
+
+    @property
+    def stats(self) -> JoinStats:
+        return self._stats
+
+    def on(self, agent: Any, by: str | JoinKey | None = None) -> "CorrelatedJoin":
+        """Join `agent`'s multi-type subscriptions on `by` (default: correlation_id)."""
+        agent_name = agent if isinstance(agent, str) else agent.name
+        if by is None:
+            key = correlation_key
+        elif isinstance(by, str):
+            key = _payload_key(by)
+        else:
+            key = by
+        self._keys[agent_name] = key
+        return self
+
+    async def on_collect_artifacts(self, orchestrator, artifact, agent, subscription):  # type: ignore[override]
+        key_of = self._keys.get(agent.name)
+        if key_of is None or subscription.batch is not None or sum(subscription.type_counts.values()) < 2:
+            return None
+
+        now = time.monotonic()
+        self._evict(now)
+        key = key_of(artifact)
+        if key is None:
+            self.stats.unkeyed += 1
+            return CollectionResult.waiting()
+
+        group_id = (agent.name, agent.subscriptions.index(subscription), key)
+        group = self._groups.get(group_id)
+        if group is None:
+            group = JoinGroup(agent.name, key, dict(subscription.type_counts), now)
+            self._groups[group_id] = group
+            self._evict(now)
+        group.add(artifact)
+
+        if group.missing():
+            self._count_pending()
+            return CollectionResult.waiting()
+
+        self._groups.pop(group_id, None)
+        self.stats.completed += 1
+        self.stats.wait_seconds += now - group.created
+        self._count_pending()
+        return CollectionResult.immediate(group.collected())
+
+    async def on_orchestrator_idle(self, orchestrator) -> None:  # type: ignore[override]
+        self._evict(time.monotonic())
+
+    def _evict(self, now: float) -> None:
+        # Oldest first: the head of the OrderedDict is the longest-open group.
+        while self._groups:
+            group = next(iter(self._groups.values()))
+            if now - group.created > self.ttl:
+                self.stats.expired += 1
+            elif len(self._groups) > self.max_pending:
+                self.stats.evicted += 1
+            else:
+                break
+            self._groups.popitem(last=False)
+        self._count_pending()
+
+    def _count_pending(self) -> None:
+        self.stats.pending = len(self._groups)
+        self.stats.peak_pending = max(self.stats.peak_pending, self.stats.pending)
+
+    def pending(self) -> list[dict[str, Any]]:
+        """Open groups, oldest first: agent, key, age in seconds and missing types."""
+        now = time.monotonic()
+        return [
+            {"agent": group.agent, "key": group.key, "age": now - group.created, "missing": group.missing()}
+            for group in self._groups.values()
+        ]
+
+    def summary(self) -> list[str]:
+        stats = self.stats
+        return [
+            f"Joins: {stats.completed} completed (mean wait {stats.mean_wait:.2f}s), "
+            f"{stats.pending} pending (peak {stats.peak_pending}), "
+            f"{stats.expired} expired, {stats.evicted} evicted, {stats.unkeyed} without key"
+        ]
@@ -0,0 +1,203 @@
+"""
+Priority Scheduling (Flock)
+
+Flock starts every activated agent at once: a flood of routine tickets
+becomes hundreds of concurrent standard_support runs, all competing for the
+same model quota, and the one critical ticket that arrives next waits its
+turn behind them. Per-agent limits (.max_concurrency(n)) cap each agent but
+do not order work across agents.
+
+PriorityScheduler puts an activation queue between matching and running.
+At most `slots` agent runs are in flight; when one finishes, the waiting
+activation with the earliest deadline starts next (earliest-deadline-first),
+skipping agents already at their .max_concurrency(n).
+
+KEY CONCEPTS:
+- Deadlines((F.priority == "critical", 5), (F.customer_tier == "enterprise", 15),
+  default=300) gives each input a response-time budget in seconds, from the
+  same F predicates as where=; the tightest matching rule wins
+- Deadline = when the input artifact was published + its budget, so routine
+  work waiting long enough eventually outranks fresh urgent work: nothing
+  starves, unlike a strict priority order
+- An agent never holds a slot while waiting on its own .max_concurrency(n):
+  activations of an agent at its cap stay queued and others go first
+- Queued activations count as pending work: run_until_idle() still waits
+  for them, and cancelling one just removes it from the queue
+- use_priority_scheduling(flock, deadlines, slots=4) installs the scheduler
+  (it also routes through the compiled index); `stats` report waits and
+  missed deadlines per agent
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from flock.core.artifacts import Artifact
+
+from shared.flock_routing import IndexedScheduler, Predicate
+
+
+DEFAULT_SLOTS = 4
+DEFAULT_BUDGET = 300.0
+
+
+class Deadlines:
+    """Response-time budget (seconds) of an input: the smallest of the matching rules."""
+
+    def __init__(self, *rules: tuple[Predicate | Callable[[Any], bool], float], default: float = DEFAULT_BUDGET) -> None:
+        self.rules = rules
+        self.default = default
+
+    def __call__(self, payload: dict[str, Any]) -> float:
+        return min((budget for test, budget in self.rules if test(payload)), default=self.default)
+
+
+@dataclass
+class AgentQueueStats:
+    runs: int = 0
+    wait_seconds: float = 0.0
+    max_wait: float = 0.0
+    late: int = 0                        # runs that finished after their deadline
+
+
+@dataclass
+class QueueStats:
+    peak_waiting: int = 0
+    peak_running: int = 0
+    agents: dict[str, AgentQueueStats] = field(default_factory=lambda: defaultdict(AgentQueueStats))
+
+
+@dataclass
+class _Activation:
+    agent: Any
+    deadline: float                      # epoch seconds
+    admitted: asyncio.Future[None]
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class PriorityScheduler(IndexedScheduler):
+    """IndexedScheduler whose agent runs go through an earliest-deadline-first queue."""
+
+    def __init__(
+        self,
+        orchestrator: Any,
+        component_runner: Any,
+        deadlines: Callable[[dict[str, Any]], float] | None = None,
+        slots: int = DEFAULT_SLOTS,
+    ) -> None:
+        super().__init__(orchestrator, component_runner)
+        self.deadlines = deadlines or Deadlines()
+        self.slots = max(1, slots)
+        self.queue_stats = QueueStats()
+        self.running = 0
+        self.waiting = 0
+        self._running: dict[str, int] = defaultdict(int)
+        self._queues: dict[str, list[tuple[float, int, _Activation]]] = defaultdict(list)
+        self._order = itertools.count()
+
+    def deadline_of(self, artifacts: list[Artifact]) -> float:
+        """Epoch deadline of a run: the earliest over its inputs (joins and batches)."""
+        return min(
+            (artifact.created_at.timestamp() + self.deadlines(artifact.payload) for artifact in artifacts),
+            default=time.time() + self.deadlines({}),
+        )
+
+    def schedule_task(self, agent: Any, artifacts: list[Artifact], is_batch: bool = False) -> asyncio.Task[Any]:
+        task = asyncio.create_task(self._queued_run(agent, artifacts, is_batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _queued_run(self, agent: Any, artifacts: list[Artifact], is_batch: bool) -> None:
+        activation = _Activation(agent, self.deadline_of(artifacts), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queues[agent.name], (activation.deadline, next(self._order), activation))
+        self.waiting += 1
+        self.queue_stats.peak_waiting = max(self.queue_stats.peak_waiting, self.waiting)
+        self._dispatch()
+        try:
+            await activation.admitted
+        except asyncio.CancelledError:
+            if activation.admitted.done() and not activation.admitted.cancelled():
+                self._release(activation)            # admitted, then cancelled before it ran
+            else:
+                self.waiting -= 1                    # still queued: _dispatch drops it
+            raise
+        try:
+            await self._orchestrator._run_agent_task(agent, artifacts, is_batch=is_batch)
+        finally:
+            self._release(activation)
+
+    def _dispatch(self) -> None:
+        # A handful of agents: compare the queue heads of those below their cap.
+        while self.running < self.slots:
+            best: list[tuple[float, int, _Activation]] | None = None
+            for name, queue in self._queues.items():
+                while queue and queue[0][2].admitted.done():
+                    heapq.heappop(queue)             # cancelled while waiting
+                if not queue or self._running[name] >= queue[0][2].agent.max_concurrency:
+                    continue
+                if best is None or queue[0] < best[0]:
+                    best = queue
+            if best is None:
+                return
+            _, _, activation = heapq.heappop(best)
+            name = activation.agent.name
+            self.waiting -= 1
+            self.running += 1
+            self._running[name] += 1
+            self.queue_stats.peak_running = max(self.queue_stats.peak_running, self.running)
+            waited = time.perf_counter() - activation.queued_at
+            stats = self.queue_stats.agents[name]
+            stats.runs += 1
+            stats.wait_seconds += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            activation.admitted.set_result(None)
+
+    def _release(self, activation: _Activation) -> None:
+        name = activation.agent.name
+        self.running -= 1
+        self._running[name] -= 1
+        if time.time() > activation.deadline:
+            self.queue_stats.agents[name].late += 1
+        self._dispatch()
+
+    def summary(self) -> list[str]:
+        stats = self.queue_stats
+        lines = [
+            f"Activation queue: {self.slots} slots, peak {stats.peak_running} running / "
+            f"{stats.peak_waiting} waiting"
+        ]
+        for name, agent in sorted(stats.agents.items()):
+            mean = agent.wait_seconds / agent.runs if agent.runs else 0.0
+            lines.append(
+                f"  {name}: {agent.runs} runs, queued {mean:.2f}s mean / {agent.max_wait:.2f}s max, "
+                f"{agent.late} past deadline"
+            )
+        return lines
+
+
+def use_priority_scheduling(
+    flock: Any,
+    deadlines: Callable[[dict[str, Any]], float] | None = None,
+    *,
+    slots: int = DEFAULT_SLOTS,
+) -> PriorityScheduler:
+    """Swap `flock`'s scheduler for a PriorityScheduler; returns it (for .stats / .summary())."""
+    current = flock._scheduler
+    if isinstance(current, PriorityScheduler):
+        current.deadlines = deadlines or current.deadlines
+        current.slots = max(1, slots)
+        return current
+    scheduler = PriorityScheduler(flock, flock._component_runner, deadlines, slots)
+    if isinstance(current, IndexedScheduler):
+        scheduler.stats = current.stats
+    scheduler._tasks = current._tasks
+    scheduler._processed = current._processed
+    flock._scheduler = scheduler
+    flock._artifact_manager._scheduler = scheduler
+    return scheduler
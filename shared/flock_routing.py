@@ -0,0 +1,589 @@
+"""
+Compiled Routing Predicates (Flock)
+
+A `where=lambda t: ...` is opaque: for every published artifact Flock rebuilds
+the payload model and calls each subscribed agent's lambda, so routing one
+ticket costs as much as there are agents listening for tickets — dozens of
+specialists means dozens of calls, almost all of them saying no.
+
+Predicates built from F are data instead of code. IndexedScheduler compiles
+them, per artifact type, into a discrimination index: equality and
+membership tests become hash-table entries, and an artifact only visits the
+agents whose index entries its field values hit.
+
+KEY CONCEPTS:
+- F.priority == "critical", F.tier.isin("gold", "platinum"), F.score >= 8,
+  F.age.between(18, 65), combined with & | ~ — still plain where= callables,
+  so Flock's own matching keeps working without the index
+- Each predicate is normalized to OR-of-ANDs; every AND term is filed under
+  one of its equality / membership tests (field -> value -> terms), and only
+  the terms found there are checked further
+- Terms without an equality test (ranges, negations) and lambda predicates
+  are checked for every artifact of the type, as before — the fallback
+- Predicates see the payload model, as lambdas do (defaults, coercion,
+  enums), and give the same answer; the model is built once per artifact,
+  not once per agent. A payload that does not validate matches no compiled
+  predicate
+- use_indexed_routing(flock) installs the scheduler; its `stats` count
+  predicate checks per artifact
+
+Batched publishing
+------------------
+Flock's publish_many() is a loop over publish(): per artifact one store lock,
+one scheduling pass, and a traced call (span + log line) into every
+component hook — the built-in ones are mostly no-ops, but each call costs
+the tracing all the same. publish_many(flock, objects) builds every artifact
+first, stores them under one lock (store.extend), matches them in one pass
+and starts the activated agents together.
+
+- Same result as publishing one by one: each model gets its own
+  correlation id unless one is given; gates and joins see publish order
+- Hooks run only on components that implement them
+- Without an IndexedScheduler the artifacts are still stored together, then
+  scheduled one by one
+"""
+
+import operator
+from abc import ABC, abstractmethod
+from enum import Enum
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from flock.components.orchestrator import OrchestratorComponent, ScheduleDecision
+from flock.core.artifacts import Artifact
+from flock.core.visibility import PublicVisibility, Visibility
+from flock.orchestrator.scheduler import AgentScheduler
+from flock.registry import type_registry
+
+
+_MISSING = object()
+
+
+def _value(subject: Any, name: str) -> Any:
+    if isinstance(subject, dict):
+        return subject.get(name, _MISSING)
+    return getattr(subject, name, _MISSING)
+
+
+def _bucket_key(value: Any) -> Any:
+    # Enum members hash by name: file them under their value, so a str enum
+    # field and a plain string in F.x == "..." land in the same bucket.
+    return value.value if isinstance(value, Enum) else value
+
+
+class Predicate(ABC):
+    """A declarative test on one artifact payload; call it on a model or a payload dict."""
+
+    @abstractmethod
+    def __call__(self, subject: Any) -> bool:
+        ...
+
+    def terms(self) -> list[list["Predicate"]]:
+        """OR-of-ANDs form: [[a, b], [c]] means (a and b) or c."""
+        return [[self]]
+
+    def negate(self) -> "Predicate":
+        return Not(self)
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return All((self, other))
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return AnyOf((self, other))
+
+    def __invert__(self) -> "Predicate":
+        return self.negate()
+
+
+@dataclass(frozen=True, eq=False)
+class Eq(Predicate):
+    field: str
+    value: Any
+
+    def __call__(self, subject: Any) -> bool:
+        return _value(subject, self.field) == self.value
+
+    def __repr__(self) -> str:
+        return f"F.{self.field} == {self.value!r}"
+
+
+@dataclass(frozen=True, eq=False)
+class In(Predicate):
+    field: str
+    values: frozenset[Any]
+
+    def __call__(self, subject: Any) -> bool:
+        value = _value(subject, self.field)
+        try:
+            return value in self.values
+        except TypeError:                # unhashable field value
+            return False
+
+    def __repr__(self) -> str:
+        return f"F.{self.field}.isin({', '.join(map(repr, sorted(self.values, key=repr)))})"
+
+
+_COMPARISONS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+@dataclass(frozen=True, eq=False)
+class Compare(Predicate):
+    field: str
+    op: str
+    value: Any
+
+    def __call__(self, subject: Any) -> bool:
+        value = _value(subject, self.field)
+        if value is _MISSING or value is None:
+            return False
+        try:
+            return _COMPARISONS[self.op](value, self.value)
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return f"F.{self.field} {self.op} {self.value!r}"
+
+
+@dataclass(frozen=True, eq=False)
+class Not(Predicate):
+    inner: Predicate
+
+    def __call__(self, subject: Any) -> bool:
+        return not self.inner(subject)
+
+    def terms(self) -> list[list[Predicate]]:
+        if isinstance(self.inner, (Eq, In, Compare)):
+            return [[self]]
+        # De Morgan, pushing the negation down to single tests.
+        return self.inner.negate_terms()
+
+    def negate(self) -> Predicate:
+        return self.inner
+
+    def negate_terms(self) -> list[list[Predicate]]:
+        return self.inner.terms()
+
+    def __repr__(self) -> str:
+        return f"~({self.inner!r})"
+
+
+@dataclass(frozen=True, eq=False)
+class All(Predicate):
+    parts: tuple[Predicate, ...]
+
+    def __call__(self, subject: Any) -> bool:
+        return all(part(subject) for part in self.parts)
+
+    def terms(self) -> list[list[Predicate]]:
+        result: list[list[Predicate]] = [[]]
+        for part in self.parts:
+            result = [left + right for left in result for right in part.terms()]
+        return result
+
+    def negate_terms(self) -> list[list[Predicate]]:
+        return AnyOf(tuple(part.negate() for part in self.parts)).terms()
+
+    def __repr__(self) -> str:
+        return "(" + " & ".join(map(repr, self.parts)) + ")"
+
+
+@dataclass(frozen=True, eq=False)
+class AnyOf(Predicate):
+    parts: tuple[Predicate, ...]
+
+    def __call__(self, subject: Any) -> bool:
+        return any(part(subject) for part in self.parts)
+
+    def terms(self) -> list[list[Predicate]]:
+        return [term for part in self.parts for term in part.terms()]
+
+    def negate_terms(self) -> list[list[Predicate]]:
+        return All(tuple(part.negate() for part in self.parts)).terms()
+
+    def __repr__(self) -> str:
+        return "(" + " | ".join(map(repr, self.parts)) + ")"
+
+
+class FieldRef:
+    """F.<name>: builds predicates on one payload field."""
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __eq__(self, value: Any) -> Predicate:  # type: ignore[override]
+        return Eq(self.name, value)
+
+    def __ne__(self, value: Any) -> Predicate:  # type: ignore[override]
+        return Not(Eq(self.name, value))
+
+    def __lt__(self, value: Any) -> Predicate:
+        return Compare(self.name, "<", value)
+
+    def __le__(self, value: Any) -> Predicate:
+        return Compare(self.name, "<=", value)
+
+    def __gt__(self, value: Any) -> Predicate:
+        return Compare(self.name, ">", value)
+
+    def __ge__(self, value: Any) -> Predicate:
+        return Compare(self.name, ">=", value)
+
+    def isin(self, *values: Any) -> Predicate:
+        return In(self.name, frozenset(values))
+
+    def between(self, low: Any, high: Any) -> Predicate:
+        """low <= field <= high."""
+        return All((Compare(self.name, ">=", low), Compare(self.name, "<=", high)))
+
+
+class _Fields:
+    def __getattr__(self, name: str) -> FieldRef:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return FieldRef(name)
+
+
+F = _Fields()
+
+
+# ============================================================================
+# Discrimination index
+# ============================================================================
+
+@dataclass
+class _Term:
+    route: int                           # index into RoutingIndex.routes
+    checks: list[Predicate]              # every test of the AND term
+
+
+@dataclass
+class _TypeRoutes:
+    by_value: dict[str, dict[Any, list[_Term]]] = field(default_factory=dict)
+    unindexed: list[_Term] = field(default_factory=list)
+    fallback: list[int] = field(default_factory=list)    # routes with lambda predicates
+
+
+@dataclass
+class RoutingStats:
+    artifacts: int = 0
+    checks: int = 0                      # compiled tests evaluated
+    fallback_checks: int = 0             # subscription.matches() calls (lambda predicates)
+    matches: int = 0
+
+    @property
+    def checks_per_artifact(self) -> float:
+        return (self.checks + self.fallback_checks) / self.artifacts if self.artifacts else 0.0
+
+
+def _compiled(subscription: Any) -> Predicate | None:
+    """The subscription's where= as one Predicate, or None if any part is a plain callable."""
+    if getattr(subscription, "text_predicates", None):
+        return None
+    parts = list(subscription.where)
+    if not all(isinstance(part, Predicate) for part in parts):
+        return None
+    return All(tuple(parts)) if parts else All(())
+
+
+def _hashable(test: Predicate) -> bool:
+    try:
+        hash(test.value if isinstance(test, Eq) else test.values)
+    except TypeError:
+        return False
+    return True
+
+
+def _discriminator(term: list[Predicate]) -> Predicate | None:
+    # Equality narrows to one bucket; membership to a few.
+    for kind in (Eq, In):
+        for test in term:
+            if isinstance(test, kind) and _hashable(test):
+                return test
+    return None
+
+
+class RoutingIndex:
+    """Per artifact type: which (agent, subscription) pairs an artifact can match."""
+
+    def __init__(self, agents: Iterable[Any]) -> None:
+        self.routes: list[tuple[Any, Any]] = [
+            (agent, subscription) for agent in agents for subscription in agent.subscriptions
+        ]
+        self.types: dict[str, _TypeRoutes] = {}
+        for route, (_, subscription) in enumerate(self.routes):
+            predicate = _compiled(subscription)
+            for type_name in subscription.type_names:
+                routes = self.types.setdefault(type_name, _TypeRoutes())
+                if predicate is None:
+                    routes.fallback.append(route)
+                    continue
+                for term in predicate.terms():
+                    key = _discriminator(term)
+                    if key is None:
+                        routes.unindexed.append(_Term(route, term))
+                        continue
+                    # The bucket only narrows the candidates; the key test is
+                    # checked again on the model, so == semantics decide.
+                    buckets = routes.by_value.setdefault(key.field, {})
+                    values = [key.value] if isinstance(key, Eq) else key.values
+                    for value in {_bucket_key(value) for value in values}:
+                        buckets.setdefault(value, []).append(_Term(route, term))
+
+    def candidates(self, artifact: Artifact, stats: RoutingStats) -> list[tuple[Any, Any, bool]]:
+        """(agent, subscription, needs_match) for routes whose compiled predicate holds,
+        plus the lambda routes, which still need subscription.matches()."""
+        routes = self.types.get(artifact.type)
+        if routes is None:
+            return []
+        fallback = set(routes.fallback)
+        hits: set[int] = set(fallback)
+        if routes.by_value or routes.unindexed:
+            # Predicates see what a where= lambda sees: the model, built once.
+            try:
+                model = type_registry.resolve(artifact.type)(**artifact.payload)
+            except Exception:
+                model = None
+            if model is not None:
+                self._match(routes, model, hits, stats)
+        return [(*self.routes[route], route in fallback) for route in sorted(hits)]
+
+    @staticmethod
+    def _match(routes: _TypeRoutes, model: BaseModel, hits: set[int], stats: RoutingStats) -> None:
+        terms: list[_Term] = list(routes.unindexed)
+        for name, buckets in routes.by_value.items():
+            try:
+                terms.extend(buckets.get(_bucket_key(_value(model, name)), ()))
+            except TypeError:            # unhashable field value
+                continue
+        for term in terms:
+            if term.route in hits:
+                continue
+            stats.checks += len(term.checks)
+            if all(test(model) for test in term.checks):
+                hits.add(term.route)
+
+
+def _overrides(component: Any, hook: str) -> bool:
+    for cls in type(component).__mro__:
+        if hook in cls.__dict__:
+            return cls is not OrchestratorComponent
+    return False
+
+
+class IndexedScheduler(AgentScheduler):
+    """AgentScheduler that matches artifacts through a RoutingIndex.
+
+    Scheduling hooks (circuit breaker, dedup, joins, batching) run in the
+    same order as in AgentScheduler, for the candidate subscriptions only,
+    and only on components that actually implement them: Flock wraps every
+    hook call in a span and a log line, no-ops included.
+    """
+
+    def __init__(self, orchestrator: Any, component_runner: Any) -> None:
+        super().__init__(orchestrator, component_runner)
+        self.stats = RoutingStats()
+        self._index: RoutingIndex | None = None
+        self._indexed_agents = -1
+        self._hook_plan: dict[str, list[Any]] = {}
+        self._hook_components: tuple[Any, ...] = ()
+
+    def invalidate(self) -> None:
+        """Rebuild the index on the next artifact (after changing subscriptions)."""
+        self._index = None
+
+    @property
+    def index(self) -> RoutingIndex:
+        agents = self._orchestrator._agents
+        if self._index is None or len(agents) != self._indexed_agents:
+            self._index = RoutingIndex(agents.values())
+            self._indexed_agents = len(agents)
+        return self._index
+
+    def _hooks(self, hook: str) -> list[Any]:
+        components = tuple(self._component_runner._components)
+        if components != self._hook_components:
+            self._hook_plan, self._hook_components = {}, components
+        if hook not in self._hook_plan:
+            self._hook_plan[hook] = [c for c in components if _overrides(c, hook)]
+        return self._hook_plan[hook]
+
+    async def schedule_artifact(self, artifact: Artifact) -> None:
+        await self.schedule_many([artifact])
+
+    async def schedule_many(self, artifacts: Iterable[Artifact]) -> int:
+        """Match a batch of stored artifacts in one pass, then start the activated agents together.
+
+        Returns the number of agent tasks scheduled.
+        """
+        orchestrator = self._orchestrator
+        if not self._component_runner.is_initialized:
+            await self._component_runner.run_initialize(orchestrator)
+        index = self.index
+
+        activations: list[tuple[Artifact, Any, Any]] = []
+        for artifact in artifacts:
+            for component in self._hooks("on_artifact_published"):
+                artifact = await component.on_artifact_published(orchestrator, artifact)
+                if artifact is None:
+                    break
+            if artifact is None:
+                continue
+            self.stats.artifacts += 1
+            for agent, subscription, needs_match in index.candidates(artifact, self.stats):
+                if self._admits(artifact, agent, subscription, needs_match):
+                    activations.append((artifact, agent, subscription))
+        self.stats.matches += len(activations)
+
+        # Gates run in publish order (AND-gates and joins depend on it)...
+        ready: list[tuple[Any, list[Artifact], bool]] = []
+        for artifact, agent, subscription in activations:
+            inputs = await self._collect(artifact, agent, subscription)
+            if inputs is not None:
+                ready.append((agent, inputs, subscription.batch is not None))
+
+        # ...then the agents start in one burst, grouped per agent.
+        order = {name: position for position, name in enumerate(orchestrator._agents)}
+        ready.sort(key=lambda item: order.get(item[0].name, len(order)))
+        for agent, inputs, is_batch in ready:
+            task = self.schedule_task(agent, inputs, is_batch=is_batch)
+            for component in self._hooks("on_agent_scheduled"):
+                try:
+                    await component.on_agent_scheduled(orchestrator, agent, inputs, task)
+                except Exception as exc:  # notification only, as in ComponentRunner
+                    self._logger.warning(f"on_agent_scheduled failed: component={component.name}, error={exc!s}")
+        return len(ready)
+
+    def _admits(self, artifact: Artifact, agent: Any, subscription: Any, needs_match: bool) -> bool:
+        if not subscription.accepts_events():
+            return False
+        if agent.prevent_self_trigger and artifact.produced_by == agent.name:
+            return False
+        if not self._check_visibility(artifact, agent.identity):
+            return False
+        if subscription.from_agents and artifact.produced_by not in subscription.from_agents:
+            return False
+        if subscription.tags and not artifact.tags.intersection(subscription.tags):
+            return False
+        if needs_match:
+            self.stats.fallback_checks += 1
+            return subscription.matches(artifact)
+        return True
+
+    async def _collect(self, artifact: Artifact, agent: Any, subscription: Any) -> list[Artifact] | None:
+        # Same hook sequence and short-circuits as AgentScheduler / ComponentRunner.
+        orchestrator = self._orchestrator
+        for component in self._hooks("on_before_schedule"):
+            decision = await component.on_before_schedule(orchestrator, artifact, agent, subscription)
+            if decision in (ScheduleDecision.SKIP, ScheduleDecision.DEFER):
+                return None
+        inputs: list[Artifact] | None = [artifact]
+        for component in self._hooks("on_collect_artifacts"):
+            collection = await component.on_collect_artifacts(orchestrator, artifact, agent, subscription)
+            if collection is not None:
+                if not collection.complete:
+                    return None
+                inputs = collection.artifacts
+                break
+        for component in self._hooks("on_before_agent_schedule"):
+            inputs = await component.on_before_agent_schedule(orchestrator, agent, inputs)
+            if inputs is None:
+                return None
+        return inputs
+
+
+def use_indexed_routing(flock: Any) -> IndexedScheduler:
+    """Swap `flock`'s scheduler for an IndexedScheduler; returns it (for .stats)."""
+    current = flock._scheduler
+    if isinstance(current, IndexedScheduler):
+        return current
+    scheduler = IndexedScheduler(flock, flock._component_runner)
+    scheduler._tasks = current._tasks
+    scheduler._processed = current._processed
+    flock._scheduler = scheduler
+    flock._artifact_manager._scheduler = scheduler
+    return scheduler
+
+
+# ============================================================================
+# Batched publishing
+# ============================================================================
+
+def _to_artifact(
+    obj: BaseModel | dict[str, Any] | Artifact,
+    type_names: dict[type, str],
+    **fields: Any,
+) -> Artifact:
+    # Same normalization as Flock's ArtifactManager.publish().
+    if isinstance(obj, Artifact):
+        return obj
+    if isinstance(obj, BaseModel):
+        model = type(obj)
+        if model not in type_names:
+            type_names[model] = type_registry.name_for(model)
+        correlation_id = fields.pop("correlation_id") or str(uuid4())
+        return Artifact(type=type_names[model], payload=obj.model_dump(), correlation_id=correlation_id, **fields)
+    if isinstance(obj, dict):
+        if "type" not in obj:
+            raise ValueError("Dict input must contain 'type' key.")
+        payload = obj["payload"] if "payload" in obj else {k: v for k, v in obj.items() if k != "type"}
+        return Artifact(type=obj["type"], payload=payload, **fields)
+    raise TypeError(
+        f"Cannot publish object of type {type(obj).__name__}. Expected BaseModel, dict, or Artifact."
+    )
+
+
+async def publish_many(
+    flock: Any,
+    objects: Iterable[BaseModel | dict[str, Any] | Artifact],
+    *,
+    visibility: Visibility | None = None,
+    correlation_id: str | None = None,
+    partition_key: str | None = None,
+    tags: set[str] | None = None,
+) -> list[Artifact]:
+    """Publish a batch: build every artifact, store them together, match and schedule in one pass.
+
+    Equivalent to `await flock.publish(obj)` per object (each model gets its
+    own correlation id unless one is given), without the per-call overhead.
+    With an IndexedScheduler the batch is matched in one pass and its
+    activations start together; otherwise each artifact is scheduled in turn.
+    """
+    type_names: dict[type, str] = {}
+    artifacts = [
+        _to_artifact(
+            obj,
+            type_names,
+            produced_by="external",
+            visibility=visibility or PublicVisibility(),
+            correlation_id=correlation_id,
+            partition_key=partition_key,
+            tags=set(tags or ()),
+        )
+        for obj in objects
+    ]
+
+    store = flock.store
+    extend = getattr(store, "extend", None)
+    if extend is not None:
+        await extend(artifacts)
+    else:
+        for artifact in artifacts:
+            await store.publish(artifact)
+    flock.metrics["artifacts_published"] += len(artifacts)
+
+    scheduler = flock._scheduler
+    if isinstance(scheduler, IndexedScheduler):
+        await scheduler.schedule_many(artifacts)
+    else:
+        for artifact in artifacts:
+            await scheduler.schedule_artifact(artifact)
+    return artifacts
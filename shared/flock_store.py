@@ -0,0 +1,478 @@
+"""
+Indexed Blackboard Queries (Flock)
+
+`await flock.store.get_by_type(EssayDraft)` copies every draft ever published
+and leaves filtering and sorting to the caller — a full scan per question.
+IndexedBlackboardStore keeps sorted secondary indexes on the payload fields
+you declare, so "the latest draft for topic X" is a binary search plus one
+read, however many artifacts the blackboard holds.
+
+KEY CONCEPTS:
+- Declare indexes per type: {EssayDraft: [("topic", "iteration")]}; a tuple
+  is a composite index, sorted by its fields left to right (like a B-tree)
+- find(EssayDraft, topic=x, order_by="iteration", descending=True, limit=1)
+  uses an index made of the equality filters followed by the range /
+  order_by field; Range(low, high) bounds that field
+- Lookups are O(log n + k) for k results; queries no index covers fall back
+  to a scan, counted in `store.scans` so they are easy to spot
+- Index fields are read from the payload, then from the artifact itself
+  (correlation_id, produced_by, created_at); artifacts whose value is None
+  are not in that index, so a query only uses an index whose every field
+  it filters or orders on (otherwise it would miss them)
+- Drop-in: Flock(store=IndexedBlackboardStore(...)); everything else behaves
+  like InMemoryBlackboardStore
+
+Retention
+---------
+InMemoryBlackboardStore never forgets: a long-running flock grows by every
+artifact it has ever seen. `retention=` declares, per type, what is kept —
+the rest is evicted as new artifacts arrive, so memory stays flat however
+long the flock runs.
+
+- Retention(last=N): the newest N; Retention(last=1, per="correlation_id"):
+  the latest per key (any payload field or artifact attribute)
+- Retention(max_age=s): artifacts older than s seconds (created_at). Expiry
+  follows created_at, not arrival: a heap per type, O(log n) per artifact,
+  so artifacts replayed or published out of order still expire on time
+- Retention(spill=dir): evicted artifacts are appended to <dir>/<type>.jsonl
+  instead of dropped; spilled() reads them back. The file is written in a
+  worker thread once the store's lock is released, so a spill blocks
+  neither the event loop nor readers of the store
+- Each type's artifacts are kept oldest first, so a last=N eviction takes
+  the head of a queue in O(1). Its index entries are usually the oldest of
+  their key, also O(1); see FieldIndex for what adding and dropping keys
+  costs
+"""
+
+import asyncio
+import bisect
+import heapq
+import json
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from itertools import count
+from pathlib import Path
+from typing import Any, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from flock.core.artifacts import Artifact
+from flock.core.store import InMemoryBlackboardStore
+from flock.registry import type_registry
+from flock.utils.visibility_utils import deserialize_visibility
+
+
+M = TypeVar("M", bound=BaseModel)
+
+IndexSpec = str | tuple[str, ...]
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Range:
+    """Inclusive bounds for one field; None leaves that side open."""
+    low: Any = None
+    high: Any = None
+
+
+@dataclass(frozen=True)
+class Retention:
+    """What the store keeps of one artifact type; unset limits keep everything."""
+    last: int | None = None              # newest N (per key when `per` is set)
+    per: str | None = None               # field that groups artifacts for `last`
+    max_age: float | None = None         # seconds since created_at
+    spill: str | Path | None = None      # directory for evicted artifacts (None: drop them)
+
+    def __post_init__(self) -> None:
+        if self.per is not None and self.last is None:
+            raise ValueError("Retention(per=...) needs last=N (last=1 keeps the latest per key).")
+        if self.last is not None and self.last < 1:
+            raise ValueError("Retention(last=...) must be at least 1.")
+
+
+def artifact_to_data(artifact: Artifact) -> dict[str, Any]:
+    """JSON-ready dict that artifact_from_data() turns back into an equal Artifact."""
+    data = artifact.model_dump(mode="json")
+    data["visibility"] = artifact.visibility.model_dump(mode="json")   # keeps agents / labels / tenant
+    return data
+
+
+def artifact_from_data(data: dict[str, Any]) -> Artifact:
+    data = dict(data, visibility=deserialize_visibility(data["visibility"]))
+    return Artifact(**data)
+
+
+def artifact_to_json(artifact: Artifact) -> str:
+    """One-line JSON that artifact_from_json() turns back into an equal Artifact."""
+    return json.dumps(artifact_to_data(artifact), separators=(",", ":"))
+
+
+def artifact_from_json(text: str | bytes) -> Artifact:
+    return artifact_from_data(json.loads(text))
+
+
+def _append_spills(spills: list[tuple[Path, Artifact]]) -> int:
+    """Append evicted artifacts to their spill files, one write per file; returns how many."""
+    by_path: dict[Path, list[str]] = defaultdict(list)
+    for path, artifact in spills:
+        by_path[path].append(artifact_to_json(artifact) + "\n")
+    for path, lines in by_path.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as file:
+            file.writelines(lines)
+    return len(spills)
+
+
+def _read_spills(path: Path) -> list[Artifact]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as file:
+        return [artifact_from_json(line) for line in file if line.strip()]
+
+
+def _type_name(artifact_type: type[BaseModel] | str) -> str:
+    name = artifact_type if isinstance(artifact_type, str) else artifact_type.__name__
+    return type_registry.resolve_name(name)
+
+
+def _field(artifact: Artifact, name: str) -> Any:
+    value = artifact.payload.get(name, _MISSING)
+    return getattr(artifact, name, None) if value is _MISSING else value
+
+
+class FieldIndex:
+    """Artifacts of one type, grouped by a tuple of field values.
+
+    `keys` holds each distinct key once, sorted; `buckets` maps a key to its
+    (seq, artifact) entries, where seq is the publish order. Equal keys stay
+    in the order they were published and artifacts are never compared.
+
+    Adding to (or evicting the oldest of) an existing key is O(1). A new key,
+    or the last artifact of a key leaving, shifts the sorted key list:
+    O(distinct keys), a memmove. An index whose keys are nearly unique (e.g.
+    ("topic", "iteration")) pays that on every publish; a coarse one (e.g.
+    "topic") almost never does.
+    """
+
+    def __init__(self, fields: tuple[str, ...]) -> None:
+        self.fields = fields
+        self.keys: list[tuple[Any, ...]] = []
+        self.buckets: dict[tuple[Any, ...], deque[tuple[int, Artifact]]] = {}
+
+    def add(self, artifact: Artifact, seq: int) -> None:
+        key = tuple(_field(artifact, name) for name in self.fields)
+        if None in key:
+            return
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bisect.insort(self.keys, key)
+            bucket = self.buckets[key] = deque()
+        bucket.append((seq, artifact))                  # seq only grows: stays sorted
+
+    def remove(self, artifact: Artifact, seq: int) -> None:
+        key = tuple(_field(artifact, name) for name in self.fields)
+        bucket = self.buckets.get(key) if None not in key else None
+        if not bucket:
+            return
+        if bucket[0][0] == seq:
+            bucket.popleft()
+        else:
+            for position, (entry_seq, _) in enumerate(bucket):
+                if entry_seq == seq:
+                    del bucket[position]
+                    break
+        if not bucket:
+            del self.buckets[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def covers(self, equal: Iterable[str], ordered: str | None) -> bool:
+        """True if the index is exactly the equality fields, then `ordered` (if any).
+
+        Artifacts with a None field are not in the index. A query may only
+        leave out fields it filters on anyway: the equality fields (never
+        None there) and `ordered` (a scan skips None there too). A field the
+        query does not mention would silently drop matching artifacts.
+        """
+        equal = set(equal)
+        if set(self.fields[: len(equal)]) != equal:
+            return False
+        return self.fields[len(equal) :] == ((ordered,) if ordered is not None else ())
+
+    def lookup(
+        self,
+        equal: Mapping[str, Any],
+        ordered: str | None = None,
+        bounds: Range = Range(),
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> list[Artifact]:
+        """Artifacts matching `equal` and `bounds` on `ordered`, in key then publish order."""
+        prefix = tuple(equal[name] for name in self.fields[: len(equal)])
+        width = len(prefix)
+        start, stop = 0, len(self.keys)
+        if prefix:
+            start = bisect.bisect_left(self.keys, prefix, key=lambda k: k[:width])
+            stop = bisect.bisect_right(self.keys, prefix, start, key=lambda k: k[:width])
+        if ordered is not None:
+            width += 1
+            if bounds.low is not None:
+                start = bisect.bisect_left(
+                    self.keys, prefix + (bounds.low,), start, stop, key=lambda k: k[:width]
+                )
+            if bounds.high is not None:
+                stop = bisect.bisect_right(
+                    self.keys, prefix + (bounds.high,), start, stop, key=lambda k: k[:width]
+                )
+        found: list[Artifact] = []
+        for position in range(stop - 1, start - 1, -1) if descending else range(start, stop):
+            bucket = self.buckets[self.keys[position]]
+            found.extend(artifact for _, artifact in (reversed(bucket) if descending else bucket))
+            if limit is not None and len(found) >= limit:
+                return found[:limit]
+        return found
+
+
+class IndexedBlackboardStore(InMemoryBlackboardStore):
+    """InMemoryBlackboardStore with declared secondary indexes and retention per artifact type.
+
+        store = IndexedBlackboardStore(
+            {EssayDraft: [("topic", "iteration")]},
+            retention={EssayDraft: Retention(last=10, per="topic")},
+        )
+        flock = Flock(store=store)
+        ...
+        final = await store.latest(EssayDraft, "iteration", topic="AI agents")
+    """
+
+    def __init__(
+        self,
+        indexes: Mapping[type[BaseModel] | str, Iterable[IndexSpec]] | None = None,
+        retention: Mapping[type[BaseModel] | str, Retention] | None = None,
+    ) -> None:
+        super().__init__()
+        # Per type, in publish order; an OrderedDict drops any artifact in O(1)
+        # and finds the oldest in O(1), however many were dropped before it.
+        self._by_type: dict[str, OrderedDict[UUID, Artifact]] = defaultdict(OrderedDict)  # type: ignore[assignment]
+        self._indexes: dict[str, list[FieldIndex]] = {}
+        self._seq = count()
+        self._seq_of: dict[UUID, int] = {}
+        self._retention = {_type_name(t): policy for t, policy in (retention or {}).items()}
+        self._groups: dict[str, dict[Any, deque[UUID]]] = defaultdict(dict)  # type -> key -> ids, oldest first
+        self._expiry: dict[str, list[tuple[datetime, int, UUID]]] = defaultdict(list)  # heap on created_at
+        self._spill_pending: list[tuple[Path, Artifact]] = []
+        self._spill_lock = asyncio.Lock()               # keeps each spill file in eviction order
+        self.index_hits = 0
+        self.scans = 0
+        self.evicted = 0
+        self.spilled_count = 0
+        for artifact_type, specs in (indexes or {}).items():
+            self._indexes[_type_name(artifact_type)] = [
+                FieldIndex((spec,) if isinstance(spec, str) else tuple(spec)) for spec in specs
+            ]
+
+    def _insert(self, artifact: Artifact) -> None:
+        # Caller holds self._lock.
+        self._by_id[artifact.id] = artifact
+        self._by_type[artifact.type][artifact.id] = artifact
+        indexes = self._indexes.get(artifact.type)
+        if indexes:
+            seq = next(self._seq)
+            self._seq_of[artifact.id] = seq
+            for index in indexes:
+                index.add(artifact, seq)
+        policy = self._retention.get(artifact.type)
+        if policy is None:
+            return
+        if policy.max_age is not None:
+            heapq.heappush(self._expiry[artifact.type], (artifact.created_at, next(self._seq), artifact.id))
+        if policy.last is not None:
+            self._keep_last(artifact, policy)
+
+    # -- retention -------------------------------------------------------------
+
+    def _keep_last(self, artifact: Artifact, policy: Retention) -> None:
+        if policy.per is None:
+            bucket = self._by_type[artifact.type]
+            while len(bucket) > policy.last:
+                self._evict(next(iter(bucket.values())))
+            return
+        group = self._groups[artifact.type].setdefault(_field(artifact, policy.per), deque())
+        group.append(artifact.id)
+        while len(group) > policy.last:
+            self._evict(self._by_id[group[0]])
+
+    def _expire(self, now: datetime | None = None) -> None:
+        now = now or datetime.now(UTC)
+        for type_name, policy in self._retention.items():
+            if policy.max_age is None:
+                continue
+            heap = self._expiry.get(type_name)
+            cutoff = now - timedelta(seconds=policy.max_age)
+            while heap and heap[0][0] < cutoff:
+                # Artifacts that `last` evicted already are skipped here.
+                artifact = self._by_id.get(heapq.heappop(heap)[2])
+                if artifact is not None:
+                    self._evict(artifact)
+
+    def _evict(self, artifact: Artifact) -> None:
+        del self._by_id[artifact.id]
+        del self._by_type[artifact.type][artifact.id]
+        self._consumptions_by_artifact.pop(artifact.id, None)
+        seq = self._seq_of.pop(artifact.id, None)
+        if seq is not None:
+            for index in self._indexes.get(artifact.type, ()):
+                index.remove(artifact, seq)
+        policy = self._retention[artifact.type]
+        if policy.per is not None:
+            groups = self._groups[artifact.type]
+            key = _field(artifact, policy.per)
+            group = groups.get(key)
+            if group:
+                if group[0] == artifact.id:
+                    group.popleft()
+                else:
+                    group.remove(artifact.id)
+                if not group:
+                    del groups[key]
+        if policy.spill is not None:
+            self._spill_pending.append((Path(policy.spill) / f"{artifact.type}.jsonl", artifact))
+        self.evicted += 1
+
+    def _retire(self) -> list[tuple[Path, Artifact]]:
+        # Caller holds self._lock; returns what _spill() writes once it is released.
+        if self._retention:
+            self._expire()
+        spills, self._spill_pending = self._spill_pending, []
+        return spills
+
+    async def _spill(self, spills: list[tuple[Path, Artifact]]) -> None:
+        if spills:
+            async with self._spill_lock:
+                self.spilled_count += await asyncio.to_thread(_append_spills, spills)
+
+    async def expire(self) -> int:
+        """Evict what has outlived max_age now (publishing does this too); returns how many."""
+        async with self._lock:
+            before = self.evicted
+            spills = self._retire()
+            evicted = self.evicted - before
+        await self._spill(spills)
+        return evicted
+
+    async def spilled(self, artifact_type: type[BaseModel] | str) -> list[Artifact]:
+        """Artifacts of a type that retention moved to disk, oldest first."""
+        policy = self._retention.get(_type_name(artifact_type))
+        if policy is None or policy.spill is None:
+            return []
+        path = Path(policy.spill) / f"{_type_name(artifact_type)}.jsonl"
+        async with self._spill_lock:                    # after the spills already under way
+            return await asyncio.to_thread(_read_spills, path)
+
+    # -- writes and reads ------------------------------------------------------
+
+    async def publish(self, artifact: Artifact) -> None:
+        async with self._lock:
+            self._insert(artifact)
+            spills = self._retire()
+        await self._spill(spills)
+
+    async def extend(self, artifacts: Iterable[Artifact]) -> None:
+        """Store a batch under one lock acquisition (publish_many uses this)."""
+        async with self._lock:
+            for artifact in artifacts:
+                self._insert(artifact)
+            spills = self._retire()
+        await self._spill(spills)
+
+    async def list_by_type(self, type_name: str) -> list[Artifact]:
+        async with self._lock:
+            return list(self._by_type.get(_type_name(type_name), {}).values())
+
+    async def get_by_type(self, artifact_type: type[M], *, correlation_id: str | None = None) -> list[M]:
+        async with self._lock:
+            artifacts = list(self._by_type.get(_type_name(artifact_type), {}).values())
+        if correlation_id is not None:
+            artifacts = [artifact for artifact in artifacts if artifact.correlation_id == correlation_id]
+        return [artifact_type(**artifact.payload) for artifact in artifacts]
+
+    def _plan(self, type_name: str, equal: Mapping[str, Any], ordered: str | None) -> FieldIndex | None:
+        if any(value is None for value in equal.values()):
+            return None
+        return next(
+            (index for index in self._indexes.get(type_name, ()) if index.covers(equal, ordered)),
+            None,
+        )
+
+    async def find_artifacts(
+        self,
+        artifact_type: type[BaseModel] | str,
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        **where: Any,
+    ) -> list[Artifact]:
+        """Artifacts of a type matching `where` (value = equality, Range = bounds).
+
+        At most one field may be a Range, and it must be `order_by` if both
+        are given. Without order_by, results come in index (or publish) order.
+        """
+        type_name = _type_name(artifact_type)
+        ranged = [name for name, value in where.items() if isinstance(value, Range)]
+        if len(ranged) > 1 or (ranged and order_by not in (None, ranged[0])):
+            raise ValueError("find() supports a Range on one field, the order_by field.")
+        ordered = ranged[0] if ranged else order_by
+        bounds = where.pop(ordered, Range()) if ranged else Range()
+        equal = where
+
+        async with self._lock:
+            index = self._plan(type_name, equal, ordered)
+            if index is not None:
+                self.index_hits += 1
+                return index.lookup(equal, ordered, bounds, descending, limit)
+
+            self.scans += 1
+            candidates = list(self._by_type.get(type_name, {}).values())
+
+        def matches(artifact: Artifact) -> bool:
+            if any(_field(artifact, name) != value for name, value in equal.items()):
+                return False
+            if ordered is None:
+                return True
+            value = _field(artifact, ordered)
+            if value is None:
+                return False
+            return (bounds.low is None or value >= bounds.low) and (
+                bounds.high is None or value <= bounds.high
+            )
+
+        found = [artifact for artifact in candidates if matches(artifact)]
+        if ordered is not None:
+            found.sort(key=lambda artifact: _field(artifact, ordered), reverse=descending)
+        elif descending:
+            found.reverse()
+        return found if limit is None else found[:limit]
+
+    async def find(
+        self,
+        artifact_type: type[M],
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        **where: Any,
+    ) -> list[M]:
+        """Like find_artifacts(), as model instances (what get_by_type returns)."""
+        artifacts = await self.find_artifacts(
+            artifact_type, order_by=order_by, descending=descending, limit=limit, **where
+        )
+        return [artifact_type(**artifact.payload) for artifact in artifacts]
+
+    async def latest(self, artifact_type: type[M], order_by: str, **where: Any) -> M | None:
+        """The artifact with the highest `order_by` value among those matching `where`."""
+        found = await self.find(artifact_type, order_by=order_by, descending=True, limit=1, **where)
+        return found[0] if found else None
@@ -0,0 +1,215 @@
+"""
+Streaming Subscriptions (Flock)
+
+`publish → run_until_idle() → get_by_type()` shows results only once the whole
+cascade is idle: the answer to the easiest ticket waits for the hardest one.
+subscribe(flock, TicketResponse) is an async iterator that yields each
+artifact of a type the moment it is published, while the flock keeps working.
+
+KEY CONCEPTS:
+- `async for response in subscribe(flock, TicketResponse):` yields model
+  instances, like get_by_type(); where= and correlation_id= filter the stream
+- Bounded buffer with backpressure: when `buffer` items are waiting, the
+  agent publishing the next one waits until the consumer catches up, so a
+  slow reader throttles the flock instead of growing memory
+- The stream ends when the flock goes idle (run_until_idle() returning) once
+  its buffer is drained, after `limit` items, or on close() / leaving the loop
+- `stream.stats` reports delivered items, how often and how long publishers
+  were held back, and the lag from an artifact's creation to its delivery
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from flock.components.orchestrator import OrchestratorComponent
+from flock.core.artifacts import Artifact
+from flock.registry import type_registry
+
+
+M = TypeVar("M", bound=BaseModel)
+
+DEFAULT_BUFFER = 64
+
+
+@dataclass
+class StreamStats:
+    delivered: int = 0
+    peak_buffered: int = 0
+    blocked: int = 0                     # publishes that waited for buffer space
+    blocked_seconds: float = 0.0
+    lag_seconds: float = 0.0             # created_at -> handed to the consumer, summed
+
+    @property
+    def mean_lag(self) -> float:
+        return self.lag_seconds / self.delivered if self.delivered else 0.0
+
+
+class ArtifactStream(Generic[M]):
+    """Artifacts of one type as they are published; see subscribe()."""
+
+    def __init__(
+        self,
+        hub: "StreamHub",
+        artifact_type: type[M],
+        *,
+        where: Callable[[M], bool] | None = None,
+        correlation_id: str | None = None,
+        buffer: int = DEFAULT_BUFFER,
+        limit: int | None = None,
+        until_idle: bool = True,
+    ) -> None:
+        self.artifact_type = artifact_type
+        self.type_name = type_registry.name_for(artifact_type)
+        self.where = where
+        self.correlation_id = correlation_id
+        self.limit = limit
+        self.until_idle = until_idle
+        self.closed = False
+        self.stats = StreamStats()
+        self._hub = hub
+        self._queue: asyncio.Queue[tuple[Artifact, M] | None] = asyncio.Queue(maxsize=buffer)
+
+    def _accept(self, artifact: Artifact) -> M | None:
+        if self.closed or artifact.type != self.type_name:
+            return None
+        if self.correlation_id is not None and artifact.correlation_id != self.correlation_id:
+            return None
+        # A payload that does not fit the model, or a `where` that raises, is
+        # no match (as in Subscription.matches): it must not fail the publish.
+        try:
+            model = self.artifact_type(**artifact.payload)
+            if self.where is not None and not self.where(model):
+                return None
+        except Exception:
+            return None
+        return model
+
+    async def _offer(self, artifact: Artifact, model: M) -> None:
+        if self._queue.full():
+            self.stats.blocked += 1
+            started = time.perf_counter()
+            await self._queue.put((artifact, model))         # backpressure: the publisher waits here
+            self.stats.blocked_seconds += time.perf_counter() - started
+        else:
+            self._queue.put_nowait((artifact, model))
+        self.stats.peak_buffered = max(self.stats.peak_buffered, self._queue.qsize())
+
+    def close(self) -> None:
+        """Stop accepting artifacts; the consumer still gets what is buffered."""
+        if self.closed:
+            return
+        self.closed = True
+        self._hub.detach(self)
+        if not self._queue.full():
+            self._queue.put_nowait(None)                      # wakes a consumer waiting on an empty buffer
+
+    def _discard(self) -> None:
+        # The consumer left: drop the buffer so blocked publishers move on.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def __aiter__(self) -> AsyncIterator[M]:
+        try:
+            while self.limit is None or self.stats.delivered < self.limit:
+                if self.closed and self._queue.empty():
+                    return
+                item = await self._queue.get()
+                if item is None:
+                    return
+                artifact, model = item
+                self.stats.delivered += 1
+                self.stats.lag_seconds += (datetime.now(UTC) - artifact.created_at).total_seconds()
+                yield model
+        finally:
+            self.close()
+            self._discard()
+
+    def summary(self) -> list[str]:
+        stats = self.stats
+        return [
+            f"Stream {self.artifact_type.__name__}: {stats.delivered} delivered "
+            f"(mean lag {stats.mean_lag * 1000:.1f} ms, peak buffer {stats.peak_buffered}), "
+            f"publishers held back {stats.blocked}x for {stats.blocked_seconds:.2f}s"
+        ]
+
+
+class StreamHub(OrchestratorComponent):
+    """Hands every published artifact to the open streams (added by subscribe())."""
+
+    priority: int = 1000                 # after components that transform or block artifacts
+    name: str = "artifact_streams"
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._streams: list[ArtifactStream[Any]] = []
+
+    def attach(self, stream: ArtifactStream[Any]) -> None:
+        self._streams.append(stream)
+
+    def detach(self, stream: ArtifactStream[Any]) -> None:
+        if stream in self._streams:
+            self._streams.remove(stream)
+
+    async def on_artifact_published(self, orchestrator, artifact):  # type: ignore[override]
+        for stream in list(self._streams):
+            model = stream._accept(artifact)
+            if model is not None:
+                await stream._offer(artifact, model)
+        return artifact
+
+    async def on_orchestrator_idle(self, orchestrator) -> None:  # type: ignore[override]
+        for stream in list(self._streams):
+            if stream.until_idle:
+                stream.close()
+
+
+def stream_hub(flock: Any) -> StreamHub:
+    """The flock's StreamHub, added on first use."""
+    hub = next((c for c in flock._components if isinstance(c, StreamHub)), None)
+    if hub is None:
+        hub = StreamHub()
+        flock.add_component(hub)
+    return hub
+
+
+def subscribe(
+    flock: Any,
+    artifact_type: type[M],
+    *,
+    where: Callable[[M], bool] | None = None,
+    correlation_id: str | None = None,
+    buffer: int = DEFAULT_BUFFER,
+    limit: int | None = None,
+    until_idle: bool = True,
+) -> ArtifactStream[M]:
+    """Stream `artifact_type` artifacts as they are published.
+
+        responses = subscribe(flock, TicketResponse)     # before publishing
+        await flock.publish(ticket)
+        run = asyncio.create_task(flock.run_until_idle())
+        async for response in responses:
+            ...
+        await run
+
+    Only artifacts published after the call are streamed. With
+    until_idle=False the stream stays open across run_until_idle() calls
+    until close() or `limit`.
+    """
+    hub = stream_hub(flock)
+    stream = ArtifactStream(
+        hub,
+        artifact_type,
+        where=where,
+        correlation_id=correlation_id,
+        buffer=buffer,
+        limit=limit,
+        until_idle=until_idle,
+    )
+    hub.attach(stream)
+    return stream
@@ -0,0 +1,148 @@
+"""
+Run Until an Artifact Exists (Flock)
+
+run_until_idle() returns when the whole flock is idle. A script that needs
+one MergeDecision therefore also waits for every unrelated cascade sharing
+the blackboard, and so does a request handler in a long-lived flock. Flock's
+own run_until(Until.exists(...)) polls the store every 10 ms and leaves the
+caller to fetch the result afterwards.
+
+run_until(flock, MergeDecision, correlation_id=cid) returns the matching
+artifacts the moment the one it waits for is published. The rest of the
+flock keeps working, unless you pass cancel_rest=True.
+
+KEY CONCEPTS:
+- Waits for artifacts, not for idleness: `count` matching artifacts of one
+  type, filtered by correlation_id= and where= (a lambda or an F predicate)
+- Event-driven: every publish is checked as it happens (the subscribe()
+  hub), so there is no polling delay and no store scan per tick
+- Artifacts already on the blackboard count, so a condition that already
+  holds returns at once, e.g. for a loop resumed from a durable store
+- Returns the matches as models, like get_by_type(). It returns fewer than
+  `count` (possibly []) on timeout, or when the flock goes idle first: then
+  nothing left can publish one. wait_when_idle=True keeps an idle flock
+  waiting (until the timeout) for input published from outside
+- The runs that published the matches finish first (their consumption is
+  recorded); cancel_rest=True then cancels the agent runs still pending,
+  the default leaves them running for a later run_until_idle()
+"""
+
+import asyncio
+from collections.abc import Callable
+from typing import Any, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from flock.core.artifacts import Artifact
+
+from shared.flock_streams import ArtifactStream, StreamHub, stream_hub
+
+
+M = TypeVar("M", bound=BaseModel)
+
+IDLE_POLL = 0.1                          # seconds; only while nothing is running
+
+
+class _Watch(ArtifactStream[M]):
+    # A stream that keeps its matches instead of buffering them for a reader.
+
+    def __init__(
+        self,
+        hub: StreamHub,
+        artifact_type: type[M],
+        *,
+        where: Callable[[M], bool] | None,
+        correlation_id: str | None,
+        count: int,
+    ) -> None:
+        super().__init__(hub, artifact_type, where=where, correlation_id=correlation_id, until_idle=False)
+        self.count = count
+        self.found: dict[UUID, M] = {}
+        self.met = asyncio.Event()
+        self.producers: set[asyncio.Task[Any]] = set()
+
+    def record(self, artifact: Artifact, model: M) -> None:
+        self.found.setdefault(artifact.id, model)
+        if len(self.found) >= self.count:
+            self.met.set()
+
+    async def _offer(self, artifact: Artifact, model: M) -> None:
+        self.record(artifact, model)
+        task = asyncio.current_task()        # the agent run publishing it (hooks run inline)
+        if task is not None:
+            self.producers.add(task)
+
+
+async def _passive_work(flock: Any) -> bool:
+    # Not agent runs, but they can still publish: as in run_until_idle().
+    lifecycle = flock._lifecycle_manager
+    if lifecycle.has_pending_batches:
+        await lifecycle.start_batch_timeout_checker()
+        if flock._batch_engine.check_timeouts():
+            return True
+    return flock._has_active_timers()
+
+
+async def run_until(
+    flock: Any,
+    artifact_type: type[M],
+    *,
+    where: Callable[[M], bool] | None = None,
+    correlation_id: str | None = None,
+    count: int = 1,
+    timeout: float | None = None,
+    wait_when_idle: bool = False,
+    cancel_rest: bool = False,
+) -> list[M]:
+    """Wait until `count` artifacts of `artifact_type` match, then return them.
+
+        cid = (await flock.publish(submission)).correlation_id
+        decisions = await run_until(flock, MergeDecision, correlation_id=cid, timeout=300)
+
+    Returns early with what matched so far (maybe []) after `timeout`
+    seconds, or when nothing is left running that could publish a match.
+    With wait_when_idle=True an idle flock keeps waiting for new input
+    instead, until the timeout (if any).
+    """
+    if not flock._components_initialized:
+        await flock._run_initialize()
+    hub = stream_hub(flock)
+    watch = _Watch(hub, artifact_type, where=where, correlation_id=correlation_id, count=max(1, count))
+    hub.attach(watch)                    # before reading the store: nothing falls in between
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    try:
+        for artifact in await flock.store.list_by_type(watch.type_name):
+            model = watch._accept(artifact)
+            if model is not None:
+                watch.record(artifact, model)
+        while not watch.met.is_set():
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            running = [task for task in flock._scheduler.pending_tasks if not task.done()]
+            if running:
+                wake = remaining                 # until a run finishes or a match arrives
+            elif await _passive_work(flock) or wait_when_idle:
+                wake = IDLE_POLL if remaining is None else min(IDLE_POLL, remaining)
+            else:
+                break                            # idle: nothing left can publish a match
+            met = asyncio.ensure_future(watch.met.wait())
+            await asyncio.wait([met, *running], timeout=wake, return_when=asyncio.FIRST_COMPLETED)
+            met.cancel()
+    finally:
+        watch.close()
+
+    # Let the runs that published the matches finish (record their consumption,
+    # which a durable store needs to not redo them), then return.
+    pending = set(flock._scheduler.pending_tasks)
+    producers = [task for task in watch.producers if task in pending and not task.done()]
+    if producers:
+        await asyncio.wait(producers)
+    if cancel_rest:
+        rest = [task for task in flock._scheduler.pending_tasks if not task.done()]
+        for task in rest:
+            task.cancel()
+        await asyncio.gather(*rest, return_exceptions=True)
+    return list(watch.found.values())
@@ -0,0 +1,337 @@
+"""
+Worker Processes (Flock)
+
+A flock runs every agent in one asyncio loop, in one process. The LLM call
+itself is I/O, but the work around it is not: pydantic validation of inputs
+and outputs, prompt rendering, parsing the model's answer. Under load that
+CPU work queues on a single core while the others sit idle.
+
+use_worker_pool(flock, 4) starts four worker processes that each import the
+same flock definition. The coordinating process keeps everything stateful:
+the blackboard, routing, joins, scheduling, and the pending tasks
+run_until_idle() waits for. An agent run is the only thing that moves. The
+coordinator builds the run's context as usual, sends it with the input
+artifacts over a Unix socket, and publishes the outputs that come back.
+
+KEY CONCEPTS:
+- One logical blackboard: workers never touch the store. Agents are pure
+  functions of (inputs, context) by Flock's design, so the context the
+  coordinator already filters is all a worker needs
+- run_until_idle(), publish_many(), joins, retention and subscribe() behave
+  as before: the coordinator's task for a run simply awaits the reply
+- Each worker multiplexes many concurrent runs on its own event loop; a run
+  goes to the worker with the fewest in flight
+- .max_concurrency(n) still caps an agent across the whole pool, and a
+  failing run becomes a WorkflowError artifact as it would in-process
+- Workers are spawned and import the flock's module (`__main__` by default),
+  so module-level code must not start work outside `if __name__ == "__main__"`
+- Per-process state stays per process: each worker has its own rate limiter
+  and in-memory cache (the disk cache is shared)
+- ctx.state crosses as JSON via pydantic's to_jsonable_python: models,
+  datetimes and UUIDs arrive as dicts and strings; a value it cannot encode
+  fails the run with a WorkerError naming the agent
+- FLOCK_WORKERS=4 turns the pool on for module 03 (worker_pool_from_env())
+"""
+
+import asyncio
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_core import PydanticSerializationError, to_jsonable_python
+
+from flock.core.artifacts import Artifact
+from flock.core.visibility import AgentIdentity
+from flock.registry import RegistryError, type_registry
+from flock.utils.runtime import Context
+
+from shared.env import env_number
+from shared.flock_store import artifact_from_data, artifact_to_data
+
+
+_LENGTH = struct.Struct("<I")
+_WORKER_ENV = "FLOCK_WORKER_PROCESS"     # set in workers: their import of the app must not start a pool
+
+
+class WorkerError(RuntimeError):
+    """An agent run failed in, or was lost with, a worker process."""
+
+
+def _frame(message: dict[str, Any]) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return _LENGTH.pack(len(body)) + body
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> dict[str, Any]:
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return json.loads(await reader.readexactly(length))
+
+
+_local_names: dict[str, str] = {}
+
+
+def _local(artifact: Artifact) -> Artifact:
+    # A script's types are registered as "__main__.X" in the coordinator and
+    # "__mp_main__.X" in a spawned worker: map them by their simple name.
+    name = artifact.type
+    if name not in _local_names:
+        try:
+            _local_names[name] = type_registry.resolve_name(name)
+        except RegistryError:
+            _local_names[name] = type_registry.resolve_name(name.rpartition(".")[2])
+    local = _local_names[name]
+    return artifact if local == name else artifact.model_copy(update={"type": local})
+
+
+# ============================================================================
+# Worker process
+# ============================================================================
+
+def _serve(sock: socket.socket, app: str, attr: str) -> None:
+    module = sys.modules.get(app) or importlib.import_module(app)
+    asyncio.run(_worker_loop(sock, getattr(module, attr)))
+
+
+async def _worker_loop(sock: socket.socket, flock: Any) -> None:
+    reader, writer = await asyncio.open_connection(sock=sock)
+    running: set[asyncio.Task[None]] = set()
+    while True:
+        try:
+            request = await _read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            break                                    # the coordinator closed the pool
+        task = asyncio.create_task(_run(flock, request, writer))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    for task in running:
+        task.cancel()
+    writer.close()
+
+
+async def _run(flock: Any, request: dict[str, Any], writer: asyncio.StreamWriter) -> None:
+    try:
+        agent = flock._agents[request["agent"]]
+        identity = request["identity"]
+        ctx = Context(
+            artifacts=[_local(artifact_from_data(data)) for data in request["context"]],
+            agent_identity=AgentIdentity(**identity) if identity else None,
+            correlation_id=request["correlation_id"],
+            task_id=request["task_id"],
+            state=request["state"],
+            is_batch=request["is_batch"],
+        )
+        inputs = [_local(artifact_from_data(data)) for data in request["inputs"]]
+        outputs = await agent.execute(ctx, inputs)
+        reply = {"id": request["id"], "outputs": [artifact_to_data(output) for output in outputs]}
+    except Exception as exc:
+        reply = {"id": request["id"], "error": f"{type(exc).__name__}: {exc}"}
+    writer.write(_frame(reply))
+    await writer.drain()
+
+
+# ============================================================================
+# Coordinator side
+# ============================================================================
+
+@dataclass
+class WorkerStats:
+    runs: int = 0
+    errors: int = 0
+    round_trip_seconds: float = 0.0      # send -> reply, including the agent run
+
+
+class _Worker:
+    def __init__(self, index: int, process: Any, sock: socket.socket) -> None:
+        self.index = index
+        self.process = process
+        self.sock = sock
+        self.alive = True
+        self.stats = WorkerStats()
+        self.calls: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._connecting: asyncio.Task[None] | None = None
+        self._receiving: asyncio.Task[None] | None = None
+
+    async def connect(self) -> asyncio.StreamWriter:
+        if self._connecting is None:
+            self._connecting = asyncio.create_task(self._connect())
+        await self._connecting
+        assert self._writer is not None
+        return self._writer
+
+    async def _connect(self) -> None:
+        reader, self._writer = await asyncio.open_connection(sock=self.sock)
+        self._receiving = asyncio.create_task(self._receive(reader))
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                reply = await _read_frame(reader)
+                future = self.calls.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.alive = False
+        for future in self.calls.values():
+            if not future.done():
+                future.set_exception(WorkerError(f"worker {self.index} exited during the run"))
+        self.calls.clear()
+
+
+class WorkerPool:
+    """Runs the agent runs of a flock in worker processes; see use_worker_pool()."""
+
+    def __init__(
+        self,
+        flock: Any,
+        workers: int,
+        *,
+        agents: Iterable[str] | None = None,
+        app: str = "__main__",
+    ) -> None:
+        module = sys.modules[app]
+        attr = next((name for name, value in vars(module).items() if value is flock), None)
+        if attr is None:
+            raise ValueError(f"The flock is not a global of module {app!r}; pass app=<its module>.")
+        context = multiprocessing.get_context("spawn")
+        self.flock = flock
+        self.workers: list[_Worker] = []
+        os.environ[_WORKER_ENV] = "1"
+        try:
+            for index in range(max(1, workers)):
+                parent, child = socket.socketpair()
+                process = context.Process(
+                    target=_serve, args=(child, app, attr), name=f"flock-worker-{index}", daemon=True
+                )
+                process.start()
+                child.close()
+                self.workers.append(_Worker(index, process, parent))
+        finally:
+            del os.environ[_WORKER_ENV]
+        self.started = time.perf_counter()
+        self._ids = itertools.count()
+        self.agents = sorted(agents) if agents is not None else list(flock._agents)
+        self._local_execute: dict[str, Any] = {}
+        for name in self.agents:
+            agent = flock._agents[name]
+            self._local_execute[name] = agent.execute
+            agent.execute = self._remote(agent)
+
+    def _remote(self, agent: Any) -> Any:
+        async def execute(ctx: Context, artifacts: list[Artifact]) -> list[Artifact]:
+            async with agent._semaphore:           # .max_concurrency(n) holds across the pool
+                return await self._call(agent.name, ctx, artifacts)
+
+        return execute
+
+    async def _call(self, agent: str, ctx: Context, artifacts: list[Artifact]) -> list[Artifact]:
+        alive = [worker for worker in self.workers if worker.alive]
+        if not alive:
+            raise WorkerError("no worker process left")
+        try:
+            state = to_jsonable_python(ctx.state)
+        except PydanticSerializationError as exc:
+            raise WorkerError(
+                f"{agent}: ctx.state cannot be sent to a worker process ({exc}); "
+                "keep it to JSON-compatible values or run this agent in-process"
+            ) from exc
+        worker = min(alive, key=lambda w: len(w.calls))
+        request_id = next(self._ids)
+        identity = ctx.agent_identity
+        message = _frame({
+            "id": request_id,
+            "agent": agent,
+            "identity": identity.model_dump(mode="json") if identity is not None else None,
+            "correlation_id": ctx.correlation_id,
+            "task_id": ctx.task_id,
+            "state": state,
+            "is_batch": ctx.is_batch,
+            "context": [artifact_to_data(artifact) for artifact in ctx.artifacts],
+            "inputs": [artifact_to_data(artifact) for artifact in artifacts],
+        })
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        worker.calls[request_id] = future            # counts as in flight before the first await
+        started = time.perf_counter()
+        try:
+            writer = await worker.connect()
+            writer.write(message)
+            await writer.drain()
+            reply = await future
+        except ConnectionError as exc:
+            raise WorkerError(f"worker {worker.index} exited during the run") from exc
+        finally:
+            worker.calls.pop(request_id, None)
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled():
+                future.exception()                   # retrieved: the receiver may have failed it too
+        worker.stats.runs += 1
+        worker.stats.round_trip_seconds += time.perf_counter() - started
+        if "error" in reply:
+            worker.stats.errors += 1
+            raise WorkerError(f"{agent} failed in worker {worker.index}: {reply['error']}")
+        return [_local(artifact_from_data(data)) for data in reply["outputs"]]
+
+    async def close(self) -> None:
+        """Stop the workers (they finish nothing still in flight); agents run in-process again."""
+        for name, execute in self._local_execute.items():
+            self.flock._agents[name].execute = execute
+        for worker in self.workers:
+            if worker._writer is not None:
+                worker._writer.close()
+            else:
+                worker.sock.close()
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def summary(self) -> list[str]:
+        runs = sum(worker.stats.runs for worker in self.workers)
+        elapsed = time.perf_counter() - self.started
+        lines = [
+            f"Worker pool: {len(self.workers)} processes, {runs} agent runs "
+            f"({runs / elapsed:.1f} runs/s since start)"
+        ]
+        for worker in self.workers:
+            stats = worker.stats
+            mean = stats.round_trip_seconds / stats.runs if stats.runs else 0.0
+            state = "" if worker.alive else ", exited"
+            lines.append(
+                f"  worker {worker.index}: {stats.runs} runs, {stats.errors} failed, "
+                f"{mean * 1000:.1f} ms per run{state}"
+            )
+        return lines
+
+
+def use_worker_pool(
+    flock: Any,
+    workers: int,
+    *,
+    agents: Iterable[str] | None = None,
+    app: str = "__main__",
+) -> WorkerPool | None:
+    """Run `flock`'s agents (all defined so far, or `agents`) in `workers` processes.
+
+    Call it at module level after the agents are defined. Returns None when
+    called inside a worker, which imports the same module.
+    """
+    if os.environ.get(_WORKER_ENV):
+        return None
+    return WorkerPool(flock, workers, agents=agents, app=app)
+
+
+def worker_pool_from_env(flock: Any, *, app: str = "__main__") -> WorkerPool | None:
+    """use_worker_pool() with FLOCK_WORKERS processes, or None when it is unset."""
+    workers = int(env_number("FLOCK_WORKERS", 0))
+    return use_worker_pool(flock, workers, app=app) if workers > 0 else None
@@ -0,0 +1,193 @@
+"""
+Hedged Requests for Straggler Branches (framework-agnostic)
+
+A fan-in join waits for its slowest branch, so one slow LLM call sets the
+end-to-end latency. A HedgePolicy watches a branch's own latencies; when a
+call runs past the observed p95, it sends a duplicate, keeps whichever
+answer arrives first and cancels the other.
+
+KEY CONCEPTS:
+- Per-branch latency window: each policy learns its own p95
+- No hedging until `min_samples` calls have been observed
+- Hedge budget: at most `max_hedge_rate` of calls are duplicated, so a slow
+  provider is not hit with twice the load
+- Counters: hedge rate, hedge wins, and an estimate of tail latency saved
+  (expected remaining time of the cancelled primary, from the window)
+
+The Agent Framework adapter is HedgedAgentExecutor in shared/af_executors.py.
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+from shared.env import env_flag, env_number
+
+
+T = TypeVar("T")
+
+DEFAULT_QUANTILE = 0.95
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_WINDOW = 200
+DEFAULT_MAX_HEDGE_RATE = 0.1
+
+
+class LatencyWindow:
+    """The most recent `size` latencies of one branch."""
+
+    def __init__(self, size: int = DEFAULT_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def expected_remaining(self, elapsed: float) -> float:
+        """E[latency - elapsed | latency > elapsed], 0 if nothing in the window was slower."""
+        slower = [s for s in self._samples if s > elapsed]
+        return sum(slower) / len(slower) - elapsed if slower else 0.0
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedges / self.calls if self.calls else 0.0
+
+
+class HedgePolicy:
+    """Send a duplicate call when the first one exceeds this branch's p95."""
+
+    def __init__(
+        self,
+        *,
+        quantile: float = DEFAULT_QUANTILE,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        window: int = DEFAULT_WINDOW,
+        max_hedge_rate: float = DEFAULT_MAX_HEDGE_RATE,
+    ) -> None:
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_hedge_rate = max_hedge_rate
+        self.latencies = LatencyWindow(window)
+        self.stats = HedgeStats()
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, or None if this call must not hedge."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        if self.stats.hedges + 1 > self.max_hedge_rate * self.stats.calls:
+            return None
+        return self.latencies.quantile(self.quantile)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]] | None = None,
+    ) -> tuple[T, bool]:
+        """Run `primary`, hedging with `hedge` (default: `primary` again).
+
+        Returns (result, hedge_won). If the first finisher failed, the other
+        attempt is awaited; if both fail, the primary's error is raised.
+        """
+        hedge = hedge or primary
+        self.stats.calls += 1
+        delay = self.hedge_delay()
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        second: asyncio.Future[T] | None = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                self.latencies.record(time.monotonic() - started)
+                return first.result(), False
+
+            self.stats.hedges += 1
+            hedge_started = time.monotonic()
+            second = asyncio.ensure_future(hedge())
+            pending: set[asyncio.Future[T]] = {first, second}
+            winner: asyncio.Future[T] | None = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+            if winner is None:
+                return first.result(), False  # both failed: raise the primary's error
+        finally:
+            # Cancel the loser (or both, if the caller itself was cancelled).
+            losers = [t for t in (first, second) if t is not None and not t.done()]
+            for task in losers:
+                task.cancel()
+            for task in losers:
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+
+        now = time.monotonic()
+        if winner is first:
+            self.latencies.record(now - started)
+            return first.result(), False
+
+        # The primary is still a straggler at this point: credit the time it
+        # would likely have needed beyond now, judged by this branch's history.
+        self.stats.hedge_wins += 1
+        self.stats.saved_seconds += self.latencies.expected_remaining(now - started)
+        self.latencies.record(now - hedge_started)
+        return second.result(), True
+
+    def snapshot(self) -> dict[str, Any]:
+        data: dict[str, Any] = asdict(self.stats)
+        data["hedge_rate"] = round(self.stats.hedge_rate, 3)
+        data["p95"] = self.latencies.quantile(self.quantile)
+        return data
+
+
+_policies: list[HedgePolicy] = []
+_policies_lock = threading.Lock()
+
+
+def hedge_policy() -> HedgePolicy | None:
+    """A new per-branch policy from LLM_HEDGE / LLM_HEDGE_* env vars, or None if off.
+
+    Policies built here are also counted by hedge_totals().
+    """
+    if not env_flag("LLM_HEDGE"):
+        return None
+    policy = HedgePolicy(
+        quantile=env_number("LLM_HEDGE_QUANTILE", DEFAULT_QUANTILE),
+        min_samples=int(env_number("LLM_HEDGE_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)),
+        max_hedge_rate=env_number("LLM_HEDGE_MAX_RATE", DEFAULT_MAX_HEDGE_RATE),
+    )
+    with _policies_lock:
+        _policies.append(policy)
+    return policy
+
+
+def hedge_totals() -> HedgeStats | None:
+    """Counters summed over every policy from hedge_policy(), or None if hedging is off."""
+    with _policies_lock:
+        if not _policies:
+            return None
+        total = HedgeStats()
+        for policy in _policies:
+            total.calls += policy.stats.calls
+            total.hedges += policy.stats.hedges
+            total.hedge_wins += policy.stats.hedge_wins
+            total.saved_seconds += policy.stats.saved_seconds
+        return total
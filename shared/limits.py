@@ -0,0 +1,319 @@
+"""
+Adaptive Rate Limiting for Provider Calls (framework-agnostic)
+
+A fan-out of N inputs × M agents fires N·M requests at once; the provider
+answers with a storm of 429s and every branch falls into retries. The
+RateLimiter below sits in front of every LLM call instead, so the fan-out
+runs at the provider's quota rather than above it.
+
+KEY CONCEPTS:
+- Token buckets: requests-per-minute (LLM_RPM) and tokens-per-minute (LLM_TPM)
+  refill continuously; a call waits until both can cover it
+- AIMD concurrency: the in-flight limit grows by ~1 per window of successful
+  calls (additive increase) and halves on a throttling response
+  (multiplicative decrease), so it settles just under the real limit
+- A 429 also pauses the whole limiter for Retry-After (or an exponential
+  backoff), so sibling branches wait instead of piling on more 429s
+- One limiter per process is shared by Flock agents and Agent Framework
+  AgentExecutors: see RateLimitMiddleware (shared/af_middleware.py) and
+  RateLimitedDSPyEngine (shared/flock_engines.py)
+"""
+
+import asyncio
+import contextlib
+import math
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+from shared.env import env_number
+
+
+T = TypeVar("T")
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    """Continuously refilling bucket: `rate_per_minute` units, burst = one minute."""
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 = now)."""
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)  # oversized calls wait for a full bucket
+        return max(0.0, (amount - self._level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Debit `amount` units; a negative amount refunds. May go into debt."""
+        self._refill(time.monotonic())
+        self._level = min(self.capacity, self._level - amount)
+
+
+@dataclass
+class LimiterStats:
+    requests: int = 0
+    throttles: int = 0
+    retries: int = 0
+    tokens: int = 0
+    wait_seconds: float = 0.0
+    max_in_flight: int = 0
+
+
+def http_status(exc: BaseException) -> int | None:
+    """HTTP status carried by an exception or anything in its cause chain."""
+    seen: set[int] = set()
+    current: BaseException | None = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        response = getattr(current, "response", None)
+        status = (
+            getattr(current, "status_code", None)
+            or getattr(current, "status", None)
+            or getattr(response, "status_code", None)
+        )
+        if isinstance(status, int):
+            return status
+        current = current.__cause__ or current.__context__
+    return None
+
+
+def is_throttle(exc: BaseException) -> bool:
+    """True when an exception (or anything in its cause chain) is an HTTP 429."""
+    if http_status(exc) == 429:
+        return True
+    current: BaseException | None = exc
+    while current is not None:
+        if "RateLimit" in type(current).__name__:
+            return True
+        current = current.__cause__
+    return False
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Provider-suggested delay in seconds, when the error carries one."""
+    current: BaseException | None = exc
+    while current is not None:
+        value = getattr(current, "retry_after", None)
+        if value is None:
+            headers = getattr(getattr(current, "response", None), "headers", None) or {}
+            value = headers.get("retry-after")
+        try:
+            if value is not None:
+                return float(value)
+        except (TypeError, ValueError):
+            pass
+        current = current.__cause__
+    return None
+
+
+class Lease:
+    """One admitted call. Report real token usage with record() before release."""
+
+    def __init__(self, limiter: "RateLimiter", estimated_tokens: int) -> None:
+        self._limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.started = time.monotonic()
+        self._released = False
+
+    def record(self, tokens_used: int | None) -> None:
+        """Reconcile the token bucket with the provider's reported usage."""
+        if tokens_used is None:
+            return
+        if self._limiter.tokens is not None:
+            self._limiter.tokens.take(tokens_used - self.estimated_tokens)
+        self._limiter.stats.tokens += tokens_used - self.estimated_tokens
+        self.estimated_tokens = tokens_used
+
+    async def release(self, *, throttled: bool = False, delay: float | None = None) -> None:
+        if not self._released:
+            self._released = True
+            await self._limiter._release(
+                time.monotonic() - self.started, throttled=throttled, delay=delay
+            )
+
+
+class RateLimiter:
+    """RPM/TPM token buckets plus an AIMD concurrency window.
+
+    Use run() to wrap a call with admission, usage accounting and
+    throttle-aware retries, or acquire() / Lease for streaming calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+    ) -> None:
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = LimiterStats()
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._consecutive_throttles = 0
+        self._latency = 1.0  # EWMA of successful call latency ≈ one round trip
+        # Created lazily: the limiter may be built before the event loop runs.
+        self._condition: asyncio.Condition | None = None
+
+    @property
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, estimated_tokens: int = 0) -> Lease:
+        """Wait for a concurrency slot and bucket capacity, then admit one call."""
+        started = time.monotonic()
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if self.in_flight < math.floor(self.limit):
+                    if self.requests is not None:
+                        delay = max(delay, self.requests.delay_for(1))
+                    if self.tokens is not None:
+                        delay = max(delay, self.tokens.delay_for(estimated_tokens))
+                    if delay <= 0:
+                        break
+                    # Capacity refills with time, not with a release: poll.
+                    with contextlib.suppress(TimeoutError):
+                        await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                else:
+                    await self._cond.wait()
+
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.stats.requests += 1
+            self.stats.tokens += estimated_tokens
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.in_flight)
+            self.stats.wait_seconds += time.monotonic() - started
+        return Lease(self, estimated_tokens)
+
+    async def _release(self, elapsed: float, *, throttled: bool, delay: float | None) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.stats.throttles += 1
+                self._consecutive_throttles += 1
+                # One decrease per burst: every call in flight when the quota
+                # ran out sees its own 429, but that is one congestion signal.
+                if now - self._last_decrease > self._latency:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                backoff = min(
+                    MAX_BACKOFF, self.backoff * 2 ** (self._consecutive_throttles - 1)
+                )
+                pause = delay if delay is not None else backoff * (0.5 + random.random() / 2)
+                self._paused_until = max(self._paused_until, now + pause)
+            else:
+                self._consecutive_throttles = 0
+                self._latency += 0.2 * (elapsed - self._latency)
+                # +1 slot per full window of successes (1/limit per success).
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        *,
+        estimated_tokens: int = 0,
+        usage: Callable[[T], int | None] | None = None,
+    ) -> T:
+        """Run `call` under the limiter, retrying throttled attempts.
+
+        `usage(result)` may return the real token count to reconcile the TPM
+        bucket. Non-throttle errors release the slot and propagate unchanged.
+        """
+        attempt = 0
+        while True:
+            lease = await self.acquire(estimated_tokens)
+            try:
+                result = await call()
+            except BaseException as exc:
+                throttled = isinstance(exc, Exception) and is_throttle(exc)
+                await lease.release(throttled=throttled, delay=retry_after(exc) if throttled else None)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.stats.retries += 1
+                continue
+            if usage is not None:
+                lease.record(usage(result))
+            await lease.release()
+            return result
+
+    def snapshot(self) -> dict[str, Any]:
+        """Counters plus the current concurrency window."""
+        data: dict[str, Any] = asdict(self.stats)
+        data["limit"] = round(self.limit, 2)
+        data["in_flight"] = self.in_flight
+        return data
+
+
+def estimate_tokens(text: str, max_output_tokens: int | None = None) -> int:
+    """Rough pre-call token estimate: ~4 characters per token plus the output budget."""
+    return len(text) // 4 + (max_output_tokens or 512)
+
+
+def limiter_from_env() -> RateLimiter | None:
+    """Build a limiter from LLM_RPM / LLM_TPM / LLM_MAX_CONCURRENCY, or None if none is set."""
+    rpm = env_number("LLM_RPM", 0)
+    tpm = env_number("LLM_TPM", 0)
+    max_concurrency = int(env_number("LLM_MAX_CONCURRENCY", 0))
+    if not (rpm or tpm or max_concurrency):
+        return None
+    max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+    return RateLimiter(
+        rpm=rpm or None,
+        tpm=tpm or None,
+        initial_concurrency=min(DEFAULT_INITIAL_CONCURRENCY, max_concurrency),
+        max_concurrency=max_concurrency,
+        max_retries=int(env_number("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+    )
+
+
+_default: RateLimiter | None = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def default_limiter() -> RateLimiter | None:
+    """Process-wide limiter shared by both frameworks (None when unconfigured)."""
+    global _default, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            _default = limiter_from_env()
+            _default_loaded = True
+        return _default
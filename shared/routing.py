@@ -0,0 +1,263 @@
+"""
+Latency-Aware Multi-Backend Routing (Agent Framework)
+
+One agent, several deployments: a few Azure OpenAI deployments plus OpenAI
+quota. RoutingResponsesClient is a chat client like any other — as_agent(),
+middleware and tools work unchanged — but every request goes to the
+best-scoring healthy backend and fails over when one breaks.
+
+KEY CONCEPTS:
+- Per backend: EWMA latency and EWMA error rate; score = latency × (1 + 4·errors),
+  0 for a backend not tried yet, and the best known latency stands in for
+  one that has only failed
+- Circuit breaker: `failure_threshold` consecutive failures open the circuit
+  for `open_seconds`; then one probe request decides (half-open)
+- Failover: transport errors, 5xx and 429 move on to the next backend;
+  other 4xx (bad request, auth) are the caller's problem and raise at once
+- Conversation state stays client-side (store=False), so any backend can
+  continue any session
+- get_client() returns a router when LLM_BACKENDS lists several backends
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework import (
+    BaseChatClient,
+    ChatMiddlewareLayer,
+    ChatResponse,
+    ChatResponseUpdate,
+    FunctionInvocationLayer,
+    Message,
+    ResponseStream,
+)
+from agent_framework.observability import ChatTelemetryLayer
+
+from shared.af_streaming import close_stream
+from shared.limits import http_status
+
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_ALPHA = 0.2
+ERROR_PENALTY = 4.0
+UNMEASURED_LATENCY = 1.0                 # seconds; stands in while no backend has succeeded
+
+
+def _fails_over(exc: BaseException) -> bool:
+    """Backend trouble (retry elsewhere) vs. request trouble (raise)."""
+    status = http_status(exc)
+    return status is None or status in (408, 429) or status >= 500
+
+
+@dataclass
+class BackendHealth:
+    name: str
+    latency: float | None = None         # EWMA seconds; None until the first success
+    error_rate: float = 0.0              # EWMA of 0/1 outcomes
+    consecutive_failures: int = 0
+    open_until: float = 0.0              # circuit open while now < open_until
+    probing: bool = False                # half-open probe in flight
+    requests: int = 0
+    failures: int = 0
+
+    def score(self, best_latency: float) -> float:
+        # Untried backends score 0 so each one gets tried early. One that has
+        # been tried but never succeeded is charged the best known latency,
+        # so its error penalty still ranks it behind healthy backends.
+        if self.requests == 0:
+            return 0.0
+        latency = self.latency if self.latency is not None else best_latency
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until and not self.probing
+
+
+class RoutingResponsesClient(
+    ChatMiddlewareLayer,
+    FunctionInvocationLayer,
+    ChatTelemetryLayer,
+    BaseChatClient,
+):
+    """Chat client that spreads requests over several backend clients.
+
+    Backends are full Agent Framework chat clients (OpenAIResponsesClient,
+    AzureOpenAIResponsesClient); the router calls their raw request layer
+    and adds middleware, tool invocation and telemetry once, itself.
+    """
+
+    OTEL_PROVIDER_NAME = "router"
+    STORES_BY_DEFAULT = False
+
+    def __init__(
+        self,
+        backends: Mapping[str, BaseChatClient],
+        *,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+        alpha: float = DEFAULT_ALPHA,
+        **kwargs: Any,
+    ) -> None:
+        if not backends:
+            raise ValueError("RoutingResponsesClient needs at least one backend.")
+        super().__init__(**kwargs)
+        self.backends = dict(backends)
+        self.health = {name: BackendHealth(name) for name in self.backends}
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.alpha = alpha
+        # Identifies the backend set, e.g. for response-cache keys.
+        self.model_id = "|".join(
+            sorted(str(getattr(client, "model_id", name)) for name, client in self.backends.items())
+        )
+
+    # ------------------------------------------------------------------
+    # Backend selection and health bookkeeping
+    # ------------------------------------------------------------------
+
+    def ranked(self) -> list[str]:
+        """Backends in the order to try them: healthy by score, then open circuits."""
+        now = time.monotonic()
+        healthy = [h for h in self.health.values() if h.available(now)]
+        broken = [h for h in self.health.values() if not h.available(now)]
+        best = min(
+            (h.latency for h in self.health.values() if h.latency is not None),
+            default=UNMEASURED_LATENCY,
+        )
+        healthy.sort(key=lambda h: h.score(best))
+        # Every circuit open: still try, soonest-to-close first.
+        broken.sort(key=lambda h: h.open_until)
+        return [h.name for h in healthy + broken]
+
+    def _begin(self, name: str) -> None:
+        health = self.health[name]
+        health.requests += 1
+        if health.open_until and time.monotonic() >= health.open_until:
+            health.probing = True
+
+    def _success(self, name: str, elapsed: float) -> None:
+        health = self.health[name]
+        health.latency = (
+            elapsed if health.latency is None else health.latency + self.alpha * (elapsed - health.latency)
+        )
+        health.error_rate += self.alpha * (0.0 - health.error_rate)
+        health.consecutive_failures = 0
+        health.open_until = 0.0
+        health.probing = False
+
+    def _failure(self, name: str) -> None:
+        health = self.health[name]
+        health.failures += 1
+        health.error_rate += self.alpha * (1.0 - health.error_rate)
+        health.consecutive_failures += 1
+        if health.probing or health.consecutive_failures >= self.failure_threshold:
+            health.open_until = time.monotonic() + self.open_seconds
+        health.probing = False
+
+    def _backend_options(self, name: str, options: Mapping[str, Any]) -> dict[str, Any]:
+        # Each backend uses its own deployment/model; history travels with the
+        # request instead of living in one provider's server-side store.
+        return {
+            **options,
+            "model_id": getattr(self.backends[name], "model_id", None),
+            "store": False,
+        }
+
+    # ------------------------------------------------------------------
+    # Chat client implementation
+    # ------------------------------------------------------------------
+
+    def _inner_get_response(
+        self,
+        *,
+        messages: Sequence[Message],
+        options: Mapping[str, Any],
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> Awaitable[ChatResponse] | ResponseStream[ChatResponseUpdate, ChatResponse]:
+        if stream:
+            return self._stream(messages, options, **kwargs)
+        return self._get_response(messages, options, **kwargs)
+
+    async def _get_response(
+        self, messages: Sequence[Message], options: Mapping[str, Any], **kwargs: Any
+    ) -> ChatResponse:
+        last_error: Exception | None = None
+        for name in self.ranked():
+            self._begin(name)
+            started = time.monotonic()
+            try:
+                response = await self.backends[name]._inner_get_response(  # type: ignore[attr-defined]
+                    messages=messages,
+                    options=self._backend_options(name, options),
+                    stream=False,
+                    **kwargs,
+                )
+            except asyncio.CancelledError:
+                self.health[name].probing = False
+                raise
+            except Exception as exc:
+                if not _fails_over(exc):
+                    self.health[name].probing = False
+                    raise
+                self._failure(name)
+                last_error = exc
+                continue
+            self._success(name, time.monotonic() - started)
+            return response
+        assert last_error is not None
+        raise last_error
+
+    def _stream(
+        self, messages: Sequence[Message], options: Mapping[str, Any], **kwargs: Any
+    ) -> ResponseStream[ChatResponseUpdate, ChatResponse]:
+        # A stream cannot switch backends once chunks have been emitted, so it
+        # goes to the best backend: a completed stream counts as a success, a
+        # failing one as a failure, an abandoned one (closed early) as neither.
+        name = self.ranked()[0]
+        self._begin(name)
+        started = time.monotonic()
+        stream = self.backends[name]._inner_get_response(  # type: ignore[attr-defined]
+            messages=messages,
+            options=self._backend_options(name, options),
+            stream=True,
+            **kwargs,
+        )
+
+        async def updates() -> AsyncIterator[ChatResponseUpdate]:
+            finished = False
+            try:
+                async for update in stream:
+                    yield update
+                finished = True
+            except Exception as exc:
+                if _fails_over(exc):
+                    self._failure(name)
+                raise
+            finally:
+                self.health[name].probing = False
+                if not finished:
+                    await close_stream(stream)
+            self._success(name, time.monotonic() - started)
+
+        async def final_response(_: Sequence[ChatResponseUpdate]) -> ChatResponse:
+            return await stream.get_final_response()     # the backend's own finalizer
+
+        return ResponseStream(updates(), finalizer=final_response)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            h.name: {
+                "latency": round(h.latency, 3) if h.latency is not None else None,
+                "error_rate": round(h.error_rate, 3),
+                "requests": h.requests,
+                "failures": h.failures,
+                "circuit": "open" if now < h.open_until else ("half-open" if h.probing else "closed"),
+            }
+            for h in self.health.values()
+        }
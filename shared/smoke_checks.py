@@ -0,0 +1,150 @@
+"""
+Smoke Checks for the Flock Runtime Helpers
+
+The workshop modules need an API key and an LLM to run end to end. These
+checks drive the stateful shared helpers with a stub engine instead, so they
+run offline in a few seconds and fail loudly (non-zero exit) when a helper
+breaks:
+
+- worker pool: artifacts go to a worker process and the outputs come back;
+  a ctx.state the pool cannot send fails with a WorkerError
+- durable store: a reopened log resumes exactly the unfinished runs of the
+  agents whose subscription matches, and skips the finished ones
+- correlated join: groups complete per key, and incomplete groups are
+  evicted by `max_pending` and expire after `ttl`
+
+Run:  uv run python -m shared.smoke_checks
+"""
+
+import asyncio
+import tempfile
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from pydantic import BaseModel, Field
+
+from flock import Flock
+from flock.components import EngineComponent
+from flock.core.artifacts import Artifact
+from flock.core.store import ConsumptionRecord
+from flock.registry import flock_type, type_registry
+from flock.utils.runtime import Context, EvalResult
+
+from shared.flock_durable import DurableBlackboardStore, ResumePending
+from shared.flock_joins import CorrelatedJoin
+from shared.flock_workers import WorkerError, use_worker_pool
+
+
+@flock_type
+class Job(BaseModel):
+    n: int = Field(description="Job number")
+
+
+@flock_type
+class Part(BaseModel):
+    n: int = Field(description="Job number")
+    half: str = Field(description="'left' or 'right'")
+
+
+@flock_type
+class Done(BaseModel):
+    n: int = Field(description="Job number")
+    agent: str = Field(description="Agent that finished it")
+
+
+class StubEngine(EngineComponent):
+    """Answers every run with Done, without an LLM."""
+
+    async def evaluate(self, agent, ctx, inputs, output_group):
+        n = inputs.artifacts[0].payload["n"]
+        return EvalResult.from_object(Done(n=n, agent=agent.name), agent=agent)
+
+
+# The worker pool re-imports this module in each worker and looks the flock
+# up by name, so it has to be a module global.
+flock = Flock()
+flock.agent("echo").consumes(Job).publishes(Done).with_engines(StubEngine()).max_concurrency(8)
+
+
+async def check_worker_pool() -> None:
+    pool = use_worker_pool(flock, 1)
+    try:
+        await flock.publish_many([Job(n=n) for n in range(8)])
+        await flock.run_until_idle()
+        done = await flock.store.get_by_type(Done)
+        assert sorted(d.n for d in done) == list(range(8)), done
+        assert pool.workers[0].stats.runs == 8, pool.summary()
+
+        ctx = Context(
+            artifacts=[], correlation_id=str(uuid4()), task_id="smoke", state={"lock": asyncio.Lock()}
+        )
+        try:
+            await pool._call("echo", ctx, [])
+        except WorkerError as exc:
+            assert "ctx.state" in str(exc), exc
+        else:
+            raise AssertionError("an unserializable ctx.state reached the worker")
+    finally:
+        await pool.close()
+
+
+async def check_durable_resume() -> None:
+    path = tempfile.mkdtemp(prefix="smoke-blackboard-")
+    store = DurableBlackboardStore(path)
+    jobs = {
+        n: Artifact(type=type_registry.name_for(Job), payload=Job(n=n).model_dump(), produced_by="external")
+        for n in (2, 7, 8, 9)
+    }
+    await store.extend(jobs.values())
+    # The "crashed" process finished these runs; 2 matches no agent at all.
+    finished = [(7, "big"), (7, "odd"), (9, "big")]
+    await store.record_consumptions([
+        ConsumptionRecord(
+            artifact_id=jobs[n].id, consumer=agent, run_id="before-crash", consumed_at=datetime.now(UTC)
+        )
+        for n, agent in finished
+    ])
+    store.close()
+
+    store = DurableBlackboardStore(path)
+    resumed = Flock(store=store)
+    for name, where in (("big", lambda job: job.n > 5), ("odd", lambda job: job.n % 2 == 1)):
+        resumed.agent(name).consumes(Job, where=where).publishes(Done).with_engines(StubEngine())
+    resume = ResumePending()
+    resumed.add_component(resume)
+    await resumed.run_until_idle()
+    store.close()
+
+    runs = sorted((d.n, d.agent) for d in await resumed.store.get_by_type(Done))
+    assert runs == [(8, "big"), (9, "odd")], runs
+    assert (resume.stats.replayed, resume.stats.pending) == (4, 2), resume.stats
+
+
+async def check_join_eviction() -> None:
+    joined = Flock()
+    merge = joined.agent("merge").consumes(Part, Part).publishes(Done).with_engines(StubEngine())
+    join = CorrelatedJoin(ttl=0.2, max_pending=2).on(merge, by="n")
+    joined.add_component(join)
+
+    await joined.publish_many([Part(n=1, half="left"), Part(n=1, half="right")])
+    await joined.run_until_idle()
+    assert join.stats.completed == 1, join.summary()
+
+    await joined.publish_many([Part(n=n, half="left") for n in (2, 3, 4)])
+    await joined.run_until_idle()
+    assert (join.stats.evicted, join.stats.pending) == (1, 2), join.summary()
+
+    await asyncio.sleep(0.3)
+    await joined.run_until_idle()
+    assert (join.stats.expired, join.stats.pending) == (2, 0), join.summary()
+    assert len(await joined.store.get_by_type(Done)) == 1
+
+
+async def main() -> None:
+    for check in (check_worker_pool, check_durable_resume, check_join_eviction):
+        await check()
+        print(f"ok  {check.__name__}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""
+One-line summaries of the shared helpers that are enabled in this process.
+
+Examples print these at the end of main() so a run shows what the cache,
+limiter and hedging actually did. Disabled helpers print nothing.
+"""
+
+from shared.cache import default_cache
+from shared.hedging import hedge_totals
+from shared.limits import default_limiter
+
+
+def runtime_summary() -> list[str]:
+    lines: list[str] = []
+
+    cache = default_cache()
+    if cache is not None:
+        stats = cache.snapshot()
+        lines.append(
+            f"Response cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+            f"{stats['misses']} misses"
+        )
+
+    limiter = default_limiter()
+    if limiter is not None:
+        stats = limiter.snapshot()
+        lines.append(
+            f"Rate limiter: {stats['requests']} requests, {stats['throttles']} throttled, "
+            f"concurrency limit {stats['limit']}, peak in flight {stats['max_in_flight']}"
+        )
+
+    hedges = hedge_totals()
+    if hedges is not None:
+        lines.append(
+            f"Hedging: {hedges.hedges}/{hedges.calls} calls hedged "
+            f"({hedges.hedge_rate:.0%}), {hedges.hedge_wins} won, "
+            f"~{hedges.saved_seconds:.1f}s tail latency saved"
+        )
+
+    return lines